@@ -1,20 +1,23 @@
 import os
 import json
 import time
+import bisect
 import joblib
 import numpy as np
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
 
+import runtime
 
-DI_PATH = "/Users/srinandanasarmakesapragada/Documents/data_raw/di_dataset.jsonl"  
-EMBED_DIR = "./di_prime_embeddings"
+
+DI_PATH = os.environ.get("ADVOCA_DI_PATH", "/Users/srinandanasarmakesapragada/Documents/data_raw/di_dataset.jsonl")
+EMBED_DIR = os.environ.get("ADVOCA_DATA_DIR", "./di_prime_embeddings")
 os.makedirs(EMBED_DIR, exist_ok=True)
 
 EMB_FILE = os.path.join(EMBED_DIR, "embeddings.npy")
 META_FILE = os.path.join(EMBED_DIR, "metadata.joblib")
 CHECKPOINT_FILE = os.path.join(EMBED_DIR, "checkpoint.json")
-MODEL_NAME = "intfloat/e5-base"
+# written by utils/preproc.py: rows added or changed since the last run
+CHANGES_FILE = os.path.splitext(DI_PATH)[0] + ".changes.json"
 BATCH_SIZE = 64  
 
 
@@ -35,6 +38,41 @@ def save_checkpoint(state):
 
 
 
+def load_changes():
+    if not os.path.exists(CHANGES_FILE):
+        return None
+    with open(CHANGES_FILE) as f:
+        return json.load(f)
+
+
+def apply_removals(changes, cp):
+    """Drop the stored rows of DI records removed by an incremental build.
+
+    Runs once per change list: the checkpoint records which list was applied
+    and the list is rewritten without its removals.
+    """
+    removed = changes.get("removed") or []
+    if not removed or cp.get("compacted") == changes.get("id"):
+        return cp
+    print(f"[CHANGES] Dropping {len(removed)} removed rows from the stored embeddings")
+    if os.path.exists(EMB_FILE):
+        loaded = np.load(EMB_FILE)
+        np.save(EMB_FILE, np.delete(loaded, [r for r in removed if r < len(loaded)], axis=0))
+    if os.path.exists(META_FILE):
+        gone = set(removed)
+        metadata = joblib.load(META_FILE)
+        joblib.dump([m for i, m in enumerate(metadata) if i not in gone], META_FILE)
+    done = cp.get("done", 0)
+    cp = {"done": done - bisect.bisect_left(removed, done), "compacted": changes.get("id")}
+    save_checkpoint(cp)
+
+    changes["removed"] = []
+    with open(CHANGES_FILE + ".tmp", "w") as f:
+        json.dump(changes, f)
+    os.replace(CHANGES_FILE + ".tmp", CHANGES_FILE)
+    return cp
+
+
 def make_text(case):
     for field in ["summary", "case_summary", "facts", "raw_text"]:
         if field in case and case[field]:
@@ -57,15 +95,25 @@ def build_embeddings():
     print(f"Total cases: {total}")
 
     cp = load_checkpoint()
+    changes = load_changes()
+    rebuild = bool(changes and changes.get("full"))
+    if changes and not rebuild:
+        cp = apply_removals(changes, cp)
     start_idx = cp.get("done", 0)
     print(f"[RESUME] Starting from index {start_idx}")
 
+    if changes:
+        print(f"[CHANGES] {len(changes['updated'])} updated rows, new rows from {changes['appended_from']}"
+              + (", full DI rebuild: re-embedding everything" if rebuild else ""))
+        start_idx = 0 if rebuild else min(start_idx, changes["appended_from"])
+
     # initialize model early so we know embedding dim
-    model = SentenceTransformer(MODEL_NAME)
+    # e5 by default; ADVOCA_ENCODER=hash for offline/benchmark corpora
+    model = runtime.load_encoder()
     embedding_dim = model.get_sentence_embedding_dimension()
 
     # Load or init embeddings safely
-    if os.path.exists(EMB_FILE):
+    if os.path.exists(EMB_FILE) and not rebuild:
         loaded = np.load(EMB_FILE)
         print(f"[LOAD] Loaded existing embeddings: {loaded.shape}")
 
@@ -106,7 +154,7 @@ def build_embeddings():
     print(f"[INFO] Starting embedding from index {start_idx}")
 
     # metadata handling
-    if os.path.exists(META_FILE):
+    if os.path.exists(META_FILE) and not rebuild:
         metadata = joblib.load(META_FILE)
         # ensure metadata length == total
         if len(metadata) < total:
@@ -114,10 +162,7 @@ def build_embeddings():
     else:
         metadata = [{} for _ in range(total)]
 
-    t0 = time.time()
-    processed = start_idx
-
-    for i in tqdm(range(start_idx, total), desc="Embedding DI"):
+    def embed_row(i):
         case = cases[i]
         text = make_text(case)
 
@@ -128,6 +173,17 @@ def build_embeddings():
         embeddings[i] = emb
         metadata[i] = {"case_id": case.get("case_id"), "text_len": len(text)}
 
+    # records replaced in place by an incremental DI build
+    if changes and not rebuild:
+        for i in tqdm([r for r in changes["updated"] if r < start_idx], desc="Re-embedding updated DI"):
+            embed_row(i)
+
+    t0 = time.time()
+    processed = start_idx
+
+    for i in tqdm(range(start_idx, total), desc="Embedding DI"):
+        embed_row(i)
+
         processed += 1
 
         if processed % 100 == 0:  # checkpoint every 100 cases
@@ -145,6 +201,8 @@ def build_embeddings():
     np.save(EMB_FILE, embeddings)
     joblib.dump(metadata, META_FILE)
     save_checkpoint({"done": total})
+    if changes:
+        os.remove(CHANGES_FILE)
 
     print("\nDONE.")
     print("Embeddings shape:", embeddings.shape)
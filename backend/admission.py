@@ -0,0 +1,270 @@
+"""
+Admission control for the expensive AI endpoints.
+
+Every limited endpoint has a weighted concurrency limit: a request holds
+`cost` units of the endpoint's capacity while it runs, where the cost grows
+with k, sample_size or file size. Requests that do not fit wait in a bounded
+FIFO queue for at most ADVOCA_QUEUE_TIMEOUT_MS. A full queue or an expired
+wait is answered at once with 503 + Retry-After.
+
+Each user also has a token bucket refilled at ADVOCA_USER_RATE cost units per
+second (burst ADVOCA_USER_BURST). Exceeding it returns 429 + Retry-After.
+
+All limited endpoints together may hold at most ADVOCA_ADMISSION_MAX_HELD
+request threads, running or waiting; the default is one less than
+ADVOCA_THREADS (no cap when that is unset). That keeps a worker thread free for auth, file listing and
+health checks however large the burst. Limits are per worker process.
+
+ADVOCA_LIMITS overrides capacity:queue per endpoint, e.g. "pcr=6:8,scr=8:8".
+ADVOCA_ADMISSION=0 disables admission control.
+"""
+import os
+import math
+import time
+import threading
+from collections import deque
+from functools import wraps
+
+from flask import request, jsonify, make_response
+
+import metrics
+
+
+ENABLED = os.environ.get("ADVOCA_ADMISSION", "1") != "0"
+QUEUE_TIMEOUT = float(os.environ.get("ADVOCA_QUEUE_TIMEOUT_MS", 1500)) / 1000.0
+USER_RATE = float(os.environ.get("ADVOCA_USER_RATE", 5))
+USER_BURST = float(os.environ.get("ADVOCA_USER_BURST", 40))
+# 0 = no process-wide cap (e.g. the threaded dev server); serve.py exports ADVOCA_THREADS
+_THREADS = int(os.environ.get("ADVOCA_THREADS", 0))
+MAX_HELD = int(os.environ.get("ADVOCA_ADMISSION_MAX_HELD", max(1, _THREADS - 1) if _THREADS else 0))
+
+# endpoint -> (capacity in cost units, max queued requests)
+DEFAULT_LIMITS = {
+    "scr": (4, 4),
+    "pcr": (4, 4),
+    "ljp": (4, 4),
+    "analyze": (4, 4),
+    "analyze-file": (3, 2),
+    "upload": (4, 4),
+}
+
+
+def _parse_limits(spec):
+    limits = dict(DEFAULT_LIMITS)
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, value = part.partition("=")
+        capacity, _, queue = value.partition(":")
+        limits[name.strip()] = (float(capacity), int(queue or limits.get(name.strip(), (0, 4))[1]))
+    return limits
+
+
+LIMITS = _parse_limits(os.environ.get("ADVOCA_LIMITS"))
+
+ADMISSIONS = metrics.Counter(
+    "advoca_admission_total", "Admission decisions by endpoint and result", ("endpoint", "result"))
+
+
+class Rejected(Exception):
+    def __init__(self, status, message, retry_after, reason):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        self.reason = reason
+
+
+# ---------------- LIMITERS ---------------- #
+
+class WeightedLimiter:
+    """Weighted semaphore with a bounded FIFO wait queue and a wait deadline."""
+
+    def __init__(self, name, capacity, max_queue, timeout=QUEUE_TIMEOUT):
+        self.name = name
+        self.capacity = float(capacity)
+        self.max_queue = int(max_queue)
+        self.timeout = timeout
+        self.in_use = 0.0
+        self.running = 0
+        self._waiters = deque()
+        self._cond = threading.Condition()
+        self._hold_ewma = 0.5  # seconds, for Retry-After estimates
+
+    def retry_after(self):
+        return self._hold_ewma * (len(self._waiters) + 1)
+
+    def acquire(self, cost):
+        cost = min(float(cost), self.capacity)  # a single oversized request runs alone
+        with self._cond:
+            if not self._waiters and self.in_use + cost <= self.capacity:
+                self._take(cost)
+                return cost
+            if len(self._waiters) >= self.max_queue:
+                raise Rejected(503, f"{self.name} is at capacity, try again shortly",
+                               self.retry_after(), "rejected_queue_full")
+
+            ticket = object()
+            self._waiters.append(ticket)
+            deadline = time.monotonic() + self.timeout
+            try:
+                while self._waiters[0] is not ticket or self.in_use + cost > self.capacity:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Rejected(503, f"Timed out waiting for {self.name} capacity",
+                                       self.retry_after(), "rejected_timeout")
+                    self._cond.wait(remaining)
+                self._take(cost)
+                return cost
+            finally:
+                self._waiters.remove(ticket)
+                # the next waiter may fit now that the head has moved
+                self._cond.notify_all()
+
+    def _take(self, cost):
+        self.in_use += cost
+        self.running += 1
+
+    def release(self, cost, held_seconds):
+        with self._cond:
+            self.in_use = max(0.0, self.in_use - cost)
+            self.running -= 1
+            self._hold_ewma = 0.8 * self._hold_ewma + 0.2 * held_seconds
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            return {"capacity": self.capacity, "in_use": self.in_use, "running": self.running,
+                    "queued": len(self._waiters), "max_queue": self.max_queue}
+
+
+class TokenBuckets:
+    """Per-key token buckets refilled continuously at `rate` per second."""
+
+    def __init__(self, rate=USER_RATE, burst=USER_BURST, max_keys=100000):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, cost):
+        """Take `cost` tokens; returns 0 on success or the seconds until they are available."""
+        if self.rate <= 0:
+            return 0.0
+        cost = min(float(cost), self.burst)
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < cost:
+                self._buckets[key] = (tokens, now)
+                return (cost - tokens) / self.rate
+            self._buckets[key] = (tokens - cost, now)
+            if len(self._buckets) > self.max_keys:
+                # drop buckets that have refilled since their last use; they carry no state
+                self._buckets = {k: v for k, v in self._buckets.items()
+                                 if v[0] + (now - v[1]) * self.rate < self.burst}
+            return 0.0
+
+
+class _HeldSlots:
+    """Process-wide cap on request threads held by limited endpoints."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.held = 0
+        self._lock = threading.Lock()
+
+    def try_take(self):
+        with self._lock:
+            if self.limit and self.held >= self.limit:
+                return False
+            self.held += 1
+            return True
+
+    def give_back(self):
+        with self._lock:
+            self.held -= 1
+
+
+_limiters = {name: WeightedLimiter(name, capacity, queue) for name, (capacity, queue) in LIMITS.items()}
+_buckets = TokenBuckets()
+_held = _HeldSlots(MAX_HELD)
+
+metrics.Gauge("advoca_admission_in_use", "Capacity units held per limited endpoint",
+              lambda: {(n,): l.in_use for n, l in _limiters.items()}, ("endpoint",))
+metrics.Gauge("advoca_admission_queued", "Requests waiting per limited endpoint",
+              lambda: {(n,): len(l._waiters) for n, l in _limiters.items()}, ("endpoint",))
+
+
+def status():
+    return {"enabled": ENABLED, "max_held": _held.limit, "held": _held.held,
+            "user_rate": _buckets.rate, "user_burst": _buckets.burst,
+            "endpoints": {n: l.snapshot() for n, l in _limiters.items()}}
+
+
+# ---------------- FLASK ---------------- #
+
+def admit(name, cost_fn=None):
+    """Decorator: admission control for a route (apply inside require_auth).
+
+    `cost_fn(request)` returns the request's cost in capacity units (default 1).
+    Streamed responses keep their slot until the stream is closed.
+    """
+    def decorator(f):
+        if not ENABLED:
+            return f
+
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            try:
+                cost = max(0.1, float(cost_fn(request))) if cost_fn else 1.0
+            except (TypeError, ValueError, AttributeError):
+                cost = 1.0  # malformed body; the handler reports the real error
+            limiter = _limiters[name]
+
+            def reject(e):
+                ADMISSIONS.labels(name, e.reason).inc()
+                resp = jsonify({'error': str(e), 'retry_after': e.retry_after})
+                resp.status_code = e.status
+                resp.headers['Retry-After'] = str(e.retry_after)
+                return resp
+
+            user = getattr(request, 'user', None)
+            if user is not None:
+                wait = _buckets.consume(user.get('user_id'), cost)
+                if wait:
+                    return reject(Rejected(429, 'Rate limit exceeded', wait, 'rejected_quota'))
+
+            if not _held.try_take():
+                return reject(Rejected(503, 'Server busy, try again shortly', limiter.retry_after(), 'rejected_busy'))
+            started = time.perf_counter()
+            try:
+                held_cost = limiter.acquire(cost)
+            except Rejected as e:
+                _held.give_back()
+                return reject(e)
+            admitted = time.perf_counter()
+            metrics.observe_stage('admission_wait', admitted - started)
+            ADMISSIONS.labels(name, 'admitted').inc()
+
+            released = False
+
+            def release():
+                nonlocal released
+                if not released:
+                    released = True
+                    limiter.release(held_cost, time.perf_counter() - admitted)
+                    _held.give_back()
+
+            try:
+                response = make_response(f(*args, **kwargs))
+                if response.is_streamed:
+                    response.call_on_close(release)
+                    return response
+            except BaseException:
+                release()
+                raise
+            release()
+            return response
+
+        return decorated
+    return decorator
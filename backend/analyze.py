@@ -0,0 +1,83 @@
+"""
+SCR, PCR and LJP from one encode and one search.
+
+The dashboard asks all three questions about the same case text. Instead of
+three encodes and three index searches (plus a second PCR pass for the best
+precedent), `analyze_all` encodes once, searches once at the depth the
+deepest consumer needs, and derives:
+
+  - SCR: unique cases from the normalised-query scores;
+  - PCR: the re-ranking from the same candidates, with scores rescaled by the
+    query norm so they equal the unnormalised inner products PCR uses;
+  - LJP: neighbour features from the top candidates, with the query embedding
+    itself as the case embedding (the standalone endpoint uses a proxy row).
+
+With `filters`, the shared search is restricted to matching cases. LJP then
+takes its neighbours from a plain index search of the same embedding, since
+its features are defined over the nearest cases overall.
+"""
+import numpy as np
+import faiss
+
+import runtime
+from build_scr import iter_unique_cases, search_limit as scr_search_limit
+from build_pcr import rank_precedents, explain_best_precedent, default_search_limit as pcr_search_limit
+from snippets import DEFAULT_SNIPPET_BYTES
+
+
+ALL_ANALYSES = ("scr", "pcr", "ljp")
+
+
+def analyze_all(query_text, include=ALL_ANALYSES, k=10, pcr_k=5, top_k=5, ljp_assets=None,
+                snippet_bytes=DEFAULT_SNIPPET_BYTES, sample_size=1000, min_length=800,
+                explanation=False, filters=None):
+    """Run the requested analyses over a single shared search.
+
+    `ljp_assets` is the dict from the model registry ('model', 'label_encoder',
+    'embeddings'); LJP is skipped when it is None. `filters` applies to SCR and
+    PCR (see case_filters.py).
+    """
+    query_text = query_text.strip()
+    include = set(include)
+    if ljp_assets is None:
+        include.discard("ljp")
+
+    depth = max([scr_search_limit(k) if "scr" in include else 0,
+                 pcr_search_limit(pcr_k) if "pcr" in include else 0,
+                 top_k if "ljp" in include else 0, 1])
+    subset = runtime.filtered_subset(filters)
+    distances, indices, embedding = runtime.encode_and_search(
+        "query: " + query_text, depth, normalize=True, return_embedding=True, subset=subset)
+
+    out = {"search_depth": depth}
+
+    if "scr" in include:
+        results = list(iter_unique_cases(query_text, distances, indices, k=k, snippet_bytes=snippet_bytes))
+        out["scr"] = {"results": results, "count": len(results)}
+
+    if "pcr" in include:
+        raw_scores = distances * float(np.linalg.norm(embedding))
+        results = list(rank_precedents(query_text, raw_scores, indices, k=pcr_k,
+                                       sample_size=sample_size, min_length=min_length))
+        out["pcr"] = {"results": results, "count": len(results)}
+        if explanation:
+            best = explain_best_precedent(results)
+            out["pcr"]["best_precedent"] = best["precedent_case"]
+            out["pcr"]["explanation"] = best["explanation"]
+
+    if "ljp" in include:
+        from ljp import explain_from_neighbors
+
+        ljp_distances, ljp_indices = distances, indices
+        if subset is not None:
+            query = embedding.reshape(1, -1).astype("float32")
+            faiss.normalize_L2(query)
+            ljp_distances, ljp_indices = runtime.load_index().search(query, top_k)
+
+        valid = ljp_indices[0] >= 0
+        nbrs = ljp_indices[0][valid][:top_k]
+        sims = ljp_distances[0][valid][:top_k]
+        out["ljp"] = explain_from_neighbors(embedding, nbrs, sims, ljp_assets["model"],
+                                            ljp_assets["label_encoder"], ljp_assets["embeddings"])
+
+    return out
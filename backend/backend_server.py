@@ -7,24 +7,37 @@ with file upload and real authentication
 import os
 import json
 import jwt
+import uuid
 import hashlib
-import sqlite3
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, Dict, Any
 
-import pandas as pd
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
-import fitz  # PyMuPDF for PDF processing
 
 # Import our AI modules
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+import db
+import metrics
+import profiler
+import admission
+import startup
+from model_registry import ModelRegistry
+from jobs import JobQueue, JobError
+from pdf_extract import extract_pdf_text
+from tabular import summarize_table, read_rows
+from fast_json import FastJSONProvider, dumps as json_dumps
+from compression import init_compression
+from case_filters import normalize_filters, FilterError
+from lexical import RETRIEVAL_MODES
+
 # We'll import these when needed to avoid startup errors
 scr_model = None
 def get_scr_functions():
@@ -44,6 +57,25 @@ def get_pcr_functions():
         print(f"Warning: PCR not available: {e}")
         return None, None
 
+def get_stream_functions():
+    """Generator variants of SCR/PCR used by the streaming endpoints"""
+    try:
+        from build_scr import iter_similar_cases
+        from build_pcr import iter_precedents
+        return iter_similar_cases, iter_precedents
+    except Exception as e:
+        print(f"Warning: streaming retrieval not available: {e}")
+        return None, None
+
+def get_analyze_function():
+    """Combined SCR/PCR/LJP over one shared search"""
+    try:
+        from analyze import analyze_all
+        return analyze_all
+    except Exception as e:
+        print(f"Warning: combined analysis not available: {e}")
+        return None
+
 def get_ljp_functions():
     try:
         # Import the LJP module functions
@@ -54,12 +86,81 @@ def get_ljp_functions():
         print(f"Warning: LJP not available: {e}")
         return None, None, None, None
 
+LJP_ENGINE_DIR = Path(os.environ.get('ADVOCA_LJP_ENGINE_DIR', Path(__file__).parent / "ljp_engine"))
+LJP_MODEL_PATH = Path(__file__).parent / "ljp_model_final.joblib"
+
+def load_ljp_assets():
+    """Load the LJP classifier, label encoder, embeddings and index."""
+    load_embeddings = get_ljp_functions()[0]
+    if not load_embeddings:
+        raise RuntimeError('LJP service not available')
+
+    print("[LJP] Loading model and embeddings...")
+
+    # Prefer the exported NumPy engine, falling back to the sklearn bundle
+    if (LJP_ENGINE_DIR / "engine.json").exists():
+        from ljp_engine import LJPEngine
+        model = LJPEngine.load(LJP_ENGINE_DIR)
+        label_encoder = model.label_enc
+        print(f"[LJP] Inference engine loaded with classes: {label_encoder.classes_}")
+    elif LJP_MODEL_PATH.exists():
+        import joblib
+        bundle = joblib.load(LJP_MODEL_PATH)
+        model = bundle["clf"]
+        label_encoder = bundle["label_enc"]
+        print(f"[LJP] Model loaded with classes: {label_encoder.classes_}")
+    else:
+        raise FileNotFoundError('LJP model not found. Please train the model first.')
+
+    embeddings, index, metadata = load_embeddings()
+    print(f"[LJP] Embeddings loaded: {embeddings.shape}")
+
+    return {
+        'model': model,
+        'label_encoder': label_encoder,
+        'embeddings': embeddings,
+        'index': index,
+    }
+
+model_registry = ModelRegistry()
+model_registry.register('ljp', load_ljp_assets)
+
+def warmup_query(text):
+    """One canned query through the combined SCR/PCR/LJP path (startup warm-up)"""
+    analyze_all = get_analyze_function()
+    if not analyze_all:
+        raise RuntimeError('Analysis service not available')
+    ljp_assets = model_registry.get('ljp') if model_registry.is_ready('ljp') else None
+    analyze_all(text, ljp_assets=ljp_assets)
+
+STARTUP_ASSETS = {'ljp': lambda: model_registry.get('ljp')}
+
+def preload_runtime(warm=True):
+    """Load index, encoder, DI cases and the LJP model in this process, then warm up.
+
+    The production server calls this with warm=False before forking workers,
+    so every worker inherits the loaded assets copy-on-write; each worker
+    then runs its own warm-up through start_runtime().
+    """
+    startup.run(STARTUP_ASSETS, warmup_query, warm=warm)
+    get_scr_functions()
+    get_pcr_functions()
+
+def start_runtime():
+    """Background load and warm-up (only the warm-up after a preload); no-op once started"""
+    return startup.start(STARTUP_ASSETS, warmup_query)
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
 app.config['UPLOAD_FOLDER'] = './uploads'
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
 
 CORS(app)
+# metrics first: after_request hooks run in reverse, so compression is timed too
+metrics.init_metrics(app)
+init_compression(app)
+profiler.init_profiler(app)
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -70,11 +171,11 @@ ALLOWED_EXTENSIONS = {'txt', 'pdf', 'json', 'csv', 'xlsx', 'xls', 'docx'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# Database setup
-DB_PATH = 'users.db'
+# Database setup (per-thread pooled connections in WAL mode, see db.py)
+DB_PATH = db.DB_PATH
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = db.get_connection()
     cursor = conn.cursor()
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -97,8 +198,27 @@ def init_db():
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
+    db.ensure_column(cursor, 'user_files', 'content_hash', 'TEXT')
+    # file_extracts is a cache: drop it if it was created keyed on the hash alone
+    cursor.execute('PRAGMA table_info(file_extracts)')
+    if [row[1] for row in cursor.fetchall() if row[5]] == ['content_hash']:
+        cursor.execute('DROP TABLE file_extracts')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS file_extracts (
+            content_hash TEXT NOT NULL,
+            file_type TEXT NOT NULL,
+            processed TEXT NOT NULL,
+            query_text TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (content_hash, file_type)
+        )
+    ''')
+    # list_files filters by user and orders by upload time
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_files_user_time ON user_files (user_id, upload_time)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_files_hash ON user_files (content_hash)')
     conn.commit()
-    conn.close()
+    # don't carry an open connection into forked workers
+    db.close_connections()
 
 init_db()
 
@@ -140,17 +260,20 @@ def require_auth(f):
     return decorated
 
 # File processing utilities
-def extract_text_from_pdf(file_path: str) -> str:
-    """Extract text from PDF using PyMuPDF"""
+# Characters of PDF text extracted at upload (0 = whole document, in parallel)
+PDF_TEXT_BUDGET = int(os.environ.get('ADVOCA_PDF_TEXT_BUDGET', 100000))
+
+def extract_text_from_pdf(file_path: str, max_chars: Optional[int] = None, with_stats: bool = False):
+    """Extract text from PDF using PyMuPDF.
+
+    With max_chars, stops reading pages once the budget is filled; otherwise
+    large documents are extracted in parallel page ranges.
+    """
     try:
-        doc = fitz.open(file_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        doc.close()
-        return text
+        text, stats = extract_pdf_text(file_path, max_chars=max_chars)
     except Exception as e:
-        return f"Error processing PDF: {str(e)}"
+        text, stats = f"Error processing PDF: {str(e)}", None
+    return (text, stats) if with_stats else text
 
 def process_uploaded_file(file_path: str, file_type: str) -> Dict[str, Any]:
     """Process uploaded file and extract relevant text/data"""
@@ -165,11 +288,13 @@ def process_uploaded_file(file_path: str, file_type: str) -> Dict[str, Any]:
             }
         
         elif file_type == 'pdf':
-            text = extract_text_from_pdf(file_path)
+            text, stats = extract_text_from_pdf(file_path, max_chars=PDF_TEXT_BUDGET or None, with_stats=True)
             return {
                 'success': True,
                 'text': text,
-                'type': 'pdf_text'
+                'type': 'pdf_text',
+                'truncated': bool(stats and stats['truncated']),
+                'extraction': stats
             }
         
         elif file_type == 'json':
@@ -182,20 +307,19 @@ def process_uploaded_file(file_path: str, file_type: str) -> Dict[str, Any]:
             }
         
         elif file_type in ['csv']:
-            df = pd.read_csv(file_path)
+            # Streamed in chunks: bounded preview + column stats, rows paged via /api/files/<id>/rows
+            summary = summarize_table(file_path, file_type)
             return {
                 'success': True,
-                'data': df.to_dict('records'),
-                'columns': df.columns.tolist(),
+                **summary,
                 'type': 'csv'
             }
         
         elif file_type in ['xlsx', 'xls']:
-            df = pd.read_excel(file_path)
+            summary = summarize_table(file_path, file_type)
             return {
                 'success': True,
-                'data': df.to_dict('records'),
-                'columns': df.columns.tolist(),
+                **summary,
                 'type': 'excel'
             }
         
@@ -211,6 +335,136 @@ def process_uploaded_file(file_path: str, file_type: str) -> Dict[str, Any]:
             'error': f'Error processing file: {str(e)}'
         }
 
+# Maximum characters of extracted text used as an SCR/PCR query
+ANALYSIS_CHAR_LIMIT = 10000
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 of a file's contents"""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+BLOB_DIR = 'blobs'
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def save_upload_blob(file, file_ext: str) -> Dict[str, Any]:
+    """Stream an upload to disk while hashing it, stored under its content hash.
+
+    Identical uploads share one blob at uploads/blobs/<aa>/<sha256>.<ext>.
+    Returns the blob path relative to UPLOAD_FOLDER, the hash and whether the
+    blob already existed.
+    """
+    upload_root = app.config['UPLOAD_FOLDER']
+    tmp_dir = os.path.join(upload_root, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    
+    sha = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as out:
+            for chunk in iter(lambda: file.stream.read(UPLOAD_CHUNK_SIZE), b''):
+                sha.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        
+        content_hash = sha.hexdigest()
+        blob_name = os.path.join(BLOB_DIR, content_hash[:2], f"{content_hash}.{file_ext}")
+        blob_path = os.path.join(upload_root, blob_name)
+        
+        existed = os.path.exists(blob_path)
+        if not existed:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(tmp_path, blob_path)  # atomic; concurrent writers hold identical bytes
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    return {'filename': blob_name, 'content_hash': content_hash, 'size': size, 'existed': existed}
+
+def build_query_text(processed: Dict[str, Any]) -> str:
+    """Derive the analysis query text from a process_uploaded_file result"""
+    query_text = ""
+    if processed['type'] in ['text', 'pdf_text']:
+        query_text = processed['text']
+    elif processed['type'] in ['json']:
+        # Try to extract text from JSON structure
+        json_data = processed['data']
+        if isinstance(json_data, dict):
+            # Look for common text fields
+            for field in ['text', 'content', 'description', 'summary', 'raw_text']:
+                if field in json_data:
+                    query_text = str(json_data[field])
+                    break
+            if not query_text:
+                query_text = json.dumps(json_data)[:5000]  # Use first 5000 chars
+    elif processed['type'] in ['csv', 'excel']:
+        # Convert structured data to text for analysis
+        if processed['data']:
+            query_text = str(processed['data'][:5])  # First 5 rows as text
+    
+    # Limit text length for analysis
+    return query_text[:ANALYSIS_CHAR_LIMIT]
+
+# (content_hash, file_type) -> [lock, number of threads holding or waiting on it]
+_extract_locks = {}
+_extract_locks_guard = threading.Lock()
+
+def get_file_extract(file_path: str, file_type: str, content_hash: str) -> Dict[str, Any]:
+    """Return the extracted content for a file, extracting it only once per content hash and type.
+
+    Returns {'processed': <process_uploaded_file result>, 'query_text': str, 'cached': bool}.
+    """
+    # Concurrent uploads of the same blob wait for one extraction; the lock
+    # is dropped only when no thread holds or waits on it
+    key = (content_hash, file_type)
+    with _extract_locks_guard:
+        entry = _extract_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            return _get_file_extract(file_path, file_type, content_hash)
+    finally:
+        with _extract_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _extract_locks[key]
+
+def _get_file_extract(file_path: str, file_type: str, content_hash: str) -> Dict[str, Any]:
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        'SELECT processed, query_text FROM file_extracts WHERE content_hash = ? AND file_type = ?',
+        (content_hash, file_type)
+    )
+    row = cursor.fetchone()
+    if row:
+        metrics.CACHE.labels('extract', 'hit').inc()
+        return {'processed': json.loads(row[0]), 'query_text': row[1], 'cached': True}
+    
+    metrics.CACHE.labels('extract', 'miss').inc()
+    with metrics.stage('extract'):
+        processed = process_uploaded_file(file_path, file_type)
+    query_text = build_query_text(processed) if processed['success'] else ""
+    
+    if processed['success']:
+        with db.transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO file_extracts (content_hash, file_type, processed, query_text) VALUES (?, ?, ?, ?)',
+                (content_hash, file_type, json.dumps(processed, default=str), query_text)
+            )
+    
+    return {'processed': processed, 'query_text': query_text, 'cached': False}
+
+def mark_file_processed(file_id: int, content_hash: str):
+    with db.transaction() as conn:
+        conn.execute(
+            'UPDATE user_files SET processed = 1, content_hash = ? WHERE id = ?',
+            (content_hash, file_id)
+        )
+
 # Authentication Routes
 @app.route('/api/auth/signup', methods=['POST'])
 def signup():
@@ -224,22 +478,20 @@ def signup():
             return jsonify({'error': 'Email, password, and name are required'}), 400
         
         # Check if user already exists
-        conn = sqlite3.connect(DB_PATH)
+        conn = db.get_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT id FROM users WHERE email = ?', (email,))
         if cursor.fetchone():
-            conn.close()
             return jsonify({'error': 'User already exists'}), 409
         
         # Create user
         password_hash = generate_password_hash(password)
-        cursor.execute(
-            'INSERT INTO users (email, password_hash, name) VALUES (?, ?, ?)',
-            (email, password_hash, name)
-        )
-        user_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with db.transaction() as conn:
+            cursor = conn.execute(
+                'INSERT INTO users (email, password_hash, name) VALUES (?, ?, ?)',
+                (email, password_hash, name)
+            )
+            user_id = cursor.lastrowid
         
         # Generate token
         token = generate_token(user_id, email)
@@ -268,11 +520,9 @@ def login():
             return jsonify({'error': 'Email and password are required'}), 400
         
         # Find user
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        cursor = db.get_connection().cursor()
         cursor.execute('SELECT id, password_hash, name FROM users WHERE email = ?', (email,))
         user = cursor.fetchone()
-        conn.close()
         
         if not user or not check_password_hash(user[1], password):
             return jsonify({'error': 'Invalid email or password'}), 401
@@ -304,9 +554,53 @@ def verify():
         }
     })
 
+# Admission cost of each limited request, in units of one default-sized search
+MB = 1024 * 1024
+
+def _json_body(req):
+    return req.get_json(silent=True) or {}
+
+def scr_cost(data):
+    return 1 + int(data.get('k', 10)) / 20
+
+# PCR sample bytes when 'sample_size' is absent, and the price of an explicit null (full text)
+DEFAULT_SAMPLE_BYTES = 1000
+FULL_TEXT_BYTES = 20000
+
+def pcr_cost(data):
+    # PCR searches ~10x k candidates and snippets each one
+    if 'sample_size' not in data:
+        sample = DEFAULT_SAMPLE_BYTES
+    elif data['sample_size'] is None:
+        sample = FULL_TEXT_BYTES
+    else:
+        sample = int(data['sample_size'])
+    return 1 + int(data.get('k', 5)) / 10 + sample / 10000
+
+def analyze_cost(req):
+    data = _json_body(req)
+    pcr = {'k': data.get('pcr_k', 5)}
+    if 'sample_size' in data:
+        pcr['sample_size'] = data['sample_size']
+    return 1 + scr_cost(data) + pcr_cost(pcr)
+
+def analyze_file_cost(req):
+    data = _json_body(req)
+    if data.get('async'):
+        return 0.5  # only queues a job
+    cursor = db.get_connection().cursor()
+    cursor.execute('SELECT filename FROM user_files WHERE id = ? AND user_id = ?',
+                   (data.get('file_id'), request.user['user_id']))
+    row = cursor.fetchone()
+    path = os.path.join(app.config['UPLOAD_FOLDER'], row[0]) if row else None
+    size = os.path.getsize(path) if path and os.path.exists(path) else 0
+    base = pcr_cost(data) if data.get('type') == 'pcr' else scr_cost(data)
+    return base + 1 + size / MB
+
 # File Upload Routes
 @app.route('/api/upload', methods=['POST'])
 @require_auth
+@admission.admit('upload', lambda req: 1 + (req.content_length or 0) / MB)
 def upload_file():
     try:
         if 'file' not in request.files:
@@ -319,27 +613,29 @@ def upload_file():
         if not allowed_file(file.filename):
             return jsonify({'error': f'File type not allowed. Supported: {", ".join(ALLOWED_EXTENSIONS)}'}), 400
         
-        # Secure filename and save
+        # Secure filename and save under the content hash (shared across users)
         filename = secure_filename(file.filename)
         file_ext = filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
+        with metrics.stage('store'):
+            blob = save_upload_blob(file, file_ext)
+        metrics.CACHE.labels('blob', 'hit' if blob['existed'] else 'miss').inc()
+        unique_filename = blob['filename']
+        content_hash = blob['content_hash']
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
         
-        file.save(file_path)
-        
         # Save to database
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO user_files (user_id, filename, original_name, file_type) VALUES (?, ?, ?, ?)',
-            (request.user['user_id'], unique_filename, filename, file_ext)
-        )
-        file_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with db.transaction() as conn:
+            cursor = conn.execute(
+                'INSERT INTO user_files (user_id, filename, original_name, file_type, content_hash) VALUES (?, ?, ?, ?, ?)',
+                (request.user['user_id'], unique_filename, filename, file_ext, content_hash)
+            )
+            file_id = cursor.lastrowid
         
-        # Process the file
-        processed = process_uploaded_file(file_path, file_ext)
+        # Process the blob once and persist the extracted text for later analyses
+        extract = get_file_extract(file_path, file_ext, content_hash)
+        processed = extract['processed']
+        if processed['success']:
+            mark_file_processed(file_id, content_hash)
         
         return jsonify({
             'success': True,
@@ -347,6 +643,8 @@ def upload_file():
             'filename': unique_filename,
             'original_name': filename,
             'file_type': file_ext,
+            'content_hash': content_hash,
+            'deduplicated': blob['existed'],
             'processed': processed
         })
     
@@ -357,8 +655,7 @@ def upload_file():
 @require_auth
 def list_files():
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        cursor = db.get_connection().cursor()
         cursor.execute('''
             SELECT id, filename, original_name, file_type, upload_time, processed 
             FROM user_files 
@@ -377,29 +674,140 @@ def list_files():
                 'processed': bool(row[5])
             })
         
-        conn.close()
         return jsonify({'success': True, 'files': files})
     
     except Exception as e:
         return jsonify({'error': f'Failed to list files: {str(e)}'}), 500
 
+@app.route('/api/files/<int:file_id>/rows', methods=['GET'])
+@require_auth
+def file_rows(file_id):
+    """Page through the rows of an uploaded CSV/Excel file"""
+    try:
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', 100, type=int)
+        
+        cursor = db.get_connection().cursor()
+        cursor.execute(
+            'SELECT filename, file_type FROM user_files WHERE id = ? AND user_id = ?',
+            (file_id, request.user['user_id'])
+        )
+        file_info = cursor.fetchone()
+        
+        if not file_info:
+            return jsonify({'error': 'File not found'}), 404
+        
+        filename, file_type = file_info
+        if file_type not in ['csv', 'xlsx', 'xls']:
+            return jsonify({'error': 'Row access is only available for CSV/Excel files'}), 400
+        
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        rows, columns = read_rows(file_path, file_type, offset=offset, limit=limit)
+        
+        return jsonify({
+            'success': True,
+            'file_id': file_id,
+            'offset': max(0, offset),
+            'columns': columns,
+            'rows': rows,
+            'count': len(rows)
+        })
+    
+    except Exception as e:
+        return jsonify({'error': f'Failed to read rows: {str(e)}'}), 500
+
+# Streaming responses
+STREAM_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream',
+}
+
+def retrieval_mode_error(data: Dict[str, Any]):
+    """Error response for an unknown or unavailable "mode" ('dense' or 'hybrid'), else None"""
+    mode = data.get('mode', 'dense')
+    if mode not in RETRIEVAL_MODES:
+        return jsonify({'error': f'Invalid mode. Use {" or ".join(RETRIEVAL_MODES)}'}), 400
+    if mode == 'hybrid':
+        import runtime
+        if runtime.load_lexical() is None:
+            return jsonify({'error': 'Hybrid retrieval not available: lexical index not built or out of date'}), 503
+    return None
+
+def requested_stream_format(data: Dict[str, Any]) -> Optional[str]:
+    """'ndjson' / 'sse' if the client opted into streaming, else None"""
+    stream = data.get('stream')
+    if stream in STREAM_MIMETYPES:
+        return stream
+    if stream is True:
+        return 'ndjson'
+    accept = request.headers.get('Accept', '')
+    if 'text/event-stream' in accept:
+        return 'sse'
+    if 'application/x-ndjson' in accept:
+        return 'ndjson'
+    return None
+
+def stream_results(results, header: Dict[str, Any], fmt: str) -> Response:
+    """Stream each ranked result as soon as it is produced.
+
+    NDJSON: one {"type": ...} object per line. SSE: one event per result.
+    The stream opens with a "meta" record and ends with "done" (or "error").
+    """
+    def encode(kind, payload):
+        if fmt == 'sse':
+            return f"event: {kind}\ndata: {json_dumps(payload)}\n\n"
+        return json_dumps({'type': kind, **payload}) + "\n"
+    
+    def generate():
+        yield encode('meta', header)
+        count = 0
+        try:
+            for rank, result in enumerate(results, start=1):
+                count += 1
+                yield encode('result', {'rank': rank, 'result': result})
+        except Exception as e:
+            yield encode('error', {'error': str(e)})
+            return
+        yield encode('done', {'success': True, 'count': count})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=STREAM_MIMETYPES[fmt],
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 # AI Analysis Routes
 @app.route('/api/scr', methods=['POST'])
 @require_auth
+@admission.admit('scr', lambda req: scr_cost(_json_body(req)))
 def similar_case_retrieval():
     try:
         data = request.get_json()
         query = data.get('query', '').strip()
         k = data.get('k', 10)
+        # byte budget for text_sample snippets (null => full text)
+        opts = {'snippet_bytes': data['snippet_bytes']} if 'snippet_bytes' in data else {}
         
         if not query:
             return jsonify({'error': 'Query text is required'}), 400
+        # {"court", "jurisdiction", "date_from", "date_to"}, see case_filters.py
+        if normalize_filters(data.get('filters')):
+            opts['filters'] = data['filters']
+        mode_error = retrieval_mode_error(data)
+        if mode_error:
+            return mode_error
+        opts['mode'] = data.get('mode', 'dense')
         
         retrieve_similar_cases = get_scr_functions()
         if not retrieve_similar_cases:
             return jsonify({'error': 'SCR service not available'}), 503
         
-        results = retrieve_similar_cases(query, k=k)
+        stream_format = requested_stream_format(data)
+        if stream_format:
+            iter_similar_cases, _ = get_stream_functions()
+            return stream_results(iter_similar_cases(query, k=k, **opts), {'query': query, 'k': k}, stream_format)
+        
+        results = retrieve_similar_cases(query, k=k, **opts)
         
         return jsonify({
             'success': True,
@@ -408,27 +816,43 @@ def similar_case_retrieval():
             'count': len(results)
         })
     
+    except FilterError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'SCR analysis failed: {str(e)}'}), 500
 
 @app.route('/api/pcr', methods=['POST'])
 @require_auth
+@admission.admit('pcr', lambda req: pcr_cost(_json_body(req)))
 def precedent_case_retrieval():
     try:
         data = request.get_json()
         query = data.get('query', '').strip()
         k = data.get('k', 5)
         get_explanation = data.get('explanation', False)
+        # byte budget for sample snippets (null => full text)
+        opts = {'sample_size': data['sample_size']} if 'sample_size' in data else {}
         
         if not query:
             return jsonify({'error': 'Query text is required'}), 400
+        if normalize_filters(data.get('filters')):
+            opts['filters'] = data['filters']
+        mode_error = retrieval_mode_error(data)
+        if mode_error:
+            return mode_error
+        opts['mode'] = data.get('mode', 'dense')
         
         recommend_precedents, find_best_precedent = get_pcr_functions()
         if not recommend_precedents:
             return jsonify({'error': 'PCR service not available'}), 503
         
+        stream_format = requested_stream_format(data)
+        if stream_format and not get_explanation:
+            _, iter_precedents = get_stream_functions()
+            return stream_results(iter_precedents(query, k=k, **opts), {'query': query, 'k': k}, stream_format)
+        
         if get_explanation:
-            result = find_best_precedent(query, k=k)
+            result = find_best_precedent(query, k=k, **opts)
             return jsonify({
                 'success': True,
                 'query': query,
@@ -436,7 +860,7 @@ def precedent_case_retrieval():
                 'explanation': result['explanation']
             })
         else:
-            results = recommend_precedents(query, k=k)
+            results = recommend_precedents(query, k=k, **opts)
             return jsonify({
                 'success': True,
                 'query': query,
@@ -444,11 +868,14 @@ def precedent_case_retrieval():
                 'count': len(results)
             })
     
+    except FilterError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'PCR analysis failed: {str(e)}'}), 500
 
 @app.route('/api/ljp/predict', methods=['POST'])
 @require_auth
+@admission.admit('ljp')
 def legal_judgment_prediction():
     """Legal Judgment Prediction with XAI"""
     try:
@@ -466,41 +893,16 @@ def legal_judgment_prediction():
         if not explain_case:
             return jsonify({'error': 'LJP service not available'}), 503
         
-        # Load the LJP model and data if not already loaded
-        global ljp_model, ljp_label_encoder, ljp_embeddings, ljp_index
-        
-        # Initialize model variables if they don't exist
+        # Assets are loaded once (at startup or by the first request) under a lock
         try:
-            # Check if all required variables are loaded
-            _ = ljp_model, ljp_label_encoder, ljp_embeddings, ljp_index
-        except NameError:
-            # One or more variables don't exist, load everything
-            try:
-                import joblib
-                from pathlib import Path
-                
-                print("[LJP] Loading model and embeddings...")
-                
-                # Load the trained model
-                model_path = Path(__file__).parent / "ljp_model_final.joblib"
-                if model_path.exists():
-                    bundle = joblib.load(model_path)
-                    ljp_model = bundle["clf"]
-                    ljp_label_encoder = bundle["label_enc"]
-                    print(f"[LJP] Model loaded with classes: {ljp_label_encoder.classes_}")
-                else:
-                    return jsonify({'error': 'LJP model not found. Please train the model first.'}), 503
-                
-                # Load embeddings and index
-                ljp_embeddings, ljp_index, metadata = load_embeddings()
-                print(f"[LJP] Embeddings loaded: {ljp_embeddings.shape}")
-                
-            except Exception as e:
-                print(f"[LJP] Error loading model: {e}")
-                return jsonify({'error': f'Failed to load LJP model: {str(e)}'}), 503
+            ljp = model_registry.get('ljp')
+        except FileNotFoundError as e:
+            return jsonify({'error': str(e)}), 503
+        except Exception as e:
+            return jsonify({'error': f'Failed to load LJP model: {str(e)}'}), 503
         
         # Get prediction and explanation
-        result = explain_case(case_text, ljp_model, ljp_label_encoder, ljp_embeddings, ljp_index, top_k=top_k)
+        result = explain_case(case_text, ljp['model'], ljp['label_encoder'], ljp['embeddings'], ljp['index'], top_k=top_k)
         
         return jsonify({
             'success': True,
@@ -531,16 +933,31 @@ def ljp_status():
             }), 503
         
         # Check if model file exists
-        from pathlib import Path
-        model_path = Path(__file__).parent / "ljp_model_final.joblib"
-        model_exists = model_path.exists()
+        engine_exists = (LJP_ENGINE_DIR / "engine.json").exists()
+        model_exists = engine_exists or LJP_MODEL_PATH.exists()
+        load_status = model_registry.status('ljp')
+        ready = load_status['state'] == 'ready'
+        
+        if ready:
+            message = 'LJP service ready'
+        elif load_status['state'] == 'loading':
+            message = 'LJP model is loading'
+        elif model_exists:
+            message = 'LJP model available, not yet loaded'
+        else:
+            message = 'LJP model needs to be trained'
         
         return jsonify({
             'success': True,
             'status': 'available' if model_exists else 'model_missing',
+            'ready': ready,
+            'load_state': load_status['state'],
+            'load_seconds': load_status['load_seconds'],
+            'load_error': load_status['error'],
             'model_exists': model_exists,
-            'model_path': str(model_path),
-            'message': 'LJP service ready' if model_exists else 'LJP model needs to be trained'
+            'engine_exists': engine_exists,
+            'model_path': str(LJP_MODEL_PATH),
+            'message': message
         })
     
     except Exception as e:
@@ -550,10 +967,226 @@ def ljp_status():
             'message': f'LJP status check failed: {str(e)}'
         }), 500
 
+@app.route('/api/cases/<case_id>/citing', methods=['GET'])
+@require_auth
+def citing_cases(case_id):
+    """Cases citing a DI case, most authoritative first"""
+    try:
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = min(max(1, request.args.get('limit', 20, type=int)), 200)
+
+        import runtime
+        graph = runtime.load_citations()
+        if graph is None:
+            return jsonify({'error': 'Citation graph not built or out of date (run build_citations.py)'}), 503
+        row = runtime.load_case_rows().get(case_id)
+        if row is None:
+            return jsonify({'error': 'Case not found'}), 404
+        if row >= len(graph):
+            return jsonify({'error': 'Citation graph out of date (run build_citations.py)'}), 503
+
+        citing = graph.cited_by(row)
+        order = sorted(citing.tolist(), key=lambda r: (-float(graph.authority[r]), r))
+        cases = runtime.load_cases()
+        results = []
+        for r in order[offset:offset + limit]:
+            case = cases[r]
+            results.append({
+                'case_id': case.get('case_id'),
+                'title': case.get('title', ''),
+                'court': case.get('court', ''),
+                'date': case.get('date', ''),
+                'citation_authority': float(graph.authority[r]),
+                'cited_by': graph.in_degree(r)
+            })
+
+        return jsonify({
+            'success': True,
+            'case_id': case_id,
+            'citation_authority': float(graph.authority[row]),
+            'total': len(order),
+            'cites': len(graph.cites(row)),
+            'offset': offset,
+            'results': results
+        })
+
+    except Exception as e:
+        return jsonify({'error': f'Citation lookup failed: {str(e)}'}), 500
+
+@app.route('/api/analyze', methods=['POST'])
+@require_auth
+@admission.admit('analyze', analyze_cost)
+def analyze_all_endpoint():
+    """SCR, PCR and LJP for one text with a single encode and index search.
+
+    Body: {"query", "include": ["scr", "pcr", "ljp"], "k" (SCR), "pcr_k",
+    "top_k" (LJP), "explanation", "snippet_bytes", "sample_size", "filters" (SCR/PCR)}
+    """
+    try:
+        data = request.get_json() or {}
+        query = (data.get('query') or data.get('case_text') or '').strip()
+        include = data.get('include') or ['scr', 'pcr', 'ljp']
+        
+        if not query:
+            return jsonify({'error': 'Query text is required'}), 400
+        unknown = set(include) - {'scr', 'pcr', 'ljp'}
+        if unknown:
+            return jsonify({'error': f'Unknown analyses: {", ".join(sorted(unknown))}. Use scr, pcr or ljp'}), 400
+        
+        analyze_all = get_analyze_function()
+        if not analyze_all:
+            return jsonify({'error': 'Analysis service not available'}), 503
+        
+        # LJP is optional here: report why it was skipped instead of failing the request
+        ljp_assets, ljp_error = None, None
+        if 'ljp' in include:
+            if len(query) < 50:
+                ljp_error = 'Case text too short for LJP (minimum 50 characters).'
+            else:
+                try:
+                    ljp_assets = model_registry.get('ljp')
+                except Exception as e:
+                    ljp_error = f'LJP model not available: {str(e)}'
+        
+        opts = {key: data[key] for key in ('snippet_bytes', 'sample_size') if key in data}
+        if normalize_filters(data.get('filters')):
+            opts['filters'] = data['filters']
+        out = analyze_all(
+            query,
+            include=include,
+            k=data.get('k', 10),
+            pcr_k=data.get('pcr_k', 5),
+            top_k=data.get('top_k', 5),
+            ljp_assets=ljp_assets,
+            explanation=bool(data.get('explanation', False)),
+            **opts
+        )
+        
+        response = {'success': True, 'query': query, 'search_depth': out['search_depth']}
+        if 'scr' in out:
+            response['scr'] = out['scr']
+        if 'pcr' in out:
+            response['pcr'] = out['pcr']
+        if 'ljp' in out:
+            result = out['ljp']
+            response['ljp'] = {
+                'prediction': result['prediction'],
+                'probability': result['probability'],
+                'explanation': {
+                    'neighbor_influence': result['neighbor_influence_delta'],
+                    'prob_without_neighbors': result['prob_without_neighbors'],
+                    'evidence': result['evidence']
+                }
+            }
+        elif ljp_error:
+            response['ljp'] = {'error': ljp_error}
+        
+        return jsonify(response)
+    
+    except FilterError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
+
+def run_file_analysis(user_id: int, file_id: int, analysis_type: str = 'scr', k: int = 10) -> Dict[str, Any]:
+    """Run SCR or PCR on the text extracted from an uploaded file.
+
+    Shared by the synchronous /api/analyze-file route and the job queue.
+    Raises JobError for client-side problems.
+    """
+    # Get file info
+    cursor = db.get_connection().cursor()
+    cursor.execute(
+        'SELECT filename, file_type, content_hash, processed FROM user_files WHERE id = ? AND user_id = ?',
+        (file_id, user_id)
+    )
+    file_info = cursor.fetchone()
+    
+    if not file_info:
+        raise JobError('File not found', 404)
+    
+    filename, file_type, content_hash, is_processed = file_info
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    
+    # Files uploaded before the extract cache existed have no hash yet
+    if not content_hash:
+        content_hash = hash_file(file_path)
+    
+    # Reuse the text extracted at upload time
+    extract = get_file_extract(file_path, file_type, content_hash)
+    if not extract['processed']['success']:
+        raise JobError(extract['processed']['error'], 400)
+    if not is_processed:
+        mark_file_processed(file_id, content_hash)
+    
+    query_text = extract['query_text']
+    if not query_text:
+        raise JobError('Could not extract analyzable text from file', 400)
+    
+    query_preview = query_text[:500] + "..." if len(query_text) > 500 else query_text
+    
+    # Perform analysis
+    if analysis_type == 'scr':
+        retrieve_similar_cases = get_scr_functions()
+        if not retrieve_similar_cases:
+            raise JobError('SCR service not available', 503)
+        results = retrieve_similar_cases(query_text, k=k)
+    elif analysis_type == 'pcr':
+        recommend_precedents, _ = get_pcr_functions()
+        if not recommend_precedents:
+            raise JobError('PCR service not available', 503)
+        results = recommend_precedents(query_text, k=k)
+    else:
+        raise JobError('Invalid analysis type. Use "scr" or "pcr"', 400)
+    
+    return {
+        'success': True,
+        'analysis_type': analysis_type,
+        'file_id': file_id,
+        'query_preview': query_preview,
+        'results': results,
+        'count': len(results)
+    }
+
+def _analyze_file_job(user_id, params):
+    return run_file_analysis(user_id, params['file_id'], params.get('type', 'scr'), params.get('k', 10))
+
+def _scr_job(user_id, params):
+    retrieve_similar_cases = get_scr_functions()
+    if not retrieve_similar_cases:
+        raise JobError('SCR service not available', 503)
+    results = retrieve_similar_cases(params['query'], k=params.get('k', 10), filters=params.get('filters'),
+                                     mode=params.get('mode', 'dense'))
+    return {'success': True, 'query': params['query'], 'results': results, 'count': len(results)}
+
+def _pcr_job(user_id, params):
+    recommend_precedents, _ = get_pcr_functions()
+    if not recommend_precedents:
+        raise JobError('PCR service not available', 503)
+    results = recommend_precedents(params['query'], k=params.get('k', 5), filters=params.get('filters'),
+                                   mode=params.get('mode', 'dense'))
+    return {'success': True, 'query': params['query'], 'results': results, 'count': len(results)}
+
+job_queue = JobQueue(DB_PATH)
+job_queue.init_schema()
+job_queue.register('analyze-file', _analyze_file_job)
+job_queue.register('scr', _scr_job)
+job_queue.register('pcr', _pcr_job)
+
+def _job_accepted(job_id, deduplicated):
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'deduplicated': deduplicated,
+        'status_url': f'/api/jobs/{job_id}',
+        'result_url': f'/api/jobs/{job_id}/result'
+    }), 202
+
 @app.route('/api/analyze-file', methods=['POST'])
 @require_auth
+@admission.admit('analyze-file', analyze_file_cost)
 def analyze_file():
-    """Analyze uploaded file with SCR or PCR"""
+    """Analyze uploaded file with SCR or PCR (pass "async": true to queue a job)"""
     try:
         data = request.get_json()
         file_id = data.get('file_id')
@@ -563,90 +1196,162 @@ def analyze_file():
         if not file_id:
             return jsonify({'error': 'File ID is required'}), 400
         
-        # Get file info
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT filename, file_type FROM user_files WHERE id = ? AND user_id = ?',
-            (file_id, request.user['user_id'])
-        )
-        file_info = cursor.fetchone()
-        conn.close()
-        
-        if not file_info:
-            return jsonify({'error': 'File not found'}), 404
+        if data.get('async'):
+            params = {'file_id': file_id, 'type': analysis_type, 'k': k}
+            job_id, deduplicated = job_queue.submit(request.user['user_id'], 'analyze-file', params)
+            return _job_accepted(job_id, deduplicated)
         
-        filename, file_type = file_info
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        return jsonify(run_file_analysis(request.user['user_id'], file_id, analysis_type, k))
+    
+    except JobError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        return jsonify({'error': f'File analysis failed: {str(e)}'}), 500
+
+# Background job routes
+@app.route('/api/jobs', methods=['POST'])
+@require_auth
+def submit_job():
+    """Queue a long-running analysis: {"type": "analyze-file"|"scr"|"pcr", ...params}"""
+    try:
+        data = request.get_json() or {}
+        kind = data.get('type', '')
         
-        # Process file to extract text
-        processed = process_uploaded_file(file_path, file_type)
-        if not processed['success']:
-            return jsonify({'error': processed['error']}), 400
-        
-        # Extract text for analysis
-        query_text = ""
-        if processed['type'] in ['text', 'pdf_text']:
-            query_text = processed['text']
-        elif processed['type'] in ['json']:
-            # Try to extract text from JSON structure
-            json_data = processed['data']
-            if isinstance(json_data, dict):
-                # Look for common text fields
-                for field in ['text', 'content', 'description', 'summary', 'raw_text']:
-                    if field in json_data:
-                        query_text = str(json_data[field])
-                        break
-                if not query_text:
-                    query_text = json.dumps(json_data)[:5000]  # Use first 5000 chars
-        elif processed['type'] in ['csv', 'excel']:
-            # Convert structured data to text for analysis
-            if processed['data']:
-                query_text = str(processed['data'][:5])  # First 5 rows as text
-        
-        if not query_text:
-            return jsonify({'error': 'Could not extract analyzable text from file'}), 400
-        
-        # Limit text length for analysis
-        query_text = query_text[:10000]  # First 10k characters
-        
-        # Perform analysis
-        if analysis_type == 'scr':
-            retrieve_similar_cases = get_scr_functions()
-            if not retrieve_similar_cases:
-                return jsonify({'error': 'SCR service not available'}), 503
-            results = retrieve_similar_cases(query_text, k=k)
-            return jsonify({
-                'success': True,
-                'analysis_type': 'scr',
-                'file_id': file_id,
-                'query_preview': query_text[:500] + "..." if len(query_text) > 500 else query_text,
-                'results': results,
-                'count': len(results)
-            })
-        elif analysis_type == 'pcr':
-            recommend_precedents, _ = get_pcr_functions()
-            if not recommend_precedents:
-                return jsonify({'error': 'PCR service not available'}), 503
-            results = recommend_precedents(query_text, k=k)
-            return jsonify({
-                'success': True,
-                'analysis_type': 'pcr',
-                'file_id': file_id,
-                'query_preview': query_text[:500] + "..." if len(query_text) > 500 else query_text,
-                'results': results,
-                'count': len(results)
-            })
+        if kind == 'analyze-file':
+            if not data.get('file_id'):
+                return jsonify({'error': 'File ID is required'}), 400
+            params = {
+                'file_id': data['file_id'],
+                'type': data.get('analysis_type', 'scr'),
+                'k': data.get('k', 10)
+            }
+        elif kind in ('scr', 'pcr'):
+            query = data.get('query', '').strip()
+            if not query:
+                return jsonify({'error': 'Query text is required'}), 400
+            params = {'query': query, 'k': data.get('k', 10 if kind == 'scr' else 5)}
+            if normalize_filters(data.get('filters')):
+                params['filters'] = data['filters']
+            mode_error = retrieval_mode_error(data)
+            if mode_error:
+                return mode_error
+            if data.get('mode', 'dense') != 'dense':
+                params['mode'] = data['mode']
         else:
-            return jsonify({'error': 'Invalid analysis type. Use "scr" or "pcr"'}), 400
+            return jsonify({'error': 'Invalid job type. Use "analyze-file", "scr" or "pcr"'}), 400
+        
+        job_id, deduplicated = job_queue.submit(request.user['user_id'], kind, params)
+        return _job_accepted(job_id, deduplicated)
     
+    except JobError as e:
+        return jsonify({'error': str(e)}), e.status
+    except FilterError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': f'File analysis failed: {str(e)}'}), 500
+        return jsonify({'error': f'Failed to submit job: {str(e)}'}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@require_auth
+def job_status(job_id):
+    try:
+        job = job_queue.get(job_id, request.user['user_id'])
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        job.pop('result')
+        return jsonify({'success': True, **job})
+    
+    except Exception as e:
+        return jsonify({'error': f'Failed to get job status: {str(e)}'}), 500
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+@require_auth
+def job_result(job_id):
+    try:
+        job = job_queue.get(job_id, request.user['user_id'])
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        if job['status'] == 'failed':
+            return jsonify({'error': job['error'], 'job_id': job_id, 'status': job['status']}), job['error_status'] or 500
+        if job['status'] != 'done':
+            return jsonify({'success': True, 'job_id': job_id, 'status': job['status']}), 202
+        
+        return jsonify(job['result'])
+    
+    except Exception as e:
+        return jsonify({'error': f'Failed to get job result: {str(e)}'}), 500
+
+@app.route('/api/encoder/stats', methods=['GET'])
+def encoder_stats():
+    """Batch-size histogram and queue wait of the micro-batching searcher"""
+    import runtime
+    if not runtime.BATCHING or not runtime.is_loaded('load_searcher'):
+        return jsonify({'success': True, 'batching': runtime.BATCHING, 'stats': None})
+    return jsonify({'success': True, 'batching': True, 'stats': runtime.load_searcher().stats()})
+
+@app.route('/api/admission', methods=['GET'])
+@require_auth
+def admission_status():
+    """Capacity, queue depth and quota settings of the limited endpoints (this worker)"""
+    return jsonify({'success': True, **admission.status()})
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text-format metrics for this worker process"""
+    token = os.environ.get('ADVOCA_METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Invalid metrics token'}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Profiles of individual requests (see profiler.py)
+def require_profile_token(f):
+    """Decorator for the profile admin routes (ADVOCA_PROFILE_TOKEN)"""
+    def decorated(*args, **kwargs):
+        if not profiler.is_authorized(request):
+            return jsonify({'error': 'Profile access denied'}), 403
+        return f(*args, **kwargs)
+    
+    decorated.__name__ = f.__name__
+    return decorated
+
+@app.route('/api/admin/profiles', methods=['GET'])
+@require_profile_token
+def list_profiles():
+    profiles = profiler.list_profiles()
+    return jsonify({'success': True, 'profiles': profiles, 'count': len(profiles)})
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+@require_profile_token
+def get_profile(profile_id):
+    """Profile summary, or the folded stacks with ?format=folded"""
+    try:
+        folded = request.args.get('format') == 'folded'
+        profile = profiler.load_profile(profile_id, folded=folded)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    if folded:
+        return Response(profile, mimetype='text/plain')
+    return jsonify({'success': True, 'profile': profile})
 
 # Health check
 @app.route('/api/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'healthy', 'timestamp': datetime.utcnow().isoformat()})
+    return jsonify({'status': 'healthy', 'ready': startup.is_ready(), 'timestamp': datetime.utcnow().isoformat()})
+
+@app.route('/api/health/live', methods=['GET'])
+def health_live():
+    """Liveness: the process is up and serving HTTP"""
+    return jsonify({'status': 'live', 'pid': os.getpid(), 'timestamp': datetime.utcnow().isoformat()})
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness: assets loaded and warm-up done (503 until then), with per-asset load times"""
+    start_runtime()  # a process started without preload loads on the first probe
+    status = startup.status()
+    return jsonify({'status': 'ready' if status['ready'] else 'starting', **status}), 200 if status['ready'] else 503
 
 if __name__ == '__main__':
     print("Starting AdvocaDabra Backend Server...")
@@ -657,4 +1362,9 @@ if __name__ == '__main__':
     print("File Upload System - Ready")
     print("\nServer running on http://localhost:8000")
     
+    # Load assets and warm up in the background; /api/health/ready reports progress.
+    # Under the reloader only the serving child process warms up.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_runtime()
+    
     app.run(debug=True, host='0.0.0.0', port=8000)
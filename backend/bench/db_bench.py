@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Concurrent read/write benchmark for the SQLite data layer.
+
+Compares the legacy pattern (new sqlite3.connect per operation, rollback
+journal, no index) with db.py (per-thread pooled connections, WAL, tuned
+pragmas, user_files index). Each thread runs a list_files-style query or an
+upload-style insert, mixed by --write-ratio.
+
+    python bench/db_bench.py --threads 16 --ops 500 --write-ratio 0.2
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+
+
+SCHEMA = '''
+    CREATE TABLE user_files (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        filename TEXT NOT NULL,
+        original_name TEXT NOT NULL,
+        file_type TEXT NOT NULL,
+        upload_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        processed BOOLEAN DEFAULT FALSE
+    )
+'''
+LIST_SQL = '''
+    SELECT id, filename, original_name, file_type, upload_time, processed
+    FROM user_files WHERE user_id = ? ORDER BY upload_time DESC
+'''
+INSERT_SQL = 'INSERT INTO user_files (user_id, filename, original_name, file_type) VALUES (?, ?, ?, ?)'
+
+
+def seed(path, rows, users, pooled):
+    conn = db.connect(path) if pooled else sqlite3.connect(path)
+    conn.execute(SCHEMA)
+    if pooled:
+        conn.execute('CREATE INDEX idx_user_files_user_time ON user_files (user_id, upload_time)')
+    conn.executemany(INSERT_SQL, [(i % users, f"f{i}.pdf", f"f{i}.pdf", "pdf") for i in range(rows)])
+    conn.commit()
+    conn.close()
+
+
+def legacy_op(path, write, user_id):
+    conn = sqlite3.connect(path)
+    try:
+        if write:
+            conn.execute(INSERT_SQL, (user_id, "new.pdf", "new.pdf", "pdf"))
+            conn.commit()
+        else:
+            conn.execute(LIST_SQL, (user_id,)).fetchall()
+    finally:
+        conn.close()
+
+
+def pooled_op(path, write, user_id):
+    if write:
+        with db.transaction(path) as conn:
+            conn.execute(INSERT_SQL, (user_id, "new.pdf", "new.pdf", "pdf"))
+    else:
+        db.get_connection(path).execute(LIST_SQL, (user_id,)).fetchall()
+
+
+def run(label, op, path, args):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(seed_):
+        rng = random.Random(seed_)
+        local_lat, local_err = [], 0
+        for _ in range(args.ops):
+            write = rng.random() < args.write_ratio
+            t0 = time.perf_counter()
+            try:
+                op(path, write, rng.randrange(args.users))
+            except sqlite3.OperationalError:
+                local_err += 1
+            local_lat.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local_lat)
+            errors.append(local_err)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(f"{label:8s} ops/s={len(latencies) / elapsed:9.1f}  p50={pct(0.50):7.2f}ms  "
+          f"p95={pct(0.95):7.2f}ms  p99={pct(0.99):7.2f}ms  locked_errors={sum(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite data layer benchmark")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=500, help="Operations per thread")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--rows", type=int, default=50000, help="Seed rows in user_files")
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        pooled_path = os.path.join(tmp, "pooled.db")
+        seed(legacy_path, args.rows, args.users, pooled=False)
+        seed(pooled_path, args.rows, args.users, pooled=True)
+
+        print(f"{args.threads} threads x {args.ops} ops, write ratio {args.write_ratio}, {args.rows} rows")
+        run("legacy", legacy_op, legacy_path, args)
+        run("pooled", pooled_op, pooled_path, args)
+
+
+if __name__ == "__main__":
+    main()
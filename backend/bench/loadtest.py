@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the API against a synthetic corpus.
+
+Starts the server on the corpus from bench/synth_corpus.py with the hash
+encoder (or targets an already running server with --url), signs up a user,
+then drives /api/scr, /api/pcr, /api/ljp/predict and /api/upload from
+--concurrency client threads for --duration seconds after a warm-up. Reports
+latency percentiles, throughput and errors per endpoint, plus server RSS.
+With --out the report is saved as JSON together with the git revision, so
+runs on different commits can be compared.
+
+    python bench/synth_corpus.py --out /tmp/advoca_bench --cases 5000
+    python bench/loadtest.py --data /tmp/advoca_bench --concurrency 8 --duration 30
+    python bench/loadtest.py --data /tmp/advoca_bench --server gunicorn --workers 2 --threads 8
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = "scr=4,pcr=3,ljp=2,upload=1"
+
+
+# ---------------- HTTP ---------------- #
+
+class Client:
+    """One keep-alive connection per thread; reconnects when the server closes it."""
+
+    def __init__(self, base_url, token=None, timeout=120):
+        url = urlparse(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.token = token
+        self.timeout = timeout
+        self.conn = None
+        self.retry_after = None  # Retry-After of the last response
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                resp = self.conn.getresponse()
+                data = resp.read()
+                self.retry_after = resp.getheader("Retry-After")
+                if resp.getheader("Connection", "").lower() == "close":
+                    self.close()
+                return resp.status, data
+            except (http.client.HTTPException, ConnectionError, OSError):
+                self.close()
+                if attempt:
+                    raise
+
+    def post_json(self, path, payload):
+        return self.request("POST", path, json.dumps(payload).encode("utf-8"),
+                            {"Content-Type": "application/json"})
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def multipart(field, filename, content, content_type="text/plain"):
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: {content_type}\r\n\r\n").encode("utf-8") + content + f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return body, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+# ---------------- WORKLOAD ---------------- #
+
+def load_workload(data_dir, n_uploads=50, seed=0):
+    with open(os.path.join(data_dir, "queries.jsonl"), encoding="utf-8") as f:
+        queries = [json.loads(line)["query"] for line in f]
+    rng = random.Random(seed)
+    docs = []
+    with open(os.path.join(data_dir, "di_dataset.jsonl"), encoding="utf-8") as f:
+        for line in f:
+            docs.append(json.loads(line)["raw_text"])
+            if len(docs) >= n_uploads * 4:
+                break
+    uploads = [rng.choice(docs).encode("utf-8") for _ in range(n_uploads)]
+    return queries, uploads
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(OPS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def op_scr(client, rng, work, args):
+    return client.post_json("/api/scr", {"query": rng.choice(work["queries"]), "k": args.k})
+
+
+def op_pcr(client, rng, work, args):
+    return client.post_json("/api/pcr", {"query": rng.choice(work["queries"]), "k": args.k})
+
+
+def op_scr_hybrid(client, rng, work, args):
+    return client.post_json("/api/scr", {"query": rng.choice(work["queries"]), "k": args.k, "mode": "hybrid"})
+
+
+def op_pcr_hybrid(client, rng, work, args):
+    return client.post_json("/api/pcr", {"query": rng.choice(work["queries"]), "k": args.k, "mode": "hybrid"})
+
+
+def op_ljp(client, rng, work, args):
+    return client.post_json("/api/ljp/predict", {"case_text": rng.choice(work["queries"]), "top_k": 5})
+
+
+def op_analyze(client, rng, work, args):
+    return client.post_json("/api/analyze", {"query": rng.choice(work["queries"]), "k": args.k})
+
+
+def op_upload(client, rng, work, args):
+    body, headers = multipart("file", "bench.txt", rng.choice(work["uploads"]))
+    return client.request("POST", "/api/upload", body, headers)
+
+
+OPS = {"scr": op_scr, "pcr": op_pcr, "scr_hybrid": op_scr_hybrid, "pcr_hybrid": op_pcr_hybrid,
+       "ljp": op_ljp, "analyze": op_analyze, "upload": op_upload}
+
+
+# ---------------- SERVER ---------------- #
+
+def server_env(data_dir, workdir):
+    with open(os.path.join(data_dir, "corpus.json"), encoding="utf-8") as f:
+        corpus = json.load(f)
+    env = dict(os.environ)
+    env.update({
+        "ADVOCA_DATA_DIR": corpus["data_dir"],
+        "ADVOCA_DI_PATH": corpus["di_path"],
+        "ADVOCA_LJP_ENGINE_DIR": corpus["ljp_engine_dir"],
+        "ADVOCA_ENCODER": "hash",
+        "ADVOCA_HASH_DIM": str(corpus["dim"]),
+        "ADVOCA_DB_PATH": os.path.join(workdir, "users.db"),
+        "PYTHONPATH": BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+        "PYTHONUNBUFFERED": "1",
+    })
+    # the driver is a single user; its quota would cap the whole run
+    env.setdefault("ADVOCA_USER_RATE", "0")
+    return env, corpus
+
+
+def start_server(args, workdir):
+    env, corpus = server_env(args.data, workdir)
+    bind = f"127.0.0.1:{args.port}"
+    if args.server == "gunicorn":
+        cmd = [sys.executable, os.path.join(BACKEND_DIR, "serve.py"), "--bind", bind,
+               "--workers", str(args.workers), "--threads", str(args.threads)]
+    else:
+        cmd = [sys.executable, "-c",
+               "import backend_server as s; s.preload_runtime(); "
+               f"s.app.run(host='127.0.0.1', port={args.port}, threaded=True, use_reloader=False)"]
+    log = open(os.path.join(workdir, "server.log"), "wb")
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return proc, corpus
+
+
+def wait_ready(base_url, proc, timeout):
+    deadline = time.time() + timeout
+    client = Client(base_url, timeout=5)
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise SystemExit(f"Server exited with code {proc.returncode}; see server.log")
+        try:
+            status, _ = client.request("GET", "/api/health/ready")
+            if status == 404:  # server predating the readiness endpoint
+                status, _ = client.request("GET", "/api/health")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"Server not ready after {timeout}s")
+
+
+def process_tree_rss(pid):
+    """RSS of a process and its descendants from /proc (Linux only)."""
+    total = 0
+    stack = [pid]
+    while stack:
+        p = stack.pop()
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for task in os.listdir(f"/proc/{p}/task"):
+                with open(f"/proc/{p}/task/{task}/children") as f:
+                    stack.extend(int(c) for c in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+def scraped_rss(client):
+    """Sum of advoca_process_resident_memory_bytes per worker pid seen on /api/metrics."""
+    try:
+        status, data = client.request("GET", "/api/metrics")
+    except OSError:
+        return None
+    if status != 200:
+        return None
+    per_pid = {}
+    for m in re.finditer(r'^advoca_process_resident_memory_bytes\{pid="(\d+)"\} (\d+)', data.decode(), re.M):
+        per_pid[m.group(1)] = int(m.group(2))
+    return sum(per_pid.values()) or None
+
+
+# ---------------- DRIVER ---------------- #
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def run_load(base_url, token, work, mix, args, rss_fn):
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    records = []
+    lock = threading.Lock()
+    start_measure = time.perf_counter() + args.warmup
+    stop_at = start_measure + args.duration
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = Client(base_url, token)
+        local = []
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                break
+            name = rng.choices(names, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                status, data = OPS[name](client, rng, work, args)
+                size = len(data)
+            except OSError:
+                status, size = 0, 0
+            t1 = time.perf_counter()
+            if t0 >= start_measure:
+                local.append((name, t1 - t0, status, size, is_shed(status, client.retry_after)))
+        client.close()
+        with lock:
+            records.extend(local)
+
+    rss_samples = []
+    sampling = threading.Event()
+
+    def sample_rss():
+        while not sampling.wait(0.5):
+            rss = rss_fn()
+            if rss:
+                rss_samples.append(rss)
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    threads = [threading.Thread(target=worker, args=(args.seed * 1000 + i,)) for i in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    sampling.set()
+    sampler.join()
+    return records, rss_samples
+
+
+def is_shed(status, retry_after):
+    """Admission control rejections (429/503 with Retry-After), as opposed to failures."""
+    return status in (429, 503) and retry_after is not None
+
+
+def summarize(records, duration):
+    report = {}
+    for name in sorted({r[0] for r in records}) + ["all"]:
+        rows = records if name == "all" else [r for r in records if r[0] == name]
+        ok = sorted(r[1] for r in rows if 200 <= r[2] < 300)
+        ms = lambda v: round(v * 1000, 2) if v is not None else None
+        report[name] = {
+            "requests": len(rows),
+            "errors": sum(1 for r in rows if not 200 <= r[2] < 300 and not r[4]),
+            "shed": sum(1 for r in rows if r[4]),
+            "throughput_rps": round(len(ok) / duration, 2),
+            "p50_ms": ms(percentile(ok, 0.50)),
+            "p90_ms": ms(percentile(ok, 0.90)),
+            "p99_ms": ms(percentile(ok, 0.99)),
+            "max_ms": ms(ok[-1] if ok else None),
+            "mean_ms": ms(sum(ok) / len(ok) if ok else None),
+            "mean_bytes": round(sum(r[3] for r in rows) / len(rows)) if rows else 0,
+        }
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API load test on a synthetic corpus")
+    parser.add_argument("--data", required=True, help="Directory written by bench/synth_corpus.py")
+    parser.add_argument("--url", help="Target a running server instead of starting one")
+    parser.add_argument("--server", choices=["flask", "gunicorn"], default="flask")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="Gunicorn workers")
+    parser.add_argument("--threads", type=int, default=8, help="Gunicorn threads per worker")
+    parser.add_argument("--concurrency", type=int, default=8, help="Client threads")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted operations, e.g. scr=1,pcr=1")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ready-timeout", type=float, default=180)
+    parser.add_argument("--out", help="Write the JSON report here")
+    parser.add_argument("--keep-workdir", action="store_true")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    queries, uploads = load_workload(args.data, seed=args.seed)
+    work = {"queries": queries, "uploads": uploads}
+
+    workdir = tempfile.mkdtemp(prefix="advoca_load_")
+    proc = None
+    try:
+        if args.url:
+            base_url = args.url.rstrip("/")
+            with open(os.path.join(args.data, "corpus.json"), encoding="utf-8") as f:
+                corpus = json.load(f)
+        else:
+            proc, corpus = start_server(args, workdir)
+            base_url = f"http://127.0.0.1:{args.port}"
+        t0 = time.time()
+        wait_ready(base_url, proc, args.ready_timeout)
+        startup = time.time() - t0
+        print(f"Server ready at {base_url} ({startup:.1f}s)")
+
+        client = Client(base_url)
+        email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+        status, data = client.post_json("/api/auth/signup", {"email": email, "password": "bench", "name": "Bench"})
+        if status != 200:
+            raise SystemExit(f"Signup failed: {status} {data[:200]!r}")
+        token = json.loads(data)["token"]
+
+        rss_idle = process_tree_rss(proc.pid) if proc else scraped_rss(client)
+        rss_fn = (lambda: process_tree_rss(proc.pid)) if proc else (lambda: scraped_rss(Client(base_url)))
+
+        print(f"Running {args.mix} with {args.concurrency} clients: {args.warmup}s warm-up, {args.duration}s measured")
+        records, rss_samples = run_load(base_url, token, work, mix, args, rss_fn)
+        report = {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "corpus": {k: corpus.get(k) for k in ("cases", "text_kb", "dim", "seed")},
+            "config": {k: getattr(args, k) for k in ("server", "workers", "threads", "concurrency",
+                                                     "duration", "warmup", "mix", "k", "seed")},
+            "startup_seconds": round(startup, 2),
+            "rss_idle_mb": round(rss_idle / 2 ** 20, 1) if rss_idle else None,
+            "rss_peak_mb": round(max(rss_samples) / 2 ** 20, 1) if rss_samples else None,
+            "endpoints": summarize(records, args.duration),
+        }
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if args.keep_workdir:
+            print(f"Server workdir kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'endpoint':10s} {'reqs':>7s} {'errs':>5s} {'shed':>5s} {'rps':>8s} {'p50':>9s} {'p90':>9s} {'p99':>9s} {'bytes':>9s}")
+    for name, row in report["endpoints"].items():
+        fmt = lambda v: f"{v:7.1f}ms" if v is not None else "      n/a"
+        print(f"{name:10s} {row['requests']:7d} {row['errors']:5d} {row['shed']:5d} {row['throughput_rps']:8.1f} "
+              f"{fmt(row['p50_ms'])} {fmt(row['p90_ms'])} {fmt(row['p99_ms'])} {row['mean_bytes']:9d}")
+    print(f"\nRSS idle {report['rss_idle_mb']} MB, peak {report['rss_peak_mb']} MB; revision {report['revision']}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Serialisation CPU and bytes-on-the-wire for SCR/PCR-shaped responses.
+
+Builds synthetic payloads shaped like /api/scr (full summary per hit) and
+/api/pcr with sample_size=None (full opinions), then serves them through a
+Flask app twice: once with Flask's default JSON provider and no compression,
+and once with fast_json + compression as configured in backend_server.
+
+    python bench/payload_bench.py --k 50 --text-kb 8 --repeat 20
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from flask import Flask, jsonify
+
+from fast_json import FastJSONProvider
+from compression import init_compression
+
+
+WORDS = ("court plaintiff defendant appeal judgment contract trademark statute "
+         "evidence jury verdict opinion held reversed affirmed damages motion").split()
+
+
+def fake_text(rng, kb):
+    words = []
+    size = 0
+    while size < kb * 1024:
+        w = rng.choice(WORDS)
+        words.append(w)
+        size += len(w) + 1
+    return " ".join(words)
+
+
+def scr_payload(rng, k, kb):
+    return {
+        "success": True,
+        "query": "trademark infringement likelihood of confusion",
+        "results": [{
+            "case_id": str(1000 + i),
+            "score": np.float32(rng.random()),     # NumPy scalars as produced by FAISS
+            "text_sample": fake_text(rng, kb),
+            "title": f"Case {i} v. Example",
+            "court": "Court of Appeals",
+            "date": "1950-01-01",
+        } for i in range(k)],
+        "count": k,
+    }
+
+
+def pcr_payload(rng, k, kb):
+    return {
+        "success": True,
+        "query": "trademark infringement likelihood of confusion",
+        "results": [{
+            "case_id": str(2000 + i),
+            "similarity": np.float32(rng.random()),
+            "precedent_strength": 4.0,
+            "reasoning_depth": 3.5,
+            "keyword_bonus": 1.0,
+            "final_score": np.float64(rng.random() * 3),
+            "sample": fake_text(rng, kb * 4),      # full opinions are much longer
+            "title": f"Precedent {i} v. Example",
+            "court": "Supreme Court",
+            "date": "1960-01-01",
+        } for i in range(k)],
+        "count": k,
+    }
+
+
+def to_builtin(obj):
+    """The default provider cannot encode NumPy scalars; convert as the old code had to."""
+    if isinstance(obj, dict):
+        return {k: to_builtin(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [to_builtin(v) for v in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def make_app(fast, payloads):
+    app = Flask(f"bench_{'fast' if fast else 'default'}")
+    if fast:
+        app.json = FastJSONProvider(app)
+        init_compression(app)
+
+    @app.route("/<name>")
+    def serve(name):
+        payload = payloads[name]
+        return jsonify(payload if fast else to_builtin(payload))
+
+    return app
+
+
+def measure(app, name, repeat, accept_encoding):
+    client = app.test_client()
+    headers = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+    t0 = time.process_time()
+    for _ in range(repeat):
+        resp = client.get(f"/{name}", headers=headers)
+    cpu_ms = (time.process_time() - t0) * 1000 / repeat
+    return cpu_ms, len(resp.get_data()), resp.headers.get("Content-Encoding", "identity")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SCR/PCR payload serialisation benchmark")
+    parser.add_argument("--k", type=int, default=50, help="Results per response")
+    parser.add_argument("--text-kb", type=int, default=8, help="KB of text per SCR hit (PCR uses 4x)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    payloads = {"scr": scr_payload(rng, args.k, args.text_kb), "pcr": pcr_payload(rng, args.k, args.text_kb)}
+    baseline = make_app(False, payloads)
+    fast = make_app(True, payloads)
+
+    print(f"k={args.k}, {args.text_kb} KB per SCR hit, {args.repeat} requests each")
+    print(f"{'endpoint':8s} {'variant':22s} {'cpu/req':>10s} {'bytes':>12s}  encoding")
+    for name in ("scr", "pcr"):
+        rows = [
+            ("default jsonify", baseline, None),
+            ("fast json", fast, None),
+            ("fast json + gzip", fast, "gzip"),
+            ("fast json + br", fast, "br, gzip"),
+        ]
+        for label, app, enc in rows:
+            cpu_ms, size, used = measure(app, name, args.repeat, enc)
+            print(f"{name:8s} {label:22s} {cpu_ms:8.2f}ms {size:12,d}  {used}")
+
+
+if __name__ == "__main__":
+    main()
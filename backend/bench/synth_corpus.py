@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Synthetic DI corpus for offline benchmarks.
+
+Writes a deterministic (seeded) corpus shaped like utils/preproc.py output
+plus every artifact the API loads, so the server can run without the e5
+model or the private dataset:
+
+    <out>/di_dataset.jsonl             cases (case_id, title, court, raw_text, citations, ...)
+    <out>/embeddings/embeddings.npy    hash-encoder embeddings (see hash_encoder.py)
+    <out>/embeddings/metadata.joblib
+    <out>/embeddings/faiss.index       IndexFlatIP over L2-normalised rows
+    <out>/embeddings/snippets/         sentence offsets (build_snippets.py)
+    <out>/embeddings/filters/          court/jurisdiction/date columns (build_case_filters.py)
+    <out>/embeddings/lexical/          BM25 inverted index (build_lexical.py)
+    <out>/embeddings/citations/        citation graph and authority scores (build_citations.py)
+    <out>/ljp_engine/                  random-weight LJP engine with the real input shape
+    <out>/queries.jsonl                topical queries for the load driver
+    <out>/corpus.json                  parameters, incl. the encoder dimension
+
+    python bench/synth_corpus.py --out /tmp/advoca_bench --cases 5000
+    python bench/loadtest.py --data /tmp/advoca_bench
+"""
+import os
+import sys
+import json
+import time
+import types
+import random
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import joblib
+import faiss
+
+from hash_encoder import HashEncoder
+from ljp_engine import export_mlp
+
+
+COURTS = [
+    ("Supreme Court of the United States", "United States"),
+    ("New York Court of Appeals", "New York"),
+    ("Appellate Division of the Supreme Court of New York", "New York"),
+    ("United States Court of Appeals for the Second Circuit", "United States"),
+    ("Illinois Circuit Court", "Illinois"),
+    ("United States District Court for the Southern District of New York", "United States"),
+    ("California Superior Court", "California"),
+    ("Massachusetts Trial Court", "Massachusetts"),
+]
+REPORTERS = ["U.S.", "N.Y.", "A.D.", "F.2d", "Ill.", "F. Supp.", "Cal.", "Mass."]
+
+LEGAL_WORDS = """
+    plaintiff defendant appellant respondent court judgment appeal contract statute evidence
+    jury verdict opinion damages motion trial liability negligence claim breach agreement
+    property title deed lease tenant landlord estate will trust executor testimony witness
+    record error instruction charge finding fact law equity injunction relief remedy order
+    decree petition complaint answer pleading demurrer sustained overruled affirmed reversed
+    remanded costs interest payment debt note mortgage lien sale goods delivery price
+    warranty fraud misrepresentation consideration performance duty standard care injury
+""".split()
+
+DEPTH_SENTENCES = [
+    "The question before the court is whether the {a} was bound by the {b}.",
+    "We hold that the {a} must answer for the {b}.",
+    "Our analysis of the {a} turns on the {b}.",
+    "As a matter of law the {a} cannot prevail on the {b}.",
+]
+PROCEDURAL_SENTENCES = ["Motion denied.", "Appeal dismissed.", "Leave to appeal denied."]
+SYLLABLES = "bar cel dor fen gal hin jor kel lum mar nor pel quin ros sal tor val wen yor zan".split()
+
+
+def topic_words(rng, n_topics, per_topic):
+    """Made-up words grouped into topics, so hash embeddings cluster by topic."""
+    topics = []
+    for _ in range(n_topics):
+        words = set()
+        while len(words) < per_topic:
+            words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))))
+        topics.append(sorted(words))
+    return topics
+
+
+def sentence(rng, topic, topic_share=0.4):
+    n = rng.randint(8, 20)
+    words = [rng.choice(topic) if rng.random() < topic_share else rng.choice(LEGAL_WORDS) for _ in range(n)]
+    return " ".join(words).capitalize() + "."
+
+
+def make_case(i, rng, topics, cites, text_kb):
+    topic = topics[rng.randrange(len(topics))]
+    court, jurisdiction = COURTS[rng.randrange(len(COURTS))]
+    plaintiff = f"{rng.choice(topic).title()} Co."
+    defendant = f"{rng.choice(topic).title()} {rng.choice(['Bank', 'Corp.', 'Trust', 'Mills'])}"
+    judge = rng.choice(topic).title()
+
+    parts = [f"Appeal from the {court}. Opinion by {judge}, J."]
+    size = len(parts[0])
+    target = int(text_kb * 1024 * rng.uniform(0.5, 1.5))
+    while size < target:
+        r = rng.random()
+        if r < 0.05:
+            s = rng.choice(DEPTH_SENTENCES).format(a=rng.choice(LEGAL_WORDS), b=rng.choice(topic))
+        elif r < 0.08 and i > 0:
+            s = f"See {cites[rng.randrange(i)]}."
+        elif r < 0.10:
+            s = "The trademark and the likelihood of confusion are in issue."
+        else:
+            s = sentence(rng, topic)
+        parts.append(s)
+        size += len(s) + 1
+    if rng.random() < 0.03:
+        parts.append(rng.choice(PROCEDURAL_SENTENCES))
+    parts.append(rng.choice(["Judgment affirmed.", "Judgment reversed.", "Bill dismissed."]))
+
+    return {
+        "case_id": str(100000 + i),
+        "title": f"{plaintiff} v. {defendant}",
+        "court": court,
+        "jurisdiction": jurisdiction,
+        "date": f"{rng.randint(1850, 2000)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "citations": [cites[i]],
+        "plaintiffs": [plaintiff],
+        "defendants": [defendant],
+        "parties": [f"{plaintiff} v. {defendant}"],
+        "judge": judge,
+        "attorneys": [],
+        "headnotes": "",
+        "raw_text": " ".join(parts),
+        "case_summary": "",
+        "verdict": "",
+    }
+
+
+def make_text(case):
+    # same field preference and cap as Embeddings.make_text
+    for field in ["summary", "case_summary", "facts", "raw_text"]:
+        if field in case and case[field]:
+            return " ".join(case[field].split())[:10000]
+    return ""
+
+
+def export_random_ljp(engine_dir, dim, seed, hidden=64):
+    """LJP engine with random weights but the production feature layout (own, neighbours, sim)."""
+    rng = np.random.default_rng(seed)
+    n_in = 2 * dim + 1
+    clf = types.SimpleNamespace(
+        coefs_=[rng.normal(0, 1 / np.sqrt(n_in), (n_in, hidden)), rng.normal(0, 1 / np.sqrt(hidden), (hidden, 3))],
+        intercepts_=[np.zeros(hidden), np.zeros(3)],
+        activation="relu",
+        out_activation_="softmax",
+    )
+    le = types.SimpleNamespace(classes_=np.array(["defendant", "dismissal", "plaintiff"]))
+    export_mlp(clf, le, engine_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic DI corpus and its index")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--cases", type=int, default=5000)
+    parser.add_argument("--text-kb", type=float, default=4.0, help="Mean raw_text size per case")
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension (e5-base is 768)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    t0 = time.time()
+    rng = random.Random(args.seed)
+    emb_dir = os.path.join(args.out, "embeddings")
+    os.makedirs(emb_dir, exist_ok=True)
+    di_path = os.path.join(args.out, "di_dataset.jsonl")
+
+    topics = topic_words(rng, args.topics, 25)
+    cites = [f"{rng.randint(1, 400)} {rng.choice(REPORTERS)} {rng.randint(1, 999)}" for _ in range(args.cases)]
+
+    encoder = HashEncoder(args.dim)
+    embeddings = np.zeros((args.cases, args.dim), dtype="float32")
+    metadata = []
+    print(f"Generating {args.cases} cases...")
+    with open(di_path, "w", encoding="utf-8") as f:
+        for i in range(args.cases):
+            case = make_case(i, rng, topics, cites, args.text_kb)
+            f.write(json.dumps(case, ensure_ascii=False) + "\n")
+            text = make_text(case)
+            embeddings[i] = encoder.encode(text)
+            metadata.append({"case_id": case["case_id"], "text_len": len(text)})
+
+    np.save(os.path.join(emb_dir, "embeddings.npy"), embeddings)
+    joblib.dump(metadata, os.path.join(emb_dir, "metadata.joblib"))
+
+    print("Building FAISS index...")
+    normed = embeddings.copy()
+    faiss.normalize_L2(normed)
+    index = faiss.IndexFlatIP(args.dim)
+    index.add(normed)
+    faiss.write_index(index, os.path.join(emb_dir, "faiss.index"))
+
+    print("Building snippet index...")
+    import runtime
+    import build_snippets
+    runtime.DI_PATH = di_path
+    build_snippets.build_snippet_index(os.path.join(emb_dir, "snippets"))
+
+    print("Building case filter attributes...")
+    import build_case_filters
+    build_case_filters.build_case_filters(os.path.join(emb_dir, "filters"))
+
+    print("Building lexical index...")
+    import build_lexical
+    build_lexical.build_lexical_index(os.path.join(emb_dir, "lexical"))
+
+    print("Building citation graph...")
+    import build_citations
+    build_citations.build_citation_graph(os.path.join(emb_dir, "citations"))
+
+    print("Exporting random LJP engine...")
+    export_random_ljp(os.path.join(args.out, "ljp_engine"), args.dim, args.seed)
+
+    with open(os.path.join(args.out, "queries.jsonl"), "w", encoding="utf-8") as f:
+        for _ in range(args.queries):
+            topic = topics[rng.randrange(len(topics))]
+            f.write(json.dumps({"query": " ".join(sentence(rng, topic, 0.5) for _ in range(3))}) + "\n")
+
+    manifest = {
+        "cases": args.cases, "text_kb": args.text_kb, "topics": args.topics, "dim": args.dim,
+        "queries": args.queries, "seed": args.seed, "di_path": di_path, "data_dir": emb_dir,
+        "ljp_engine_dir": os.path.join(args.out, "ljp_engine"),
+    }
+    with open(os.path.join(args.out, "corpus.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Corpus written to {args.out} in {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
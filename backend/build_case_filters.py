@@ -0,0 +1,25 @@
+import argparse
+
+import runtime
+from case_filters import CaseAttributes
+
+FILTER_DIR = str(runtime.FILTER_DIR)
+
+
+def build_case_filters(out_dir=FILTER_DIR):
+    """Court, jurisdiction and date columns of every DI case, in index order."""
+    cases = runtime.load_cases()
+    print(f"Extracting filter attributes from {len(cases)} cases...")
+    attrs = CaseAttributes.from_cases(cases)
+    attrs.dataset = runtime.dataset_stamp()
+    attrs.save(out_dir)
+    dated = int((attrs.date > 0).sum())
+    print(f"Case filter attributes saved to {out_dir}: {len(attrs.courts)} courts, "
+          f"{len(attrs.jurisdictions)} jurisdictions, {dated}/{len(attrs)} cases dated")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute columnar attributes for filtered search")
+    parser.add_argument("--out", default=FILTER_DIR)
+    args = parser.parse_args()
+    build_case_filters(args.out)
@@ -3,7 +3,7 @@ import faiss
 import numpy as np
 import joblib
 
-EMB_DIR = "./di_prime_embeddings"
+EMB_DIR = os.environ.get("ADVOCA_DATA_DIR", "./di_prime_embeddings")
 EMB_FILE = os.path.join(EMB_DIR,"embeddings.npy")
 META_FILE = os.path.join(EMB_DIR,"metadata.joblib")
 
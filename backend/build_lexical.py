@@ -0,0 +1,107 @@
+import os
+import json
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+import runtime
+from lexical import K1, B, term_counts, document_text, encode_postings
+
+LEXICAL_DIR = str(runtime.LEXICAL_DIR)
+
+
+def _flush(tmp_dir, block_no, terms, docs, tfs, partitions, shift):
+    """Write one block of (term, doc, tf) triples, split by the term's high bits."""
+    terms, docs, tfs = np.concatenate(terms), np.concatenate(docs), np.concatenate(tfs)
+    part = (terms >> shift).astype(np.int64) if shift < 32 else np.zeros(len(terms), dtype=np.int64)
+    for p in range(partitions):
+        sel = part == p
+        np.savez(os.path.join(tmp_dir, f"p{p:03d}_b{block_no:05d}.npz"),
+                 terms=terms[sel], docs=docs[sel], tfs=tfs[sel])
+
+
+def build_lexical_index(out_dir=LEXICAL_DIR, block_docs=20000, partitions=16):
+    """BM25 inverted index over every DI case's raw_text + headnotes, in index order.
+
+    Cases are tokenised in blocks whose postings are spilled to disk split
+    into `partitions` term ranges; each range is then merged on its own, so
+    memory stays at roughly one block plus one range of the corpus.
+    """
+    cases = runtime.load_cases()
+    n = len(cases)
+    partitions = 1 << max(0, int(partitions - 1).bit_length())  # power of two
+    shift = 32 - (partitions.bit_length() - 1)
+    os.makedirs(out_dir, exist_ok=True)
+    marker = os.path.join(out_dir, "meta.json")
+    if os.path.exists(marker):
+        os.remove(marker)
+    tmp_dir = tempfile.mkdtemp(prefix="lexical-", dir=out_dir)
+
+    print(f"Tokenising {n} cases...")
+    doc_len = np.zeros(n, dtype=np.uint32)
+    terms, docs, tfs = [], [], []
+    blocks = 0
+    for i, case in enumerate(cases):
+        hashes, counts = term_counts(document_text(case))
+        doc_len[i] = counts.sum()
+        terms.append(hashes)
+        docs.append(np.full(len(hashes), i, dtype=np.uint32))
+        tfs.append(counts)
+        if (i + 1) % block_docs == 0 or i + 1 == n:
+            _flush(tmp_dir, blocks, terms, docs, tfs, partitions, shift)
+            terms, docs, tfs = [], [], []
+            blocks += 1
+            print(f"  {i + 1} cases")
+
+    print(f"Merging {partitions} term ranges...")
+    vocab, dfs, offsets = [], [], [0]
+    postings_path = os.path.join(out_dir, "postings.bin")
+    total_postings = 0
+    with open(postings_path, "wb") as out:
+        for p in range(partitions):
+            parts = [np.load(os.path.join(tmp_dir, f"p{p:03d}_b{b:05d}.npz")) for b in range(blocks)]
+            p_terms = np.concatenate([x["terms"] for x in parts]) if parts else np.zeros(0, np.uint32)
+            if len(p_terms) == 0:
+                continue
+            p_docs = np.concatenate([x["docs"] for x in parts])
+            p_tfs = np.concatenate([x["tfs"] for x in parts])
+            # stable: blocks are in doc order, so each term's docs stay ascending
+            order = np.argsort(p_terms, kind="stable")
+            p_terms, p_docs, p_tfs = p_terms[order], p_docs[order], p_tfs[order]
+            starts = np.flatnonzero(np.r_[True, p_terms[1:] != p_terms[:-1]])
+            ends = np.r_[starts[1:], len(p_terms)]
+            for s, e in zip(starts, ends):
+                block = encode_postings(p_docs[s:e], p_tfs[s:e])
+                out.write(block)
+                offsets.append(offsets[-1] + len(block))
+            vocab.append(p_terms[starts])
+            dfs.append((ends - starts).astype(np.uint32))
+            total_postings += len(p_terms)
+    shutil.rmtree(tmp_dir)
+
+    terms = np.concatenate(vocab) if vocab else np.zeros(0, dtype=np.uint32)
+    np.save(os.path.join(out_dir, "terms.npy"), terms)
+    np.save(os.path.join(out_dir, "df.npy"), np.concatenate(dfs) if dfs else np.zeros(0, dtype=np.uint32))
+    np.save(os.path.join(out_dir, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+    np.save(os.path.join(out_dir, "doc_len.npy"), doc_len)
+    meta = {"docs": n, "dataset": runtime.dataset_stamp(), "avgdl": float(doc_len.mean()) if n else 0.0, "k1": K1, "b": B,
+            "terms": len(terms), "postings": total_postings}
+    # meta last: its presence marks a complete build
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    size_mb = os.path.getsize(postings_path) / 1e6
+    raw_mb = total_postings * 6 / 1e6
+    print(f"Lexical index saved to {out_dir}: {len(terms)} terms, {total_postings} postings, "
+          f"{size_mb:.1f} MB compressed ({raw_mb:.1f} MB raw)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the BM25 inverted index for hybrid retrieval")
+    parser.add_argument("--out", default=LEXICAL_DIR)
+    parser.add_argument("--block-docs", type=int, default=20000, help="Cases tokenised per spill block")
+    parser.add_argument("--partitions", type=int, default=16, help="Term ranges merged separately")
+    args = parser.parse_args()
+    build_lexical_index(args.out, args.block_docs, args.partitions)
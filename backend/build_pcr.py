@@ -1,58 +1,19 @@
-import faiss
-import numpy as np
-import joblib
-import json
+import heapq
 import argparse
-from sentence_transformers import SentenceTransformer
 
-# ---------------------------------------------
-# PATHS
-# ---------------------------------------------
-EMB_DIR = "./di_prime_embeddings"
-META_FILE = f"{EMB_DIR}/metadata.joblib"
-FAISS_FILE = f"{EMB_DIR}/faiss.index"
-DI_PATH = "/Users/srinandanasarmakesapragada/Documents/data_raw/di_dataset.jsonl"
-
-# ---------------------------------------------
-# Load resources
-# ---------------------------------------------
-print("Loading FAISS index...")
-index = faiss.read_index(FAISS_FILE)
-
-print("Loading metadata...")
-metadata = joblib.load(META_FILE)
-
-print("Loading DI...")
-cases = []
-with open(DI_PATH, "r", encoding="utf-8") as f:
-    for line in f:
-        try:
-            cases.append(json.loads(line))
-        except:
-            pass
-
-print("Loading embedding model (E5-base)...")
-model = SentenceTransformer("intfloat/e5-base")
+import runtime
+import metrics
+from snippets import make_snippet, tokenize
+from lexical import hybrid_search
+from citations import court_score
 
 # ---------------------------------------------
-# COURT PRESTIGE MAP
+# Load resources (shared with SCR/LJP via runtime)
 # ---------------------------------------------
-COURT_PRESTIGE = {
-    "supreme court": 5.0,
-    "court of appeals": 4.0,
-    "appellate division": 3.0,
-    "circuit court": 2.5,
-    "district court": 1.5,
-    "trial court": 1.0,
-}
-
-def court_score(text):
-    text = (text or "").lower()
-    score = 0.0
-    for court, w in COURT_PRESTIGE.items():
-        if court in text:
-            score += w
-    return score
+index = runtime.load_index()
+metadata = runtime.load_metadata()
+cases = runtime.load_cases()
+model = runtime.load_encoder()
 
 # ---------------------------------------------
 # BAD CASE FILTER: Remove procedural junk
@@ -101,68 +62,130 @@ def reasoning_depth(text):
 # ---------------------------------------------
 # MAIN PCR FUNCTION
 # ---------------------------------------------
-def recommend_precedents(query_text, k=10, sample_size=1000, min_length=800, search_limit=None):
-    # Ensure query is trimmed and prefixed for e5
-    query_text = "query: " + query_text.strip()
+def recommend_precedents(query_text, k=10, sample_size=1000, min_length=800, search_limit=None, filters=None,
+                         mode="dense"):
+    return list(iter_precedents(query_text, k=k, sample_size=sample_size, min_length=min_length,
+                                search_limit=search_limit, filters=filters, mode=mode))
 
-    query_emb = model.encode(query_text, convert_to_numpy=True).astype("float32")
-    query_emb = np.expand_dims(query_emb, 0)
 
-    if search_limit is None:
-        SEARCH_LIMIT = max(k * 10, 200)
-    else:
-        SEARCH_LIMIT = search_limit
-
-    distances, indices = index.search(query_emb, SEARCH_LIMIT)
+def iter_precedents(query_text, k=10, sample_size=1000, min_length=800, search_limit=None, filters=None,
+                    mode="dense"):
+    """Rank candidates, then yield the top-k one at a time (samples built lazily).
 
-    candidates = []
-    seen_ids = set()
-    total_cases = len(cases)
+    `sample` is a query-aware snippet of at most `sample_size` bytes (None => full text).
+    `filters` restricts candidates by court, jurisdiction and date (see case_filters.py).
+    mode="hybrid" draws candidates from the fused dense + BM25 lists and adds
+    a lexical feature to the score (see lexical.py).
+    """
+    if search_limit is None:
+        search_limit = default_search_limit(k)
+    subset = runtime.filtered_subset(filters)
 
-    for dist, idx in zip(distances[0], indices[0]):
-        # faiss may return -1 for padding if index shorter than SEARCH_LIMIT
-        if idx < 0 or idx >= total_cases:
-            continue
+    if mode == "hybrid":
+        distances, indices, lexical = hybrid_search(query_text, search_limit, normalize=False, subset=subset)
+        yield from rank_precedents(query_text, distances, indices, k=k, sample_size=sample_size,
+                                   min_length=min_length, lexical=lexical)
+        return
 
+    # Ensure query is trimmed and prefixed for e5
+    # Encode and search (batched with concurrent requests)
+    distances, indices = runtime.encode_and_search("query: " + query_text.strip(), search_limit, normalize=False,
+                                                   subset=subset)
+
+    yield from rank_precedents(query_text, distances, indices, k=k, sample_size=sample_size, min_length=min_length)
+
+
+def default_search_limit(k):
+    return max(k * 10, 200)
+
+
+# weight of the BM25 score (scaled to [0, 1] over the candidates) in hybrid mode
+LEXICAL_WEIGHT = 0.25
+# weight of citation authority (PageRank percentile in [0, 1], build_citations.py)
+CITATION_WEIGHT = 0.5
+
+
+def rank_precedents(query_text, distances, indices, k=10, sample_size=1000, min_length=800, lexical=None):
+    """PCR re-ranking of an existing search; `distances` are raw (unnormalised query) inner products.
+
+    `lexical` maps candidate rows to BM25 scores (hybrid mode). Court prestige
+    and citation authority are read from the citation graph when it is built.
+    """
+    query_tokens = tokenize(query_text)
+    graph = runtime.load_citations()
+    max_lexical = max(lexical.values(), default=0.0) if lexical else 0.0
+
+    with metrics.stage("rerank"):
+        candidates = []
+        seen_ids = set()
+        total_cases = len(cases)
+
+        for dist, idx in zip(distances[0], indices[0]):
+            # faiss may return -1 for padding if index shorter than SEARCH_LIMIT
+            if idx < 0 or idx >= total_cases:
+                continue
+
+            case = cases[idx]
+            cid = case.get("case_id")
+            raw = case.get("raw_text", "") or ""
+
+            # remove dupes
+            if not cid or cid in seen_ids:
+                continue
+            seen_ids.add(cid)
+
+            # ----------------------------
+            # HARD FILTERS
+            # ----------------------------
+            if len(raw) < min_length:
+                continue  # too short = procedural or not useful
+
+            if is_procedural_case(raw):
+                continue  # remove orders/procedural junk
+
+            # ----------------------------
+            # FEATURE SCORES
+            # ----------------------------
+            sim = float(dist)
+            if graph is not None and idx < len(graph):
+                court_s = float(graph.court_score[idx])
+                cite_s = float(graph.authority[idx])
+            else:
+                court_s = court_score(raw)
+                cite_s = 0.0
+            depth_s = reasoning_depth(raw)
+            kw_s = 1.0 if "trademark" in raw.lower() else 0.0
+            lex_s = lexical.get(int(idx), 0.0) / max_lexical if max_lexical else 0.0
+
+            # FINAL SCORE
+            final = (
+                sim * 1.0          # core relevance
+                + court_s * 0.20   # authority
+                + depth_s * 0.15   # reasoning quality
+                + kw_s * 0.10      # topic alignment
+                + lex_s * LEXICAL_WEIGHT  # exact-term match (hybrid only)
+                + cite_s * CITATION_WEIGHT  # cited by other cases
+            )
+
+            candidates.append((final, idx, sim, court_s, depth_s, kw_s, lex_s, cite_s))
+
+        # rank by final score
+        top = heapq.nlargest(k, candidates, key=lambda c: c[0])
+
+    for final, idx, sim, court_s, depth_s, kw_s, lex_s, cite_s in top:
         case = cases[idx]
-        cid = case.get("case_id")
         raw = case.get("raw_text", "") or ""
 
-        # remove dupes
-        if not cid or cid in seen_ids:
-            continue
-        seen_ids.add(cid)
-
-        # ----------------------------
-        # HARD FILTERS
-        # ----------------------------
-        if len(raw) < min_length:
-            continue  # too short = procedural or not useful
-
-        if is_procedural_case(raw):
-            continue  # remove orders/procedural junk
-
-        # ----------------------------
-        # FEATURE SCORES
-        # ----------------------------
-        sim = float(dist)
-        court_s = court_score(raw)
-        depth_s = reasoning_depth(raw)
-        kw_s = 1.0 if "trademark" in raw.lower() else 0.0
-
-        # FINAL SCORE
-        final = (
-            sim * 1.0          # core relevance
-            + court_s * 0.20   # authority
-            + depth_s * 0.15   # reasoning quality
-            + kw_s * 0.10      # topic alignment
-        )
-
-        # sample text sized by sample_size param (None => full)
-        sample_text = raw if sample_size is None else raw[:sample_size]
-
-        candidates.append({
-            "case_id": cid,
+        # best-matching passages within sample_size bytes (None => full)
+        if sample_size is None:
+            sample_text = raw
+        else:
+            with metrics.stage("snippet"):
+                sample_text = make_snippet(raw, query_tokens, sample_size,
+                                           case_idx=int(idx), index=runtime.load_snippets())
+
+        result = {
+            "case_id": case.get("case_id"),
             "similarity": sim,
             "precedent_strength": court_s,
             "reasoning_depth": depth_s,
@@ -172,19 +195,24 @@ def recommend_precedents(query_text, k=10, sample_size=1000, min_length=800, sea
             "title": case.get("title", ""),
             "court": case.get("court", ""),
             "date": case.get("date", "")
-        })
-
-    # rank by final score
-    candidates = sorted(candidates, key=lambda x: x["final_score"], reverse=True)
+        }
+        if lexical is not None:
+            result["lexical_score"] = lex_s
+        if graph is not None and idx < len(graph):
+            result["citation_authority"] = cite_s
+            result["cited_by"] = graph.in_degree(int(idx))
+        yield result
 
-    return candidates[:k]
 
 # ---------------------------------------------
 # FINAL PRECEDENT SELECTOR (ONE CASE + EXPLANATION)
 # ---------------------------------------------
 def find_best_precedent(query_text, **kwargs):
-    top_cases = recommend_precedents(query_text, **kwargs)
+    return explain_best_precedent(recommend_precedents(query_text, **kwargs))
 
+
+def explain_best_precedent(top_cases):
+    """Pick the top-ranked precedent and explain the choice."""
     if not top_cases:
         return {
             "precedent_case": None,
@@ -216,6 +244,11 @@ def find_best_precedent(query_text, **kwargs):
     else:
         explanation_lines.append(f"- It lacks explicit reasoning phrases but remains legally relevant.")
 
+    cited_by = best.get("cited_by", 0)
+    if cited_by:
+        explanation_lines.append(f"- It is cited by {cited_by} other case{'s' if cited_by != 1 else ''} in the corpus "
+                                 f"(citation authority {best['citation_authority']:.2f}).")
+
     explanation_lines.append(f"- It is closely related to the input scenario (semantic similarity {sim:.3f}).")
     if topic > 0:
         explanation_lines.append(f"- It discusses trademark-related matters, aligning with the query topic.")
@@ -233,10 +266,17 @@ def main():
     parser = argparse.ArgumentParser(description="PCR: Precedent Candidate Retriever")
     parser.add_argument("--query", "-q", type=str, help="Query text. If omitted, you will be prompted.")
     parser.add_argument("--k", type=int, default=5, help="Number of results to return")
-    parser.add_argument("--sample-size", type=int, default=2000, help="Number of chars to return from case text. Use 0 or -1 for full text")
+    parser.add_argument("--sample-size", type=int, default=2000, help="Byte budget for the query-relevant sample. Use 0 or -1 for full text")
     parser.add_argument("--min-length", type=int, default=800, help="Minimum raw_text length to consider a case (filters junk)")
     parser.add_argument("--show-explanation", action="store_true", help="Show explanation for best precedent")
+    parser.add_argument("--hybrid", action="store_true", help="Fuse dense and BM25 candidates (needs build_lexical.py)")
+    parser.add_argument("--court", help="Only courts whose name contains this text")
+    parser.add_argument("--jurisdiction", help="Only this jurisdiction")
+    parser.add_argument("--date-from", help="Earliest decision date (YYYY or YYYY-MM-DD)")
+    parser.add_argument("--date-to", help="Latest decision date (YYYY or YYYY-MM-DD)")
     args = parser.parse_args()
+    filters = {"court": args.court, "jurisdiction": args.jurisdiction,
+               "date_from": args.date_from, "date_to": args.date_to}
 
     if args.query:
         query = args.query
@@ -249,7 +289,9 @@ def main():
 
     sample_size = None if args.sample_size <= 0 else args.sample_size
 
-    results = recommend_precedents(query, k=args.k, sample_size=sample_size, min_length=args.min_length)
+    mode = "hybrid" if args.hybrid else "dense"
+    results = recommend_precedents(query, k=args.k, sample_size=sample_size, min_length=args.min_length,
+                                   filters=filters, mode=mode)
 
     if not results:
         print("No results found.")
@@ -265,7 +307,8 @@ def main():
         print("-" * 80)
 
     if args.show_explanation:
-        final = find_best_precedent(query, k=args.k, sample_size=sample_size, min_length=args.min_length)
+        final = find_best_precedent(query, k=args.k, sample_size=sample_size, min_length=args.min_length,
+                                    filters=filters, mode=mode)
         print("\nEXPLANATION FOR BEST PRECEDENT:\n")
         print(final["explanation"])
 
@@ -1,52 +1,56 @@
-import faiss
-import numpy as np
-import joblib
 import json
-from sentence_transformers import SentenceTransformer
 
-EMB_DIR = "./di_prime_embeddings"
-EMB_FILE = f"{EMB_DIR}/embeddings.npy"
-META_FILE = f"{EMB_DIR}/metadata.joblib"
-FAISS_FILE = f"{EMB_DIR}/faiss.index"
+import runtime
+import metrics
+from snippets import DEFAULT_SNIPPET_BYTES, make_snippet, tokenize
+from lexical import hybrid_search
 
-DI_PATH = "/Users/srinandanasarmakesapragada/Documents/data_raw/di_dataset.jsonl"
+index = runtime.load_index()
+metadata = runtime.load_metadata()
+cases = runtime.load_cases()
+model = runtime.load_encoder()
 
-print("Loading FAISS index...")
-index = faiss.read_index(FAISS_FILE)
 
-print("Loading metadata...")
-metadata = joblib.load(META_FILE)
-
-print("Loading DI...")
-cases = []
-with open(DI_PATH, "r", encoding="utf-8") as f:
-    for line in f:
-        try:
-            cases.append(json.loads(line))
-        except:
-            pass
+def retrieve_similar_cases(query_text, k=10, snippet_bytes=DEFAULT_SNIPPET_BYTES, filters=None, mode="dense"):
+    """Return top-k UNIQUE similar cases (no duplicate case_ids)."""
+    return list(iter_similar_cases(query_text, k=k, snippet_bytes=snippet_bytes, filters=filters, mode=mode))
 
-print("Loading embedding model (e5-base)...")
-model = SentenceTransformer("intfloat/e5-base")   # <-- FIXED
 
+def iter_similar_cases(query_text, k=10, snippet_bytes=DEFAULT_SNIPPET_BYTES, filters=None, mode="dense"):
+    """Yield top-k UNIQUE similar cases in rank order, each as soon as it is final.
 
-def retrieve_similar_cases(query_text, k=10):
-    """Return top-k UNIQUE similar cases (no duplicate case_ids)."""
+    `text_sample` is a query-aware snippet of at most `snippet_bytes` bytes
+    (None => full summary/raw text). `filters` restricts the search by court,
+    jurisdiction and date (see case_filters.py). mode="hybrid" ranks by the
+    fusion of dense and BM25 candidates (see lexical.py); `score` stays the
+    cosine similarity.
+    """
+    subset = runtime.filtered_subset(filters)
+    if mode == "hybrid":
+        distances, indices, _ = hybrid_search(query_text, search_limit(k), normalize=True, subset=subset)
+        yield from iter_unique_cases(query_text, distances, indices, k=k, snippet_bytes=snippet_bytes)
+        return
 
     # e5 recommends using "query: " prefix
-    query_text = "query: " + query_text
+    # Encode, normalize and search (batched with concurrent requests)
+    distances, indices = runtime.encode_and_search("query: " + query_text, search_limit(k), normalize=True,
+                                                   subset=subset)
 
-    # Encode and normalize
-    query_emb = model.encode(query_text, convert_to_numpy=True).astype("float32")
-    faiss.normalize_L2(query_emb.reshape(1, -1))
+    yield from iter_unique_cases(query_text, distances, indices, k=k, snippet_bytes=snippet_bytes)
 
+
+def search_limit(k):
     # Fetch extra neighbors to ensure we get k unique case_ids
     # Increase search limit significantly to handle duplicates
-    SEARCH_LIMIT = max(k * 20, 200)
+    return max(k * 20, 200)
+
 
-    distances, indices = index.search(query_emb.reshape(1, -1), SEARCH_LIMIT)
+def iter_unique_cases(query_text, distances, indices, k=10, snippet_bytes=DEFAULT_SNIPPET_BYTES):
+    """SCR results from an existing search over L2-normalised query embeddings."""
+    query_tokens = tokenize(query_text)
+    snippet_index = runtime.load_snippets()
 
-    results = []
+    found = 0
     seen_ids = set()
 
     for dist, idx in zip(distances[0], indices[0]):
@@ -67,23 +71,29 @@ def retrieve_similar_cases(query_text, k=10):
 
         try:
             case = cases[idx]
-            sample = case.get("summary") or case.get("raw_text", "")
-
-            results.append({
+            summary = case.get("summary")
+            sample = summary or case.get("raw_text", "")
+            if snippet_bytes is not None:
+                # precomputed sentence offsets cover raw_text only
+                with metrics.stage("snippet"):
+                    sample = make_snippet(sample, query_tokens, snippet_bytes, case_idx=int(idx),
+                                          index=None if summary else snippet_index)
+
+            result = {
                 "case_id": cid,
                 "score": float(dist),   # cosine similarity (because of IP index + L2 norm)
                 "text_sample": sample,
                 "title": case.get("title", ""),
                 "court": case.get("court", ""),
                 "date": case.get("date", "")
-            })
-
-            if len(results) == k:
-                break
+            }
         except (IndexError, KeyError):
             continue
 
-    return results
+        yield result
+        found += 1
+        if found == k:
+            break
 
 
 def recall_at_k(results, relevant_case_ids):
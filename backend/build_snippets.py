@@ -0,0 +1,57 @@
+import os
+import json
+import argparse
+
+import numpy as np
+
+import runtime
+from snippets import split_sentences, tokenize
+
+SNIPPET_DIR = str(runtime.SNIPPET_DIR)
+
+
+def build_snippet_index(out_dir=SNIPPET_DIR):
+    """Sentence offsets and hashed tokens of every DI case's raw_text, in index order."""
+    cases = runtime.load_cases()
+    print(f"Splitting {len(cases)} cases into sentences...")
+
+    sent_ptr = np.zeros(len(cases) + 1, dtype=np.int64)
+    bounds, tok_lens, toks = [], [], []
+
+    for i, case in enumerate(cases):
+        raw = case.get("raw_text", "") or ""
+        for start, end in split_sentences(raw):
+            t = tokenize(raw[start:end])
+            bounds.append((start, end))
+            tok_lens.append(len(t))
+            toks.append(t)
+        sent_ptr[i + 1] = len(bounds)
+        if (i + 1) % 10000 == 0:
+            print(f"  {i + 1} cases, {len(bounds)} sentences")
+
+    sent_bounds = np.asarray(bounds, dtype=np.int32).reshape(-1, 2)
+    tok_ptr = np.zeros(len(bounds) + 1, dtype=np.int64)
+    np.cumsum(tok_lens, out=tok_ptr[1:])
+    tok_ids = np.concatenate(toks) if toks else np.zeros(0, dtype=np.uint32)
+
+    os.makedirs(out_dir, exist_ok=True)
+    marker = os.path.join(out_dir, "sent_ptr.npy")
+    if os.path.exists(marker):
+        os.remove(marker)
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"cases": len(cases), "sentences": len(bounds), "dataset": runtime.dataset_stamp()}, f, indent=2)
+    for name, arr in (("sent_bounds", sent_bounds), ("tok_ptr", tok_ptr),
+                      ("tok_ids", tok_ids), ("sent_ptr", sent_ptr)):
+        # sent_ptr last: its presence marks a complete build
+        np.save(os.path.join(out_dir, f"{name}.npy"), arr)
+
+    size_mb = sum(a.nbytes for a in (sent_ptr, sent_bounds, tok_ptr, tok_ids)) / 1e6
+    print(f"Snippet index saved to {out_dir}: {len(bounds)} sentences, "
+          f"{len(tok_ids)} tokens, {size_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute sentence offsets/tokens for snippets")
+    parser.add_argument("--out", default=SNIPPET_DIR)
+    args = parser.parse_args()
+    build_snippet_index(args.out)
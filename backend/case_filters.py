@@ -0,0 +1,254 @@
+"""
+Metadata filters (court, jurisdiction, date range) pushed into the vector search.
+
+Each DI case's filterable fields are kept as columnar arrays in index order:
+
+    court_id         int32   index into `courts` (vocab.json)
+    jurisdiction_id  int32   index into `jurisdictions`
+    date             int32   YYYYMMDD; missing month/day are 00, 0 = unknown
+
+A filter is evaluated with vectorised comparisons into a row mask, and the
+rows that pass are searched directly instead of over-fetching and dropping
+results afterwards:
+
+  - selective filters (at most BRUTE_FORCE_MAX_ROWS rows, or
+    BRUTE_FORCE_FRACTION of the index) are scored exactly against just those
+    rows, acting as a sub-index built on the fly;
+  - wider filters run the normal FAISS search with an ID selector (a bitmap
+    for dense masks, a hash set of ids for sparse ones).
+
+Either way the search returns `limit` matching neighbours, so a filtered
+query still returns a full k whenever enough cases match.
+
+Filter spec (API and Python):
+    {"court": "appeal" | ["supreme", "appellate"],   # case-insensitive substring
+     "jurisdiction": "New York" | [...],              # case-insensitive exact
+     "date_from": "1950" | "1950-06-01",              # inclusive
+     "date_to": "1999" | "1999-12-31"}                # inclusive
+
+Arrays are precomputed with `python build_case_filters.py`; without them
+they are derived from the DI cases when first needed.
+"""
+import os
+import re
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import faiss
+
+
+ATTR_FILES = ("court_id", "jurisdiction_id", "date")
+VOCAB_FILE = "vocab.json"
+
+BRUTE_FORCE_MAX_ROWS = int(os.environ.get("ADVOCA_FILTER_BRUTE_FORCE_ROWS", 20000))
+BRUTE_FORCE_FRACTION = float(os.environ.get("ADVOCA_FILTER_BRUTE_FORCE_FRACTION", 0.02))
+SUBSET_CACHE_SIZE = 64
+# distance FAISS reports for missing neighbours of an inner-product search
+PAD_DISTANCE = np.finfo(np.float32).min
+
+FILTER_KEYS = ("court", "jurisdiction", "date_from", "date_to")
+DATE_RE = re.compile(r"^\s*(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?")
+
+
+class FilterError(ValueError):
+    """Malformed filter spec (reported to clients as 400)."""
+
+
+# ---------------- DATES ---------------- #
+
+def date_key(value, upper=False):
+    """YYYY[-MM[-DD]] -> YYYYMMDD int; missing parts are 00 (or 99 for an upper bound)."""
+    m = DATE_RE.match(str(value or ""))
+    if not m:
+        return None
+    year, month, day = m.groups()
+    fill = 99 if upper else 0
+    return int(year) * 10000 + (int(month) if month else fill) * 100 + (int(day) if day else fill)
+
+
+# ---------------- ATTRIBUTES ---------------- #
+
+class CaseAttributes:
+    """Columnar court / jurisdiction / date arrays, one row per index entry."""
+
+    def __init__(self, courts, jurisdictions, court_id, jurisdiction_id, date, dataset=None):
+        self.courts = courts
+        self.jurisdictions = jurisdictions
+        self.court_id = court_id
+        self.jurisdiction_id = jurisdiction_id
+        self.date = date
+        self.dataset = dataset  # runtime.dataset_stamp() of the build, None if derived
+        self._subsets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.date)
+
+    @classmethod
+    def from_cases(cls, cases):
+        courts, jurisdictions = {}, {}
+        n = len(cases)
+        court_id = np.zeros(n, dtype=np.int32)
+        jurisdiction_id = np.zeros(n, dtype=np.int32)
+        date = np.zeros(n, dtype=np.int32)
+        for i, case in enumerate(cases):
+            court_id[i] = courts.setdefault((case.get("court") or "").strip(), len(courts))
+            jurisdiction_id[i] = jurisdictions.setdefault((case.get("jurisdiction") or "").strip(), len(jurisdictions))
+            date[i] = date_key(case.get("date")) or 0
+        return cls(list(courts), list(jurisdictions), court_id, jurisdiction_id, date)
+
+    @staticmethod
+    def exists(directory):
+        return os.path.exists(os.path.join(directory, VOCAB_FILE))
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, VOCAB_FILE), encoding="utf-8") as f:
+            vocab = json.load(f)
+        arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                  for name in ATTR_FILES]
+        return cls(vocab["courts"], vocab["jurisdictions"], *arrays, dataset=vocab.get("dataset"))
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        marker = os.path.join(directory, VOCAB_FILE)
+        if os.path.exists(marker):
+            os.remove(marker)
+        for name in ATTR_FILES:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        # vocab last: its presence marks a complete build
+        with open(marker, "w", encoding="utf-8") as f:
+            json.dump({"courts": self.courts, "jurisdictions": self.jurisdictions, "dataset": self.dataset},
+                      f, ensure_ascii=False)
+
+    # ---------------- FILTERING ---------------- #
+
+    def mask(self, spec):
+        """Boolean row mask for a normalised spec (see `normalize_filters`)."""
+        mask = np.ones(len(self), dtype=bool)
+        if "court" in spec:
+            wanted = [i for i, name in enumerate(self.courts)
+                      if any(term in name.lower() for term in spec["court"])]
+            mask &= np.isin(self.court_id, wanted)
+        if "jurisdiction" in spec:
+            wanted = [i for i, name in enumerate(self.jurisdictions) if name.lower() in spec["jurisdiction"]]
+            mask &= np.isin(self.jurisdiction_id, wanted)
+        if "date_from" in spec:
+            mask &= self.date >= spec["date_from"]
+        if "date_to" in spec:
+            mask &= (self.date <= spec["date_to"]) & (self.date > 0)
+        return mask
+
+    def subset(self, spec):
+        """CaseSubset for a normalised spec; recent subsets are cached."""
+        key = json.dumps(spec, sort_keys=True)
+        with self._lock:
+            if key in self._subsets:
+                self._subsets.move_to_end(key)
+                return self._subsets[key]
+        subset = CaseSubset(self.mask(spec))
+        with self._lock:
+            self._subsets[key] = subset
+            while len(self._subsets) > SUBSET_CACHE_SIZE:
+                self._subsets.popitem(last=False)
+        return subset
+
+
+def normalize_filters(filters):
+    """Validate a filter spec; returns a canonical dict, or None when nothing is filtered."""
+    if not filters:
+        return None
+    if not isinstance(filters, dict):
+        raise FilterError("filters must be an object")
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise FilterError(f"Unknown filters: {', '.join(sorted(unknown))}. Use {', '.join(FILTER_KEYS)}")
+
+    spec = {}
+    for key in ("court", "jurisdiction"):
+        value = filters.get(key)
+        if value in (None, "", []):
+            continue
+        values = [value] if isinstance(value, str) else value
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            raise FilterError(f"{key} must be a string or a list of strings")
+        spec[key] = sorted({v.strip().lower() for v in values if v.strip()})
+    for key in ("date_from", "date_to"):
+        value = filters.get(key)
+        if value in (None, ""):
+            continue
+        parsed = date_key(value, upper=(key == "date_to"))
+        if parsed is None:
+            raise FilterError(f"{key} must be a date like 1950 or 1950-06-01")
+        spec[key] = parsed
+    return spec or None
+
+
+# ---------------- SEARCH ---------------- #
+
+class CaseSubset:
+    """The index rows passing a filter, and how to search only those rows."""
+
+    def __init__(self, mask):
+        self.ntotal = len(mask)
+        self.ids = np.flatnonzero(mask).astype(np.int64)
+        self._selector = None
+        self._bitmap = None  # the bitmap selector reads this buffer; keep it alive
+
+    def __len__(self):
+        return len(self.ids)
+
+    def contains(self, rows):
+        """Boolean mask of which `rows` pass the filter."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.zeros(len(rows), dtype=bool)
+        pos = np.minimum(np.searchsorted(self.ids, rows), len(self.ids) - 1)
+        return self.ids[pos] == rows
+
+    def brute_force(self):
+        return len(self.ids) <= max(BRUTE_FORCE_MAX_ROWS, BRUTE_FORCE_FRACTION * self.ntotal)
+
+    def selector(self, ntotal):
+        if self._selector is None:
+            if len(self.ids) * 64 > self.ntotal:
+                # the selector reads one bit per index row, so size it to the index
+                mask = np.zeros(max(ntotal, self.ntotal), dtype=bool)
+                mask[self.ids] = True
+                self._bitmap = np.packbits(mask, bitorder="little")
+                self._selector = faiss.IDSelectorBitmap(self._bitmap)
+            else:
+                self._selector = faiss.IDSelectorBatch(self.ids)
+        return self._selector
+
+    def search(self, index, queries, limit):
+        """Same contract as index.search, restricted to this subset."""
+        n = len(queries)
+        if len(self.ids) and self.ids[-1] >= index.ntotal:
+            # attribute rows beyond the index (stale build) cannot be searched
+            self.ids = self.ids[self.ids < index.ntotal]
+        if len(self.ids) == 0:
+            return (np.full((n, limit), PAD_DISTANCE, dtype=np.float32), np.full((n, limit), -1, dtype=np.int64))
+        if self.brute_force() and _exact_scan_supported(index):
+            return self._scan(index, queries, limit)
+        return index.search(queries, limit, params=faiss.SearchParameters(sel=self.selector(index.ntotal)))
+
+    def _scan(self, index, queries, limit):
+        scores = queries @ index.reconstruct_batch(self.ids).T
+        distances = np.full((len(queries), limit), PAD_DISTANCE, dtype=np.float32)
+        indices = np.full((len(queries), limit), -1, dtype=np.int64)
+        top = min(limit, len(self.ids))
+        for row, s in enumerate(scores):
+            best = np.argpartition(-s, top - 1)[:top] if top < len(s) else np.arange(len(s))
+            best = best[np.argsort(-s[best], kind="stable")]
+            distances[row, :top] = s[best]
+            indices[row, :top] = self.ids[best]
+        return distances, indices
+
+
+def _exact_scan_supported(index):
+    # exact inner products need the stored vectors: flat IP indexes only
+    return index.metric_type == faiss.METRIC_INNER_PRODUCT and isinstance(
+        faiss.downcast_index(index), faiss.IndexFlat)
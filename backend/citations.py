@@ -0,0 +1,143 @@
+"""
+Citation graph and per-case authority features for PCR.
+
+build_citations.py resolves the citations found in each opinion to the DI
+cases they refer to, using each case's own `citations` (e.g. "123 N.Y. 456"),
+and stores the graph in CSR form next to the index (EMB_DIR/citations):
+
+    out_ptr[i]:out_ptr[i+1]   rows of out_idx: cases that case i cites
+    in_ptr[i]:in_ptr[i+1]     rows of in_idx: cases citing case i
+    pagerank.npy              float32 PageRank over the citation edges
+    authority.npy             float32 in [0, 1]: PageRank percentile (0 = never cited)
+    court_score.npy           float32 court prestige (COURT_PRESTIGE over raw_text)
+    meta.json                 counts and parameters (written last: marks a complete build)
+
+PCR reads court_score and authority per candidate instead of scanning the
+opinion text at query time, and "cases citing X" is a slice of in_idx.
+"""
+import re
+import json
+from pathlib import Path
+
+import numpy as np
+
+
+ARRAYS = ("out_ptr", "out_idx", "in_ptr", "in_idx", "pagerank", "authority", "court_score")
+
+# ---------------------------------------------
+# COURT PRESTIGE MAP
+# ---------------------------------------------
+COURT_PRESTIGE = {
+    "supreme court": 5.0,
+    "court of appeals": 4.0,
+    "appellate division": 3.0,
+    "circuit court": 2.5,
+    "district court": 1.5,
+    "trial court": 1.0,
+}
+
+def court_score(text):
+    text = (text or "").lower()
+    score = 0.0
+    for court, w in COURT_PRESTIGE.items():
+        if court in text:
+            score += w
+    return score
+
+
+# ---------------- CITATIONS ---------------- #
+
+CITE_RE = re.compile(r"^\s*(\d+)\s+(.+?)\s+(\d+)\s*$")
+
+
+def parse_cite(cite):
+    """'123  N.Y.  456' -> (123, 'N.Y.', 456), or None if it is not volume/reporter/page."""
+    m = CITE_RE.match(cite or "")
+    if not m:
+        return None
+    return int(m.group(1)), " ".join(m.group(2).split()), int(m.group(3))
+
+
+def cite_pattern(reporters):
+    """Regex finding 'volume reporter page' references for the known reporters."""
+    alternatives = "|".join(re.escape(r).replace(r"\ ", r"\s+") for r in sorted(reporters, key=len, reverse=True))
+    return re.compile(r"(?<![\w.])(\d{1,4})\s+(" + alternatives + r")\s+(\d{1,5})(?!\d)")
+
+
+def pagerank(out_ptr, out_idx, damping=0.85, tol=1e-9, max_iter=100):
+    """PageRank by power iteration; dangling cases spread their rank uniformly."""
+    n = len(out_ptr) - 1
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    out_degree = np.diff(out_ptr)
+    src = np.repeat(np.arange(n), out_degree)
+    dangling = out_degree == 0
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        share = np.where(dangling, 0.0, rank / np.maximum(out_degree, 1))
+        new = np.bincount(out_idx, weights=share[src], minlength=n)
+        new = (1 - damping) / n + damping * (new + rank[dangling].sum() / n)
+        done = np.abs(new - rank).sum() < tol
+        rank = new
+        if done:
+            break
+    return rank.astype(np.float32)
+
+
+def authority_scores(in_degree, rank):
+    """PageRank percentile among cited cases, in (0, 1]; uncited cases score 0."""
+    scores = np.zeros(len(rank), dtype=np.float32)
+    cited = np.flatnonzero(in_degree > 0)
+    if len(cited):
+        order = np.argsort(rank[cited], kind="stable")
+        scores[cited[order]] = np.arange(1, len(cited) + 1, dtype=np.float32) / len(cited)
+    return scores
+
+
+# ---------------- GRAPH ---------------- #
+
+class CitationGraph:
+    def __init__(self, out_ptr, out_idx, in_ptr, in_idx, pagerank, authority, court_score, meta=None):
+        self.out_ptr = out_ptr
+        self.out_idx = out_idx
+        self.in_ptr = in_ptr
+        self.in_idx = in_idx
+        self.pagerank = pagerank
+        self.authority = authority
+        self.court_score = court_score
+        self.meta = meta or {}
+
+    @staticmethod
+    def exists(graph_dir):
+        return (Path(graph_dir) / "meta.json").exists()
+
+    @classmethod
+    def load(cls, graph_dir, mmap=True):
+        d = Path(graph_dir)
+        with open(d / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        return cls(*(np.load(d / f"{name}.npy", mmap_mode=mode) for name in ARRAYS), meta=meta)
+
+    def save(self, graph_dir):
+        d = Path(graph_dir)
+        d.mkdir(parents=True, exist_ok=True)
+        marker = d / "meta.json"
+        if marker.exists():
+            marker.unlink()
+        for name in ARRAYS:
+            np.save(d / f"{name}.npy", getattr(self, name))
+        with open(marker, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=2)
+
+    def __len__(self):
+        return len(self.in_ptr) - 1
+
+    def cites(self, row):
+        return self.out_idx[self.out_ptr[row]:self.out_ptr[row + 1]]
+
+    def cited_by(self, row):
+        return self.in_idx[self.in_ptr[row]:self.in_ptr[row + 1]]
+
+    def in_degree(self, row):
+        return int(self.in_ptr[row + 1] - self.in_ptr[row])
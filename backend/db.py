@@ -0,0 +1,82 @@
+"""
+SQLite data layer.
+
+Each thread keeps one open connection per database instead of opening and
+closing a connection on every request. Connections run in WAL mode, so
+readers do not block the writer, and wait on busy_timeout instead of failing
+with "database is locked" when several workers write at once.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+DB_PATH = os.environ.get("ADVOCA_DB_PATH", "users.db")
+
+BUSY_TIMEOUT_MS = 5000
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",      # durable at checkpoints; safe with WAL
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size = -16000",       # 16 MB page cache per connection
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 67108864",      # 64 MB memory-mapped reads
+)
+
+_local = threading.local()
+_inherited = []
+
+
+def connect(db_path=DB_PATH):
+    """Open a new tuned connection (rows accessible by index or column name)."""
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_connection(db_path=DB_PATH):
+    """Return this thread's connection, opening it on first use."""
+    conns = getattr(_local, "conns", None)
+    # connections must not be used across fork(); start fresh in a new process
+    if conns is None or getattr(_local, "pid", None) != os.getpid():
+        if conns:
+            # never close the parent's handles from the child (it could
+            # checkpoint and remove the parent's WAL); just keep them alive
+            _inherited.extend(conns.values())
+        conns = _local.conns = {}
+        _local.pid = os.getpid()
+
+    conn = conns.get(db_path)
+    if conn is None:
+        conn = conns[db_path] = connect(db_path)
+    return conn
+
+
+@contextmanager
+def transaction(db_path=DB_PATH):
+    """Yield the thread's connection; commit on success, roll back on error."""
+    conn = get_connection(db_path)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def close_connections():
+    conns = getattr(_local, "conns", None) or {}
+    for conn in conns.values():
+        conn.close()
+    conns.clear()
+
+
+def ensure_column(cursor, table, column, decl):
+    """Add a column to an existing table (lightweight schema migration)"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
@@ -0,0 +1,195 @@
+"""
+Micro-batching encode + search service.
+
+Concurrent SCR/PCR requests each need one e5 forward pass on a short string
+and one FAISS search. `BatchingSearcher` queues those requests, waits up to
+`max_wait_ms` (or until `max_batch` items are queued), then runs a single
+batched `model.encode` and a single multi-row `index.search`, and hands every
+caller its own row of the result.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import faiss
+
+import metrics
+
+
+MAX_BATCH = int(os.environ.get("ADVOCA_BATCH_MAX_SIZE", 32))
+MAX_WAIT_MS = float(os.environ.get("ADVOCA_BATCH_MAX_WAIT_MS", 5))
+
+# upper bounds of the batch-size histogram buckets
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class _Request:
+    __slots__ = ("text", "limit", "normalize", "return_embedding", "subset", "future", "enqueued", "timings")
+
+    def __init__(self, text, limit, normalize, return_embedding=False, subset=None):
+        self.text = text
+        self.limit = limit
+        self.normalize = normalize
+        self.return_embedding = return_embedding
+        self.subset = subset
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+        self.timings = None
+
+
+class BatchingSearcher:
+    def __init__(self, model, index, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.model = model
+        self.index = index
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._histogram = {b: 0 for b in BATCH_BUCKETS}
+        self._histogram["+Inf"] = 0
+        self._batches = 0
+        self._items = 0
+        self._queue_wait_total = 0.0
+
+    # ---------------- PUBLIC ---------------- #
+
+    def search(self, text, limit, normalize=True, timeout=None, return_embedding=False, subset=None):
+        """Encode `text` and search the index; returns (1, limit) arrays.
+
+        With return_embedding, returns (distances, indices, embedding) where
+        the embedding is the encoder output before normalisation. A
+        case_filters.CaseSubset restricts the search to its rows; the encode
+        is still batched, the search runs on its own.
+        """
+        self._ensure_worker()
+        req = _Request(text, int(limit), normalize, return_embedding, subset)
+        self._queue.put(req)
+        result = req.future.result(timeout=timeout)
+        # stage times of the batch this request rode in, attributed to the caller's endpoint
+        for name, seconds in zip(("queue_wait", "encode", "search"), req.timings):
+            metrics.observe_stage(name, seconds)
+        return result
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+                "mean_queue_wait_ms": 1000.0 * self._queue_wait_total / self._items if self._items else 0.0,
+                "batch_size_histogram": {str(k): v for k, v in self._histogram.items()},
+            }
+
+    # ---------------- WORKER ---------------- #
+
+    def _ensure_worker(self):
+        # the thread does not survive fork(), so restart it in each worker process
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="batching-searcher", daemon=True)
+            self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._process(batch)
+            except Exception as e:
+                for req in batch:
+                    if not req.future.done():
+                        req.future.set_exception(e)
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        texts = [req.text for req in batch]
+
+        embs = self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+        embs = np.ascontiguousarray(embs, dtype="float32")
+        encoded = time.perf_counter()
+        raw = {i: embs[i].copy() for i, req in enumerate(batch) if req.return_embedding}
+
+        norm_rows = [i for i, req in enumerate(batch) if req.normalize]
+        if norm_rows:
+            sub = np.ascontiguousarray(embs[norm_rows])
+            faiss.normalize_L2(sub)
+            embs[norm_rows] = sub
+
+        # a failure fails only the request that caused it, never the rest of the batch
+        outcomes = {}
+        plain = [i for i, req in enumerate(batch) if req.subset is None]
+        if plain:
+            limit = max(batch[i].limit for i in plain)
+            try:
+                distances, indices = self.index.search(np.ascontiguousarray(embs[plain]), limit)
+            except Exception:
+                # find the culprit: search the plain rows one by one
+                for i in plain:
+                    outcomes[i] = self._search_one(batch[i], embs[i:i + 1])
+            else:
+                for row, i in enumerate(plain):
+                    outcomes[i] = (distances[row:row + 1, :batch[i].limit], indices[row:row + 1, :batch[i].limit])
+        for i, req in enumerate(batch):
+            if req.subset is not None:
+                outcomes[i] = self._search_one(req, embs[i:i + 1])
+        searched = time.perf_counter()
+
+        for i, req in enumerate(batch):
+            req.timings = (started - req.enqueued, encoded - started, searched - encoded)
+            result = outcomes[i]
+            if isinstance(result, Exception):
+                req.future.set_exception(result)
+            else:
+                req.future.set_result(result + (raw[i],) if req.return_embedding else result)
+
+        self._record(batch, started)
+
+    def _search_one(self, req, emb):
+        """Search one request's row; returns the result or the exception it raised."""
+        try:
+            if req.subset is not None:
+                return req.subset.search(self.index, emb, req.limit)
+            return self.index.search(emb, req.limit)
+        except Exception as e:
+            return e
+
+    def _record(self, batch, started):
+        size = len(batch)
+        with self._stats_lock:
+            self._batches += 1
+            self._items += size
+            self._queue_wait_total += sum(started - req.enqueued for req in batch)
+            for bound in BATCH_BUCKETS:
+                if size <= bound:
+                    self._histogram[bound] += 1
+                    break
+            else:
+                self._histogram["+Inf"] += 1
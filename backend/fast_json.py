@@ -0,0 +1,65 @@
+"""
+Fast JSON serialisation for API responses.
+
+Uses orjson when it is installed (several times faster than the stdlib
+encoder on large result lists, and serialises NumPy scalars/arrays natively),
+falling back to `json` with a NumPy-aware default. Installed on the Flask app
+as its JSON provider, so every `jsonify` call goes through it.
+"""
+import json
+
+import numpy as np
+from flask.json.provider import JSONProvider
+
+import metrics
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj):
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTS)
+
+    def loads(s):
+        return orjson.loads(s)
+else:
+    def dumps_bytes(obj):
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(s):
+        return json.loads(s)
+
+
+def dumps(obj):
+    return dumps_bytes(obj).decode("utf-8")
+
+
+class FastJSONProvider(JSONProvider):
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        with metrics.stage("serialize"):
+            body = dumps_bytes(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
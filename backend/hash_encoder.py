@@ -0,0 +1,45 @@
+"""
+Deterministic feature-hashing encoder for offline benchmarks.
+
+Drop-in for the SentenceTransformer calls the runtime makes (`encode`,
+`get_sentence_embedding_dimension`): each word is hashed with CRC32 into one
+of `dim` buckets with a hash-derived sign, and the vector is L2-normalised.
+Texts sharing words land near each other, so retrieval over a synthetic
+corpus still returns topical neighbours, with no model download and the same
+output on every machine. Selected with ADVOCA_ENCODER=hash.
+"""
+import re
+import zlib
+
+import numpy as np
+
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashEncoder:
+    def __init__(self, dim=768):
+        self.dim = int(dim)
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def _encode_one(self, text):
+        hashes = np.fromiter((zlib.crc32(w.encode("utf-8")) for w in WORD_RE.findall(text.lower())),
+                             dtype=np.uint32)
+        if len(hashes) == 0:
+            return np.zeros(self.dim, dtype=np.float32)
+        buckets = (hashes % self.dim).astype(np.intp)
+        signs = np.where(hashes & 0x80000000, 1.0, -1.0)
+        vec = np.bincount(buckets, weights=signs, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, show_progress_bar=False,
+               normalize_embeddings=True, **kwargs):
+        """Same shapes as SentenceTransformer.encode: (dim,) for a str, (n, dim) for a list."""
+        if isinstance(sentences, str):
+            return self._encode_one(sentences)
+        if len(sentences) == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack([self._encode_one(s) for s in sentences])
@@ -0,0 +1,296 @@
+"""
+Local background job queue backed by SQLite.
+
+Long-running analyses (analyze-file, large SCR/PCR calls) are stored as rows
+in a `jobs` table and executed by a small pool of worker threads in each
+server process, so no external broker is needed. Submitting returns a job id
+immediately; clients poll the status/result endpoints. Jobs with the same
+user, kind and parameters are deduplicated onto the existing row.
+
+A claimed job holds a lease that its process renews while the handler runs.
+Each process also runs a maintenance thread. It requeues running jobs whose
+lease has expired (their process died). It also deletes done and failed
+jobs, with their results and dedup keys, ADVOCA_JOB_RETENTION_SECONDS after
+they finish.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import sqlite3
+import threading
+
+import db
+import metrics
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+JOB_WORKERS = int(os.environ.get("ADVOCA_JOB_WORKERS", 2))
+POLL_SECONDS = 1.0
+# lease length: a running job not renewed for this long is assumed orphaned by a dead process
+STALE_SECONDS = int(os.environ.get("ADVOCA_JOB_STALE_SECONDS", 15 * 60))
+# done/failed jobs are deleted this long after finishing (0 keeps them forever)
+RETENTION_SECONDS = int(os.environ.get("ADVOCA_JOB_RETENTION_SECONDS", 7 * 24 * 3600))
+# interval of lease renewal, expired-lease requeue and the retention sweep
+SWEEP_SECONDS = float(os.environ.get("ADVOCA_JOB_SWEEP_SECONDS", 60))
+
+
+class JobError(Exception):
+    """Raised by job handlers for expected failures (bad input, missing file)."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def dedup_key(user_id, kind, params):
+    payload = json.dumps({"user_id": user_id, "kind": kind, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JobQueue:
+    def __init__(self, db_path, workers=JOB_WORKERS):
+        self.db_path = db_path
+        self.workers = max(1, int(workers))
+        self.handlers = {}
+
+        self._threads = []
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._leases = set()  # claim tokens of jobs running in this process
+        self._leases_lock = threading.Lock()
+
+    def init_schema(self):
+        conn = db.get_connection(self.db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                user_id INTEGER,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                dedup_key TEXT UNIQUE NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                error_status INTEGER,
+                claim_token TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        ''')
+        db.ensure_column(conn.cursor(), 'jobs', 'lease_until', 'REAL')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at)')
+        conn.commit()
+        db.close_connections()
+
+    def register(self, kind, handler):
+        """handler(user_id, params) -> JSON-serialisable result"""
+        self.handlers[kind] = handler
+
+    # ---------------- SUBMIT / QUERY ---------------- #
+
+    def submit(self, user_id, kind, params):
+        """Queue a job; returns (job_id, deduplicated)."""
+        if kind not in self.handlers:
+            raise JobError(f"Unknown job type: {kind}")
+
+        key = dedup_key(user_id, kind, params)
+        now = time.time()
+        conn = db.get_connection(self.db_path)
+        try:
+            row = conn.execute('SELECT id, status FROM jobs WHERE dedup_key = ?', (key,)).fetchone()
+            if row and row['status'] != FAILED:
+                metrics.CACHE.labels("job_dedup", "hit").inc()
+                return row['id'], True
+
+            if row:
+                # retry a failed job in place
+                job_id = row['id']
+                conn.execute('''
+                    UPDATE jobs SET status = ?, result = NULL, error = NULL, error_status = NULL,
+                        claim_token = NULL, lease_until = NULL, created_at = ?, started_at = NULL,
+                        finished_at = NULL
+                    WHERE id = ?
+                ''', (QUEUED, now, job_id))
+            else:
+                job_id = uuid.uuid4().hex
+                conn.execute('''
+                    INSERT INTO jobs (id, user_id, kind, params, dedup_key, status, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (job_id, user_id, kind, json.dumps(params), key, QUEUED, now))
+            conn.commit()
+        except sqlite3.IntegrityError:
+            # a concurrent submit inserted the same job first
+            conn.rollback()
+            row = conn.execute('SELECT id FROM jobs WHERE dedup_key = ?', (key,)).fetchone()
+            metrics.CACHE.labels("job_dedup", "hit").inc()
+            return row['id'], True
+        except Exception:
+            conn.rollback()
+            raise
+
+        metrics.CACHE.labels("job_dedup", "miss").inc()
+        self.ensure_workers()
+        self._wakeup.set()
+        return job_id, False
+
+    def get(self, job_id, user_id):
+        self.ensure_workers()
+        conn = db.get_connection(self.db_path)
+        row = conn.execute('SELECT * FROM jobs WHERE id = ? AND user_id = ?', (job_id, user_id)).fetchone()
+        if not row:
+            return None
+
+        return {
+            'job_id': row['id'],
+            'kind': row['kind'],
+            'params': json.loads(row['params']),
+            'status': row['status'],
+            'error': row['error'],
+            'error_status': row['error_status'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+            'result': json.loads(row['result']) if row['result'] else None,
+        }
+
+    # ---------------- WORKERS ---------------- #
+
+    def ensure_workers(self):
+        # threads do not survive fork(), so each server process starts its own pool
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._wakeup = threading.Event()
+            self._leases = set()
+            self._maintain()
+            self._threads = []
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+            t = threading.Thread(target=self._maintenance_loop, name="job-maintenance", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    # ---------------- MAINTENANCE ---------------- #
+
+    def _maintenance_loop(self):
+        while True:
+            time.sleep(SWEEP_SECONDS)
+            try:
+                self._maintain()
+            except sqlite3.Error as e:
+                print(f"[JOBS] Maintenance failed: {e}")
+
+    def _maintain(self):
+        self._renew_leases()
+        if self._requeue_stale():
+            self._wakeup.set()
+        self._sweep_finished()
+
+    def _renew_leases(self):
+        with self._leases_lock:
+            tokens = list(self._leases)
+        if not tokens:
+            return
+        with db.transaction(self.db_path) as conn:
+            conn.execute(
+                f'UPDATE jobs SET lease_until = ? WHERE status = ? AND claim_token IN ({",".join("?" * len(tokens))})',
+                (time.time() + STALE_SECONDS, RUNNING, *tokens)
+            )
+
+    def _requeue_stale(self):
+        """Requeue running jobs whose lease has expired; returns how many."""
+        with db.transaction(self.db_path) as conn:
+            # rows claimed before lease_until existed fall back to started_at
+            cur = conn.execute('''
+                UPDATE jobs SET status = ?, claim_token = NULL, lease_until = NULL
+                WHERE status = ? AND COALESCE(lease_until, started_at + ?) < ?
+            ''', (QUEUED, RUNNING, STALE_SECONDS, time.time()))
+            requeued = cur.rowcount
+        if requeued:
+            print(f"[JOBS] Requeued {requeued} job(s) with an expired lease")
+        return requeued
+
+    def _sweep_finished(self):
+        """Delete done/failed jobs past retention, with their results and dedup keys."""
+        if RETENTION_SECONDS <= 0:
+            return 0
+        with db.transaction(self.db_path) as conn:
+            cur = conn.execute('DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?',
+                               (DONE, FAILED, time.time() - RETENTION_SECONDS))
+            return cur.rowcount
+
+    def _claim(self):
+        token = uuid.uuid4().hex
+        now = time.time()
+        with db.transaction(self.db_path) as conn:
+            cur = conn.execute('''
+                UPDATE jobs SET status = ?, claim_token = ?, started_at = ?, lease_until = ?
+                WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1)
+                  AND status = ?
+            ''', (RUNNING, token, now, now + STALE_SECONDS, QUEUED, QUEUED))
+            claimed = cur.rowcount == 1
+        if not claimed:
+            return None
+        with self._leases_lock:
+            self._leases.add(token)
+        return db.get_connection(self.db_path).execute(
+            'SELECT * FROM jobs WHERE claim_token = ?', (token,)
+        ).fetchone()
+
+    def _finish(self, job, status, result=None, error=None, error_status=None):
+        with self._leases_lock:
+            self._leases.discard(job['claim_token'])
+        # a job requeued after its lease expired now belongs to its new claim
+        with db.transaction(self.db_path) as conn:
+            conn.execute('''
+                UPDATE jobs SET status = ?, result = ?, error = ?, error_status = ?, finished_at = ?,
+                    lease_until = NULL
+                WHERE id = ? AND claim_token = ?
+            ''', (status, json.dumps(result) if result is not None else None,
+                  error, error_status, time.time(), job['id'], job['claim_token']))
+
+    def _run(self):
+        while True:
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                print(f"[JOBS] Claim failed: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(POLL_SECONDS)
+                self._wakeup.clear()
+                continue
+
+            handler = self.handlers.get(job['kind'])
+            # stages recorded by the handler are attributed to job:<kind>
+            metrics.set_endpoint(f"job:{job['kind']}")
+            started = time.perf_counter()
+            try:
+                if handler is None:
+                    raise JobError(f"Unknown job type: {job['kind']}")
+                result = handler(job['user_id'], json.loads(job['params']))
+                self._finish(job, DONE, result=result)
+            except JobError as e:
+                if e.status >= 500:
+                    metrics.count_error()
+                self._finish(job, FAILED, error=str(e), error_status=e.status)
+            except Exception as e:
+                print(f"[JOBS] Job {job['id']} failed: {e}")
+                metrics.count_error()
+                self._finish(job, FAILED, error=str(e), error_status=500)
+            metrics.observe_stage("run", time.perf_counter() - started)
@@ -0,0 +1,216 @@
+"""
+BM25 inverted index over DI text, and hybrid (lexical + dense) retrieval.
+
+Dense e5 similarity misses exact legal terms ("res ipsa loquitur", a statute
+section, a party name). The lexical index scores those with BM25 over each
+case's raw_text and headnotes. Hybrid SCR/PCR fuse the BM25 and dense
+candidate lists with reciprocal rank fusion.
+
+Layout (EMB_DIR/lexical, built by build_lexical.py):
+
+    terms.npy      uint32 (V,)    sorted term hashes (CRC32, as snippets.tokenize)
+    df.npy         uint32 (V,)    documents containing each term
+    offsets.npy    int64  (V+1,)  byte range of each term's block in postings.bin
+    postings.bin   per term: zlib(delta-coded doc ids as uint32 | term frequencies as uint16)
+    doc_len.npy    uint32 (N,)    content terms per document
+    meta.json      docs, avgdl, k1, b, DI dataset stamp (written last: marks a complete build)
+
+Postings are memory-mapped and decoded per query term. Terms are scored
+rarest first, and decoding stops once POSTINGS_BUDGET postings have been
+read. On a multi-million-case corpus the skipped terms are the most common
+ones, which have the lowest idf, so query latency is bounded by the budget
+rather than the corpus size.
+"""
+import os
+import json
+import math
+import zlib
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+import runtime
+import metrics
+from snippets import WORD_RE, STOPWORDS, tokenize
+
+
+K1 = 1.2
+B = 0.75
+RRF_K = 60
+POSTINGS_BUDGET = int(os.environ.get("ADVOCA_BM25_POSTINGS_BUDGET", 1_000_000))
+RETRIEVAL_MODES = ("dense", "hybrid")
+
+
+class LexicalUnavailable(RuntimeError):
+    """Hybrid retrieval was requested but the lexical index is not built or out of date."""
+
+
+def term_counts(text):
+    """(term hashes, counts) of the content words in `text`, tokenised like snippets.tokenize."""
+    counts = Counter(w for w in WORD_RE.findall(text.lower()) if len(w) > 2 and w not in STOPWORDS)
+    hashes = np.fromiter((zlib.crc32(w.encode("utf-8")) for w in counts), dtype=np.uint32, count=len(counts))
+    return hashes, np.fromiter(counts.values(), dtype=np.uint32, count=len(counts))
+
+
+def document_text(case):
+    return " ".join(filter(None, (case.get("raw_text"), case.get("headnotes"))))
+
+
+def encode_postings(docs, tfs):
+    """Compressed block for one term: ascending doc ids and their term frequencies."""
+    deltas = np.diff(docs.astype(np.int64), prepend=0).astype(np.uint32)
+    return zlib.compress(deltas.tobytes() + np.minimum(tfs, 65535).astype(np.uint16).tobytes())
+
+
+# ---------------- INDEX ---------------- #
+
+class BM25Index:
+    def __init__(self, terms, df, offsets, postings, doc_len, meta):
+        self.terms = terms
+        self.df = df
+        self.offsets = offsets
+        self.postings = postings
+        self.k1 = float(meta.get("k1", K1))
+        self.b = float(meta.get("b", B))
+        self.docs = int(meta["docs"])
+        self.dataset = meta.get("dataset")
+        avgdl = float(meta["avgdl"]) or 1.0
+        # per-document part of the BM25 denominator
+        self.norm = (self.k1 * (1 - self.b + self.b * np.asarray(doc_len, dtype=np.float32) / avgdl)).astype(np.float32)
+
+    @staticmethod
+    def exists(index_dir):
+        return (Path(index_dir) / "meta.json").exists()
+
+    @classmethod
+    def load(cls, index_dir):
+        d = Path(index_dir)
+        with open(d / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        postings = np.memmap(d / "postings.bin", dtype=np.uint8, mode="r") if meta["postings"] else np.zeros(0, np.uint8)
+        return cls(np.load(d / "terms.npy", mmap_mode="r"), np.load(d / "df.npy", mmap_mode="r"),
+                   np.load(d / "offsets.npy", mmap_mode="r"), postings,
+                   np.load(d / "doc_len.npy"), meta)
+
+    def idf(self, df):
+        return math.log(1.0 + (self.docs - df + 0.5) / (df + 0.5))
+
+    def postings_for(self, t):
+        """Doc ids (int64) and term frequencies (float32) of term row `t`."""
+        n = int(self.df[t])
+        raw = zlib.decompress(self.postings[self.offsets[t]:self.offsets[t + 1]])
+        docs = np.cumsum(np.frombuffer(raw, dtype=np.uint32, count=n), dtype=np.int64)
+        tfs = np.frombuffer(raw, dtype=np.uint16, count=n, offset=4 * n).astype(np.float32)
+        return docs, tfs
+
+    def search(self, query_text, limit, subset=None):
+        """Top `limit` documents by BM25: (scores, doc ids), best first.
+
+        `subset` (case_filters.CaseSubset) keeps only the rows passing a filter.
+        """
+        hashes = tokenize(query_text)
+        rows = np.searchsorted(self.terms, hashes)
+        found = rows < len(self.terms)
+        found[found] = self.terms[rows[found]] == hashes[found]
+        rows = rows[found]
+        if len(rows) == 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+        doc_parts, score_parts = [], []
+        decoded = 0
+        for t in rows[np.argsort(self.df[rows], kind="stable")]:
+            df = int(self.df[t])
+            if decoded and decoded + df > POSTINGS_BUDGET:
+                break  # remaining terms are more common, so lower idf
+            docs, tfs = self.postings_for(t)
+            score_parts.append(self.idf(df) * tfs * (self.k1 + 1) / (tfs + self.norm[docs]))
+            doc_parts.append(docs)
+            decoded += df
+
+        if len(doc_parts) == 1:
+            docs, scores = doc_parts[0], score_parts[0]
+        elif decoded * 8 > self.docs:
+            # long postings: a dense accumulator is cheaper than sorting them
+            # (doc ids are unique within a term, so fancy-index += is exact)
+            acc = np.zeros(self.docs, dtype=np.float32)
+            for docs, scores in zip(doc_parts, score_parts):
+                acc[docs] += scores
+            # the limit-th best total among the rarest term's docs is a lower
+            # bound on the overall limit-th best, so only scan above it
+            sample = acc[doc_parts[0]]
+            if subset is None and len(sample) >= limit > 0:
+                docs = np.flatnonzero(acc >= np.partition(sample, len(sample) - limit)[len(sample) - limit])
+            else:
+                docs = np.flatnonzero(acc > 0)
+            scores = acc[docs]
+        else:
+            docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts)).astype(np.float32)
+        if subset is not None:
+            keep = subset.contains(docs)
+            docs, scores = docs[keep], scores[keep]
+
+        top = min(limit, len(docs))
+        if top == 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        best = np.argpartition(-scores, top - 1)[:top] if top < len(docs) else np.arange(len(docs))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return scores[best], docs[best]
+
+
+# ---------------- HYBRID ---------------- #
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse ranked lists of doc ids: score(d) = sum over lists of 1 / (k + rank).
+
+    Returns (doc ids, fused scores), best first.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (k + rank)
+    order = sorted(fused, key=lambda d: (-fused[d], d))
+    return order, [fused[d] for d in order]
+
+
+def hybrid_search(query_text, limit, normalize=True, subset=None):
+    """Dense and BM25 candidates fused with RRF, in the shape of a dense search.
+
+    Returns (distances, indices, lexical) where indices (1, n) are in fused
+    order, distances hold each row's dense score (cosine with `normalize`,
+    raw inner product otherwise), and `lexical` maps row -> BM25 score.
+    """
+    index = runtime.load_lexical()
+    if index is None:
+        raise LexicalUnavailable("Hybrid retrieval not available: lexical index not built or out of date "
+                                 "(run build_lexical.py)")
+
+    distances, indices, embedding = runtime.encode_and_search(
+        "query: " + query_text.strip(), limit, normalize=normalize, return_embedding=True, subset=subset)
+    with metrics.stage("lexical"):
+        lex_scores, lex_rows = index.search(query_text, limit, subset=subset)
+
+    valid = indices[0] >= 0
+    dense_rows = indices[0][valid]
+    dense = dict(zip(dense_rows.tolist(), distances[0][valid].tolist()))
+    rows, _ = reciprocal_rank_fusion([dense_rows.tolist(), lex_rows.tolist()])
+    rows = rows[:limit]
+
+    # rows found only lexically have no dense score yet: score them exactly
+    missing = [r for r in rows if r not in dense]
+    if missing:
+        query = embedding.astype(np.float32)
+        if normalize:
+            query = query / (np.linalg.norm(query) or 1.0)
+        try:
+            sims = (runtime.load_index().reconstruct_batch(np.asarray(missing, dtype=np.int64)) @ query).tolist()
+        except RuntimeError:
+            # index cannot return stored vectors: rank them below every dense hit
+            sims = [min(dense.values(), default=0.0)] * len(missing)
+        dense.update(zip(missing, sims))
+
+    lexical = dict(zip(lex_rows.tolist(), lex_scores.tolist()))
+    return (np.array([[dense[r] for r in rows]], dtype=np.float32),
+            np.array([rows], dtype=np.int64),
+            {r: lexical.get(r, 0.0) for r in rows})
@@ -8,27 +8,24 @@ import re
 from pathlib import Path
 
 import numpy as np
-import pandas as pd
-import joblib
 import faiss
-from tqdm import tqdm
 
-from sklearn.neural_network import MLPClassifier
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, accuracy_score
+import runtime
+import metrics
+from ljp_engine import LJPEngine, export_mlp
 
 
 # ---------------- CONFIG ---------------- #
 
 BASE_DIR = Path(__file__).resolve().parent
-EMB_DIR = BASE_DIR / "di_prime_embeddings"
+EMB_DIR = runtime.EMB_DIR
 
-EMB_FILE = EMB_DIR / "embeddings.npy"
-FAISS_FILE = EMB_DIR / "faiss.index"
-META_FILE = EMB_DIR / "metadata.joblib"
+EMB_FILE = runtime.EMB_FILE
+FAISS_FILE = runtime.FAISS_FILE
+META_FILE = runtime.META_FILE
 
 MODEL_OUT = BASE_DIR / "ljp_model_final.joblib"
+ENGINE_DIR = Path(os.environ.get("ADVOCA_LJP_ENGINE_DIR", BASE_DIR / "ljp_engine"))
 
 CONF_THRESHOLD = 0.90
 DROP_LABEL = "settlement"
@@ -60,14 +57,17 @@ def guess_label(text):
 # ---------------- LOAD DATA ---------------- #
 
 def load_embeddings():
+    # memory-mapped and shared with SCR/PCR through the runtime module
     print("[LOAD] Loading embeddings + FAISS + metadata")
-    embeddings = np.load(EMB_FILE)
-    index = faiss.read_index(str(FAISS_FILE))
-    metadata = joblib.load(META_FILE)
+    embeddings = runtime.load_embeddings()
+    index = runtime.load_index()
+    metadata = runtime.load_metadata()
     return embeddings, index, metadata
 
 
 def build_dataframe(metadata, limit=5000):
+    import pandas as pd
+
     print("[DATA] Building lightweight DataFrame")
     records = []
     sample_labels = ["plaintiff", "defendant", "dismissal"]
@@ -110,6 +110,14 @@ def build_feature(idx, embeddings, index, k=6):
 # ---------------- TRAIN ---------------- #
 
 def train_model(df, embeddings, index):
+    # training stack is only needed here, not on serving nodes
+    import joblib
+    from tqdm import tqdm
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import classification_report, accuracy_score
+
     print("[TRAIN] Preparing training data")
 
     labeled = df[df["verdict"].notnull()]
@@ -149,9 +157,26 @@ def train_model(df, embeddings, index):
     joblib.dump({"clf": clf, "label_enc": le}, MODEL_OUT)
     print(f"[SAVE] Model saved → {MODEL_OUT}")
 
+    export_model(clf, le)
+
     return clf, le
 
 
+# ---------------- EXPORT ---------------- #
+
+def export_model(clf, le, engine_dir=ENGINE_DIR):
+    """Export the MLP weights + label classes for the NumPy inference engine."""
+    export_mlp(clf, le, engine_dir)
+    print(f"[SAVE] Inference engine exported → {engine_dir}")
+    return engine_dir
+
+
+def load_engine(engine_dir=ENGINE_DIR):
+    """Load the exported engine; returns (clf, le) usable by explain_case."""
+    engine = LJPEngine.load(engine_dir)
+    return engine, engine.label_enc
+
+
 # ---------------- INFERENCE ---------------- #
 
 def explain_case(text, clf, le, embeddings, index, top_k=5):
@@ -161,21 +186,24 @@ def explain_case(text, clf, le, embeddings, index, top_k=5):
     q = own.reshape(1, -1).astype("float32")
     faiss.normalize_L2(q)
 
-    D, I = index.search(q, top_k + 1)
-    nbrs = I[0][1:top_k+1]
-    sims = D[0][1:top_k+1]
+    with metrics.stage("search"):
+        D, I = index.search(q, top_k + 1)
+    # the proxy row is its own nearest neighbour; skip it
+    return explain_from_neighbors(own, I[0][1:top_k+1], D[0][1:top_k+1], clf, le, embeddings)
+
 
+def explain_from_neighbors(own, nbrs, sims, clf, le, embeddings):
+    """Predict and explain from a case embedding and its retrieved neighbours."""
     neigh = np.mean(embeddings[nbrs], axis=0)
     sim = float(np.mean(sims))
 
-    # Get prediction with neighbors
+    # Score with neighbors and without (just text embedding + zeros) in one batch
     feat_with_neighbors = np.concatenate([own, neigh, [sim]])
-    probs_with_neighbors = clf.predict_proba([feat_with_neighbors])[0]
-    p = np.argmax(probs_with_neighbors)
-    
-    # Get prediction without neighbors (just text embedding + zeros)
     feat_without_neighbors = np.concatenate([own, np.zeros_like(neigh), [0.0]])
-    probs_without_neighbors = clf.predict_proba([feat_without_neighbors])[0]
+    with metrics.stage("predict"):
+        probs = clf.predict_proba(np.vstack([feat_with_neighbors, feat_without_neighbors]))
+    probs_with_neighbors, probs_without_neighbors = probs[0], probs[1]
+    p = np.argmax(probs_with_neighbors)
     
     # Calculate neighbor influence
     neighbor_influence_delta = float(probs_with_neighbors[p] - probs_without_neighbors[p])
@@ -205,10 +233,15 @@ def main():
     embeddings, index, metadata = load_embeddings()
     df = build_dataframe(metadata)
 
-    if MODEL_OUT.exists():
+    if LJPEngine.exists(ENGINE_DIR):
+        print("[LOAD] Loading exported inference engine")
+        clf, le = load_engine()
+    elif MODEL_OUT.exists():
         print("[LOAD] Loading trained model")
+        import joblib
         bundle = joblib.load(MODEL_OUT)
         clf, le = bundle["clf"], bundle["label_enc"]
+        export_model(clf, le)
     else:
         clf, le = train_model(df, embeddings, index)
 
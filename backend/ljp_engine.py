@@ -0,0 +1,152 @@
+"""
+Lightweight NumPy inference engine for the LJP MLP.
+
+`ljp.export_model` writes the weights of the trained sklearn MLPClassifier and
+the LabelEncoder classes as plain .npy arrays. This module loads them
+memory-mapped and runs the forward pass with NumPy only, so serving nodes do
+not need scikit-learn and do not unpickle the training bundle.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+
+ENGINE_META = "engine.json"
+CLASSES_FILE = "classes.npy"
+
+
+# ---------------- ACTIVATIONS ---------------- #
+
+def _identity(x):
+    return x
+
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def _tanh(x):
+    return np.tanh(x, out=x)
+
+
+def _logistic(x):
+    # numerically stable sigmoid
+    return np.exp(-np.logaddexp(0, -x), out=x)
+
+
+def _softmax(x):
+    x -= x.max(axis=1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=1, keepdims=True)
+    return x
+
+
+ACTIVATIONS = {
+    "identity": _identity,
+    "relu": _relu,
+    "tanh": _tanh,
+    "logistic": _logistic,
+    "softmax": _softmax,
+}
+
+
+# ---------------- LABELS ---------------- #
+
+class EngineLabels:
+    """Stand-in for the sklearn LabelEncoder used at inference time."""
+
+    def __init__(self, classes):
+        self.classes_ = classes
+
+    def inverse_transform(self, y):
+        return self.classes_[np.asarray(y, dtype=np.intp)]
+
+
+# ---------------- ENGINE ---------------- #
+
+class LJPEngine:
+    """Forward-pass-only MLP with the same predict_proba contract as sklearn."""
+
+    def __init__(self, weights, biases, activation, out_activation, classes):
+        if len(weights) != len(biases):
+            raise ValueError("weights and biases must have the same number of layers")
+        if activation not in ACTIVATIONS or out_activation not in ACTIVATIONS:
+            raise ValueError(f"Unsupported activation: {activation}/{out_activation}")
+
+        self.weights = weights
+        self.biases = biases
+        self.activation = activation
+        self.out_activation = out_activation
+        self.label_enc = EngineLabels(classes)
+        self.classes_ = np.arange(len(classes))
+        self.n_features_in_ = weights[0].shape[0]
+
+    @classmethod
+    def load(cls, engine_dir, mmap=True):
+        engine_dir = Path(engine_dir)
+        with open(engine_dir / ENGINE_META, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        mode = "r" if mmap else None
+        weights, biases = [], []
+        for i in range(meta["n_layers"]):
+            weights.append(np.load(engine_dir / f"W{i}.npy", mmap_mode=mode, allow_pickle=False))
+            biases.append(np.load(engine_dir / f"b{i}.npy", mmap_mode=mode, allow_pickle=False))
+        classes = np.load(engine_dir / CLASSES_FILE, allow_pickle=False)
+
+        return cls(weights, biases, meta["activation"], meta["out_activation"], classes)
+
+    @staticmethod
+    def exists(engine_dir):
+        return (Path(engine_dir) / ENGINE_META).exists()
+
+    def predict_proba(self, X):
+        """Score a batch of feature vectors; returns (n_samples, n_classes)."""
+        a = np.asarray(X, dtype=np.float32)
+        if a.ndim == 1:
+            a = a.reshape(1, -1)
+        if a.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got {a.shape[1]}")
+
+        hidden = ACTIVATIONS[self.activation]
+        last = len(self.weights) - 1
+        for i, (W, b) in enumerate(zip(self.weights, self.biases)):
+            a = a @ W
+            a += b
+            if i < last:
+                a = hidden(a)
+
+        a = ACTIVATIONS[self.out_activation](a)
+
+        # binary MLPs have a single logistic output unit
+        if a.shape[1] == 1:
+            a = np.hstack([1.0 - a, a])
+        return a
+
+    def predict(self, X):
+        return np.argmax(self.predict_proba(X), axis=1)
+
+
+def export_mlp(clf, le, engine_dir):
+    """Write a fitted MLPClassifier + LabelEncoder as plain float32 arrays."""
+    engine_dir = Path(engine_dir)
+    engine_dir.mkdir(parents=True, exist_ok=True)
+
+    for i, (W, b) in enumerate(zip(clf.coefs_, clf.intercepts_)):
+        np.save(engine_dir / f"W{i}.npy", np.ascontiguousarray(W, dtype=np.float32))
+        np.save(engine_dir / f"b{i}.npy", np.ascontiguousarray(b, dtype=np.float32))
+
+    np.save(engine_dir / CLASSES_FILE, np.asarray(le.classes_).astype(str))
+
+    meta = {
+        "n_layers": len(clf.coefs_),
+        "activation": clf.activation,
+        "out_activation": clf.out_activation_,
+        "n_features_in": int(clf.coefs_[0].shape[0]),
+        "classes": [str(c) for c in le.classes_],
+    }
+    with open(engine_dir / ENGINE_META, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    return engine_dir
@@ -0,0 +1,277 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Request latency per endpoint, per-stage latency (encode, index search,
+re-rank, snippets, serialisation, extraction, ...), cache hit/miss and error
+counters, plus gauges for the loaded index and process RSS. Rendered by
+/api/metrics in the Prometheus text format.
+
+Recording is a perf_counter call, a bisect and a short locked update, so it
+stays on in production. Metrics are per process: under Gunicorn every worker
+keeps its own values, and each sample carries a `pid` label so scrapes from
+different workers can be told apart.
+
+    with metrics.stage("rerank"):
+        ...
+    metrics.CACHE.labels("extract", "hit").inc()
+"""
+import os
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+
+
+# seconds; covers sub-millisecond stages up to slow PDF extraction
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    # getpid at render time: workers forked from a preloaded master differ
+    pairs = list(zip(names, values)) + list(extra) + [("pid", os.getpid())]
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ---------------- METRIC TYPES ---------------- #
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        # labels() may add a child while a scrape runs
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self._value += amount
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_labels(labelnames, key)} {_fmt(self._value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def render(self, name, labelnames, key):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._buckets + (float("inf"),), counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(labelnames, key, [('le', _fmt(bound))])} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labelnames, key)} {_fmt(total)}")
+        lines.append(f"{name}_count{_labels(labelnames, key)} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class Gauge(_Metric):
+    """Gauge whose samples are computed at scrape time by `fn() -> {label tuple: value}`."""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, fn, labelnames=()):
+        self.fn = fn
+        super().__init__(name, documentation, labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            samples = self.fn()
+        except Exception:
+            samples = {}
+        for key, value in sorted(samples.items()):
+            if value is not None:
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}")
+        return lines
+
+
+REGISTRY = []
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- STAGES ---------------- #
+
+# endpoint the current thread is serving; set per request / per job
+_endpoint = contextvars.ContextVar("advoca_endpoint", default="-")
+
+
+def set_endpoint(name):
+    return _endpoint.set(name)
+
+
+def current_endpoint():
+    return _endpoint.get()
+
+
+def observe_stage(name, seconds, endpoint=None):
+    STAGE_SECONDS.labels(endpoint or _endpoint.get(), name).observe(seconds)
+
+
+@contextmanager
+def stage(name):
+    """Time a block as stage `name` of the current endpoint."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def count_error(endpoint=None):
+    ERRORS.labels(endpoint or _endpoint.get()).inc()
+
+
+# ---------------- PROCESS ---------------- #
+
+def process_rss_bytes():
+    """Resident set size from /proc/self/statm, falling back to peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _index_samples():
+    # only report assets that are already loaded; never trigger a load from a scrape
+    import runtime
+
+    samples = {}
+    if runtime.is_loaded("load_index"):
+        index = runtime.load_index()
+        samples[("vectors",)] = index.ntotal
+        samples[("dimension",)] = index.d
+        samples[("code_bytes",)] = index.ntotal * getattr(index, "code_size", index.d * 4)
+    if runtime.is_loaded("load_embeddings"):
+        samples[("embedding_bytes",)] = runtime.load_embeddings().nbytes
+    if runtime.is_loaded("load_cases"):
+        samples[("cases",)] = len(runtime.load_cases())
+    return samples
+
+
+# ---------------- METRICS ---------------- #
+
+REQUEST_SECONDS = Histogram(
+    "advoca_request_seconds", "Request latency by endpoint (time to first byte for streams)",
+    ("endpoint", "method"))
+REQUESTS = Counter(
+    "advoca_requests_total", "Requests by endpoint and status code", ("endpoint", "status"))
+ERRORS = Counter(
+    "advoca_errors_total", "Server-side failures (5xx responses, failed jobs)", ("endpoint",))
+STAGE_SECONDS = Histogram(
+    "advoca_stage_seconds", "Latency of individual processing stages", ("endpoint", "stage"))
+CACHE = Counter(
+    "advoca_cache_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result"))
+
+Gauge("advoca_process_resident_memory_bytes", "Resident memory of this process",
+      lambda: {(): process_rss_bytes()})
+Gauge("advoca_index_info", "Loaded retrieval assets (vectors, dimension, bytes, cases)",
+      _index_samples, ("field",))
+
+
+# ---------------- FLASK ---------------- #
+
+def init_metrics(app):
+    """Time and count every request; endpoint names come from the URL rule.
+
+    Register before other after_request hooks (e.g. compression) so that
+    their work is included in the request time.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+        set_endpoint(request.endpoint or "unknown")
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop("_metrics_started", None)
+        if started is not None:
+            endpoint = request.endpoint or "unknown"
+            REQUEST_SECONDS.labels(endpoint, request.method).observe(time.perf_counter() - started)
+            REQUESTS.labels(endpoint, response.status_code).inc()
+            if response.status_code >= 500:
+                ERRORS.labels(endpoint).inc()
+        return response
+
+    return app
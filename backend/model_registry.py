@@ -0,0 +1,97 @@
+"""
+Thread-safe registry for heavyweight model assets.
+
+Each asset is registered with a loader callable. The first caller of `get`
+(or an eager `warm_up` at startup) runs the loader under a per-asset lock;
+concurrent callers block on that lock instead of starting a duplicate load.
+Load state and duration are kept for the status endpoints.
+"""
+import threading
+import time
+
+
+COLD = "cold"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class _Asset:
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.state = COLD
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self.loaded_at = None
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._assets = {}
+
+    def register(self, name, loader):
+        self._assets[name] = _Asset(name, loader)
+
+    def get(self, name):
+        """Return the loaded asset, loading it first if needed."""
+        asset = self._assets[name]
+        if asset.state == READY:
+            return asset.value
+
+        with asset.lock:
+            # another thread may have finished the load while we waited
+            if asset.state == READY:
+                return asset.value
+
+            asset.state = LOADING
+            asset.error = None
+            t0 = time.perf_counter()
+            try:
+                value = asset.loader()
+            except Exception as e:
+                asset.state = FAILED
+                asset.error = str(e)
+                asset.load_seconds = time.perf_counter() - t0
+                print(f"[REGISTRY] Failed to load '{name}': {e}")
+                raise
+
+            asset.value = value
+            asset.load_seconds = time.perf_counter() - t0
+            asset.loaded_at = time.time()
+            asset.state = READY
+            print(f"[REGISTRY] Loaded '{name}' in {asset.load_seconds:.2f}s")
+            return value
+
+    def is_ready(self, name):
+        return self._assets[name].state == READY
+
+    def warm_up(self, names=None, background=True):
+        """Eagerly load assets, optionally on a daemon thread."""
+        names = list(names or self._assets)
+
+        def _load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    pass  # recorded on the asset; first request will retry
+
+        if not background:
+            _load_all()
+            return None
+
+        thread = threading.Thread(target=_load_all, name="registry-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self, name):
+        asset = self._assets[name]
+        return {
+            "state": asset.state,
+            "load_seconds": asset.load_seconds,
+            "loaded_at": asset.loaded_at,
+            "error": asset.error,
+        }
@@ -0,0 +1,105 @@
+"""
+PDF text extraction with PyMuPDF.
+
+Two modes:
+  * budgeted: read pages in order and stop once `max_chars` characters have
+    been collected, so a 500-page appendix costs only the pages needed;
+  * full: split the document into page ranges and extract them in parallel
+    across a process pool, then join the parts once.
+
+Kept separate from backend_server so pool workers only import fitz.
+"""
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+
+# documents shorter than this are extracted in-process
+PARALLEL_MIN_PAGES = int(os.environ.get("ADVOCA_PDF_PARALLEL_MIN_PAGES", 40))
+PAGES_PER_TASK = int(os.environ.get("ADVOCA_PDF_PAGES_PER_TASK", 20))
+PDF_WORKERS = int(os.environ.get("ADVOCA_PDF_WORKERS", min(4, os.cpu_count() or 1)))
+
+_pool = None
+_pool_pid = None
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        # spawn: forking a threaded server process is not safe
+        ctx = multiprocessing.get_context("spawn")
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=ctx)
+        _pool_pid = os.getpid()
+    return _pool
+
+
+def _extract_range(args):
+    file_path, start, stop = args
+    doc = fitz.open(file_path)
+    try:
+        return "".join(doc[i].get_text() for i in range(start, stop))
+    finally:
+        doc.close()
+
+
+def _extract_budgeted(doc, max_chars):
+    parts = []
+    total = 0
+    pages_read = 0
+    for page in doc:
+        text = page.get_text()
+        parts.append(text)
+        total += len(text)
+        pages_read += 1
+        if total >= max_chars:
+            break
+    truncated = total > max_chars or pages_read < doc.page_count
+    return "".join(parts)[:max_chars], pages_read, truncated
+
+
+def extract_pdf_text(file_path, max_chars=None, parallel=True):
+    """Extract text from a PDF; returns (text, stats).
+
+    With `max_chars` the extraction stops at the first page that fills the
+    budget. Without it, large documents are extracted in parallel.
+    """
+    t0 = time.perf_counter()
+    doc = fitz.open(file_path)
+    try:
+        page_count = doc.page_count
+
+        if max_chars:
+            text, pages_read, truncated = _extract_budgeted(doc, max_chars)
+            mode = "budgeted"
+        elif parallel and PDF_WORKERS > 1 and page_count >= PARALLEL_MIN_PAGES:
+            doc.close()
+            doc = None
+            ranges = [(file_path, start, min(start + PAGES_PER_TASK, page_count))
+                      for start in range(0, page_count, PAGES_PER_TASK)]
+            text = "".join(_get_pool().map(_extract_range, ranges))
+            pages_read = page_count
+            truncated = False
+            mode = "parallel"
+        else:
+            text = "".join(page.get_text() for page in doc)
+            pages_read = page_count
+            truncated = False
+            mode = "sequential"
+    finally:
+        if doc is not None:
+            doc.close()
+
+    stats = {
+        "mode": mode,
+        "pages_total": page_count,
+        "pages_read": pages_read,
+        "chars": len(text),
+        "truncated": truncated,
+        "seconds": round(time.perf_counter() - t0, 4),
+    }
+    print(f"[PDF] {os.path.basename(file_path)}: {pages_read}/{page_count} pages, "
+          f"{len(text)} chars, {mode}, {stats['seconds']:.3f}s")
+    return text, stats
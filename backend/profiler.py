@@ -0,0 +1,233 @@
+"""
+On-demand sampling profiler for individual requests.
+
+A request is profiled when it carries `X-Advoca-Profile: <ADVOCA_PROFILE_TOKEN>`
+or, with ADVOCA_PROFILE_SAMPLE_RATE > 0, when it is picked at random. While
+the handler runs, a helper thread snapshots the handler thread's stack every
+ADVOCA_PROFILE_INTERVAL_MS via `sys._current_frames()`; nothing is traced, so
+the profiled request runs at close to normal speed.
+
+Each profile is written to ADVOCA_PROFILE_DIR as
+    <id>.folded   collapsed stacks ("a;b;c count"), for flamegraph.pl / speedscope
+    <id>.json     request info plus top functions by self and total samples
+
+With neither a token nor a sample rate configured no hooks are installed, so
+unprofiled traffic pays nothing.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+from collections import Counter
+
+
+PROFILE_TOKEN = os.environ.get("ADVOCA_PROFILE_TOKEN", "")
+SAMPLE_RATE = float(os.environ.get("ADVOCA_PROFILE_SAMPLE_RATE", 0))
+INTERVAL_MS = float(os.environ.get("ADVOCA_PROFILE_INTERVAL_MS", 2))
+PROFILE_DIR = os.environ.get("ADVOCA_PROFILE_DIR", "./profiles")
+KEEP = int(os.environ.get("ADVOCA_PROFILE_KEEP", 200))
+TOP_N = 30
+
+HEADER = "X-Advoca-Profile"
+
+
+def _frame_label(code):
+    # ';' separates frames in the folded format
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class StackSampler:
+    """Samples one thread's stack on an interval until stopped."""
+
+    def __init__(self, thread_id, interval_ms=INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = max(0.0005, interval_ms / 1000.0)
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._labels = {}
+        self.started = None
+        self.seconds = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.seconds = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        labels = self._labels
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+            self.samples += 1
+
+    # ---------------- OUTPUT ---------------- #
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, n=TOP_N):
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+        total = self.samples or 1
+        return [{
+            "function": label,
+            "total_samples": count,
+            "total_pct": round(100.0 * count / total, 2),
+            "self_samples": self_counts.get(label, 0),
+            "self_pct": round(100.0 * self_counts.get(label, 0) / total, 2),
+        } for label, count in total_counts.most_common(n)]
+
+
+# ---------------- STORAGE ---------------- #
+
+def _profile_path(profile_id, ext):
+    # ids are generated here; reject anything that could escape the directory
+    if not profile_id or os.path.basename(profile_id) != profile_id or profile_id.startswith("."):
+        raise ValueError("invalid profile id")
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{ext}")
+
+
+def save_profile(sampler, info):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{info.get('endpoint') or 'request'}-{uuid.uuid4().hex[:8]}"
+    summary = {
+        "id": profile_id,
+        **info,
+        "seconds": sampler.seconds,
+        "samples": sampler.samples,
+        "interval_ms": sampler.interval * 1000.0,
+        "top_functions": sampler.top_functions(),
+    }
+    with open(_profile_path(profile_id, "folded"), "w", encoding="utf-8") as f:
+        f.write(sampler.folded())
+    with open(_profile_path(profile_id, "json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    _prune()
+    return profile_id
+
+
+def _prune():
+    try:
+        names = sorted(n[:-5] for n in os.listdir(PROFILE_DIR) if n.endswith(".json"))
+    except OSError:
+        return
+    for profile_id in names[:max(0, len(names) - KEEP)]:
+        for ext in ("json", "folded"):
+            try:
+                os.remove(_profile_path(profile_id, ext))
+            except OSError:
+                pass
+
+
+def list_profiles():
+    """Newest first; summaries without the top-function table."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        summary.pop("top_functions", None)
+        profiles.append(summary)
+    return profiles
+
+
+def load_profile(profile_id, folded=False):
+    """Summary dict, or the folded stacks text; None if missing."""
+    path = _profile_path(profile_id, "folded" if folded else "json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read() if folded else json.load(f)
+
+
+def is_authorized(req):
+    """Profile token from the profile header or a bearer Authorization header."""
+    if not PROFILE_TOKEN:
+        return False
+    auth = req.headers.get("Authorization", "")
+    return req.headers.get(HEADER) == PROFILE_TOKEN or auth == f"Bearer {PROFILE_TOKEN}"
+
+
+# ---------------- FLASK ---------------- #
+
+def init_profiler(app):
+    """Profile selected requests; a no-op unless a token or sample rate is set."""
+    if not PROFILE_TOKEN and SAMPLE_RATE <= 0:
+        return app
+
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        requested = PROFILE_TOKEN and request.headers.get(HEADER) == PROFILE_TOKEN
+        if not requested and not (SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE):
+            return
+        g._profile = StackSampler(threading.get_ident()).start()
+        g._profile_trigger = "header" if requested else "sampled"
+
+    @app.after_request
+    def _finish_profile(response):
+        sampler = g.pop("_profile", None)
+        if sampler is None:
+            return response
+        sampler.stop()
+        try:
+            profile_id = save_profile(sampler, {
+                "endpoint": request.endpoint,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "trigger": g.pop("_profile_trigger", None),
+                "created_at": time.time(),
+            })
+            response.headers["X-Advoca-Profile-Id"] = profile_id
+        except OSError as e:
+            print(f"[PROFILE] Could not save profile: {e}")
+        return response
+
+    @app.teardown_request
+    def _stop_profile(exc):
+        # unhandled exception: after_request never ran, just stop sampling
+        sampler = g.pop("_profile", None)
+        if sampler is not None:
+            sampler.stop()
+
+    print(f"[PROFILE] Enabled (header token: {'yes' if PROFILE_TOKEN else 'no'}, sample rate: {SAMPLE_RATE})")
+    return app
@@ -0,0 +1,284 @@
+"""
+Shared retrieval runtime: FAISS index, embeddings, metadata, DI cases and the
+e5 encoder.
+
+SCR, PCR and LJP all read the same files. Each loader here runs once per
+process, so the modules share one copy instead of loading their own. The
+embedding matrix is opened with `mmap_mode='r'` and the index is memory-mapped
+where the installed FAISS supports it, so worker processes on the same node
+are backed by a single physical copy in the OS page cache.
+"""
+import os
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+import joblib
+import faiss
+
+import metrics
+
+# ---------------- CONFIG ---------------- #
+
+BASE_DIR = Path(__file__).resolve().parent
+# ADVOCA_DATA_DIR / ADVOCA_DI_PATH point the runtime at another corpus (e.g. bench/synth_corpus.py)
+EMB_DIR = Path(os.environ.get("ADVOCA_DATA_DIR", BASE_DIR / "di_prime_embeddings"))
+
+EMB_FILE = EMB_DIR / "embeddings.npy"
+FAISS_FILE = EMB_DIR / "faiss.index"
+META_FILE = EMB_DIR / "metadata.joblib"
+SNIPPET_DIR = EMB_DIR / "snippets"
+FILTER_DIR = EMB_DIR / "filters"
+LEXICAL_DIR = EMB_DIR / "lexical"
+CITATION_DIR = EMB_DIR / "citations"
+
+DI_PATH = os.environ.get("ADVOCA_DI_PATH", "/Users/srinandanasarmakesapragada/Documents/data_raw/di_dataset.jsonl")
+MODEL_NAME = os.environ.get("ADVOCA_ENCODER_MODEL", "intfloat/e5-base")
+
+# "e5" (SentenceTransformer MODEL_NAME) or "hash" (deterministic offline encoder)
+ENCODER = os.environ.get("ADVOCA_ENCODER", "e5")
+HASH_DIM = int(os.environ.get("ADVOCA_HASH_DIM", 768))
+
+# coalesce concurrent query encodes into batched forward passes
+BATCHING = os.environ.get("ADVOCA_BATCHING", "1") != "0"
+
+
+# ---------------- LOAD ONCE ---------------- #
+
+_cache = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _load_once(fn):
+    """Cache a zero-argument loader; concurrent callers wait for one load."""
+    name = fn.__name__
+
+    def wrapper():
+        if name in _cache:
+            return _cache[name]
+        with _locks_guard:
+            lock = _locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in _cache:
+                _cache[name] = fn()
+            return _cache[name]
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+
+def is_loaded(name):
+    return name in _cache
+
+
+# ---------------- INDEX + EMBEDDINGS ---------------- #
+
+def read_index(path):
+    """Read a FAISS index memory-mapped when the FAISS build allows it."""
+    path = str(path)
+    # IO_FLAG_MMAP_IFC maps flat code arrays (newer FAISS); IO_FLAG_MMAP covers
+    # on-disk inverted lists. Older builds ignore or reject the flags.
+    flags = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | getattr(faiss, "IO_FLAG_MMAP", 0)
+    flags |= getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+    if flags:
+        try:
+            return faiss.read_index(path, flags)
+        except RuntimeError as e:
+            print(f"[RUNTIME] mmap read not supported for {path} ({e}); loading into memory")
+    return faiss.read_index(path)
+
+
+@_load_once
+def load_index():
+    print("Loading FAISS index...")
+    return read_index(FAISS_FILE)
+
+
+@_load_once
+def load_embeddings():
+    """Read-only memory map of the embedding matrix (shared via page cache)."""
+    print("Loading embeddings...")
+    return np.load(EMB_FILE, mmap_mode="r")
+
+
+@_load_once
+def load_metadata():
+    print("Loading metadata...")
+    return joblib.load(META_FILE)
+
+
+# ---------------- DI CASES ---------------- #
+
+@_load_once
+def load_cases():
+    print("Loading DI...")
+    cases = []
+    with open(DI_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                cases.append(json.loads(line))
+            except:
+                pass
+    return cases
+
+
+def dataset_stamp():
+    """Identity of the DI dataset: its record count and file size.
+
+    Artifacts keyed by DI row (snippets, filters, lexical, citations) store the
+    stamp they were built from, and the loaders refuse an artifact whose stamp
+    differs. Added or removed records change the count; a replaced record
+    almost always changes the size.
+    """
+    size = os.path.getsize(DI_PATH) if os.path.exists(DI_PATH) else None
+    return {"records": len(load_cases()), "bytes": size}
+
+
+def _matches_dataset(name, stamp, builder):
+    current = dataset_stamp()
+    if stamp == current:
+        return True
+    print(f"[RUNTIME] {name} was built from another DI dataset ({stamp} vs {current}); rerun {builder}")
+    return False
+
+
+@_load_once
+def load_snippets():
+    """Precomputed sentence offsets/tokens (build_snippets.py), or None if not built.
+
+    Also None when the index was built from another DI dataset.
+    """
+    from snippets import SnippetIndex
+
+    if not SnippetIndex.exists(SNIPPET_DIR):
+        print("[RUNTIME] snippet index not built; snippets are computed on the fly")
+        return None
+    print("Loading snippet index...")
+    index = SnippetIndex.load(SNIPPET_DIR)
+    if not _matches_dataset("snippet index", index.meta.get("dataset"), "build_snippets.py"):
+        return None
+    return index
+
+
+@_load_once
+def load_case_attributes():
+    """Court/jurisdiction/date columns for filtered search (build_case_filters.py).
+
+    Derived from the DI cases when the arrays have not been built, or were
+    built from another DI dataset.
+    """
+    from case_filters import CaseAttributes
+
+    if CaseAttributes.exists(FILTER_DIR):
+        print("Loading case filter attributes...")
+        attrs = CaseAttributes.load(FILTER_DIR)
+        if _matches_dataset("case filter attributes", attrs.dataset, "build_case_filters.py"):
+            return attrs
+    print("[RUNTIME] case filter attributes not built or out of date; deriving them from the DI cases")
+    return CaseAttributes.from_cases(load_cases())
+
+
+@_load_once
+def load_lexical():
+    """BM25 inverted index for hybrid retrieval (build_lexical.py), or None if not built.
+
+    Also None when the index was built from another DI dataset.
+    """
+    from lexical import BM25Index
+
+    if not BM25Index.exists(LEXICAL_DIR):
+        print("[RUNTIME] lexical index not built; hybrid retrieval is unavailable")
+        return None
+    print("Loading lexical index...")
+    index = BM25Index.load(LEXICAL_DIR)
+    if not _matches_dataset("lexical index", index.dataset, "build_lexical.py"):
+        return None
+    return index
+
+
+@_load_once
+def load_citations():
+    """Citation graph and authority scores for PCR (build_citations.py), or None if not built.
+
+    Also None when the graph was built from another DI dataset.
+    """
+    from citations import CitationGraph
+
+    if not CitationGraph.exists(CITATION_DIR):
+        print("[RUNTIME] citation graph not built; PCR scores court prestige from the text")
+        return None
+    print("Loading citation graph...")
+    graph = CitationGraph.load(CITATION_DIR)
+    if not _matches_dataset("citation graph", graph.meta.get("dataset"), "build_citations.py"):
+        return None
+    return graph
+
+
+@_load_once
+def load_case_rows():
+    """case_id -> DI row, for looking cases up by id."""
+    return {str(case.get("case_id")): i for i, case in enumerate(load_cases()) if case.get("case_id") is not None}
+
+
+# ---------------- ENCODER ---------------- #
+
+@_load_once
+def load_encoder():
+    if ENCODER == "hash":
+        from hash_encoder import HashEncoder
+
+        print(f"Using hash encoder (dim={HASH_DIM})")
+        return HashEncoder(HASH_DIM)
+
+    from sentence_transformers import SentenceTransformer
+
+    print(f"Loading embedding model ({MODEL_NAME})...")
+    return SentenceTransformer(MODEL_NAME)
+
+
+@_load_once
+def load_searcher():
+    from encoder_service import BatchingSearcher
+
+    return BatchingSearcher(load_encoder(), load_index())
+
+
+def encode_and_search(text, limit, normalize=True, return_embedding=False, subset=None):
+    """Encode one query and search the index; returns (1, limit) arrays.
+
+    With return_embedding, also returns the raw (unnormalised) query embedding.
+    `subset` (see filtered_subset) restricts the search to matching cases.
+    Goes through the micro-batching searcher unless ADVOCA_BATCHING=0.
+    """
+    if BATCHING:
+        return load_searcher().search(text, limit, normalize=normalize, return_embedding=return_embedding,
+                                      subset=subset)
+
+    with metrics.stage("encode"):
+        emb = load_encoder().encode(text, convert_to_numpy=True).astype("float32").reshape(1, -1)
+        raw = emb[0].copy()
+        if normalize:
+            faiss.normalize_L2(emb)
+    with metrics.stage("search"):
+        if subset is not None:
+            distances, indices = subset.search(load_index(), emb, limit)
+        else:
+            distances, indices = load_index().search(emb, limit)
+    return (distances, indices, raw) if return_embedding else (distances, indices)
+
+
+def filtered_subset(filters):
+    """CaseSubset for a filter spec (case_filters.py), or None when nothing is filtered.
+
+    Raises case_filters.FilterError for a malformed spec.
+    """
+    from case_filters import normalize_filters
+
+    spec = normalize_filters(filters)
+    if spec is None:
+        return None
+    with metrics.stage("filter"):
+        return load_case_attributes().subset(spec)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Production entry point for the AdvocaDabra API.
+
+Runs backend_server.app under Gunicorn with several worker processes, each
+with a thread pool. The retrieval runtime (FAISS index, e5 encoder, DI cases,
+LJP model) is loaded once in the master before forking, so workers share
+those pages copy-on-write. No inference runs in the master: each worker runs
+the warm-up queries after the fork and reports ready on /api/health/ready
+once they finish. SIGTERM/SIGINT trigger Gunicorn's graceful shutdown:
+workers finish in-flight requests within --graceful-timeout.
+
+    python serve.py --workers 4 --threads 8 --bind 0.0.0.0:8000
+"""
+import os
+import argparse
+import multiprocessing
+
+from gunicorn.app.base import BaseApplication
+
+
+DEFAULT_BIND = os.environ.get("ADVOCA_BIND", "0.0.0.0:8000")
+DEFAULT_WORKERS = int(os.environ.get("ADVOCA_WORKERS", min(4, multiprocessing.cpu_count())))
+DEFAULT_THREADS = int(os.environ.get("ADVOCA_THREADS", 4))
+DEFAULT_TIMEOUT = int(os.environ.get("ADVOCA_TIMEOUT", 120))
+DEFAULT_GRACEFUL_TIMEOUT = int(os.environ.get("ADVOCA_GRACEFUL_TIMEOUT", 30))
+
+
+def post_fork(server, worker):
+    # Keep torch from oversubscribing cores: each worker already runs
+    # `threads` requests concurrently.
+    try:
+        import torch
+        torch.set_num_threads(max(1, multiprocessing.cpu_count() // server.cfg.workers))
+    except Exception:
+        pass
+
+
+def post_worker_init(worker):
+    # warm up in the worker (torch/OpenMP thread pools are not fork-safe);
+    # without preload the worker also loads its own runtime first
+    import backend_server
+    backend_server.start_runtime()
+
+
+def worker_exit(server, worker):
+    server.log.info("Worker %s exiting", worker.pid)
+
+
+class AdvocaServer(BaseApplication):
+    def __init__(self, options, preload=True):
+        self.options = options
+        self.preload = preload
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        import backend_server
+
+        if self.preload:
+            print("[SERVE] Preloading retrieval runtime in master...")
+            backend_server.preload_runtime(warm=False)
+        return backend_server.app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AdvocaDabra production server")
+    parser.add_argument("--bind", default=DEFAULT_BIND, help="host:port to listen on")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Number of worker processes")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS, help="Threads per worker")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="Worker timeout in seconds")
+    parser.add_argument("--graceful-timeout", type=int, default=DEFAULT_GRACEFUL_TIMEOUT,
+                        help="Seconds to finish in-flight requests on shutdown")
+    parser.add_argument("--no-preload", action="store_true",
+                        help="Load the runtime lazily in each worker instead of in the master")
+    args = parser.parse_args()
+
+    # admission control sizes its process-wide cap from the thread count
+    os.environ["ADVOCA_THREADS"] = str(args.threads)
+
+    options = {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        # import the app (and the runtime) in the master, then fork
+        "preload_app": not args.no_preload,
+        "post_fork": post_fork,
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit,
+        "accesslog": "-",
+    }
+
+    print(f"Starting AdvocaDabra on http://{args.bind} "
+          f"({args.workers} workers x {args.threads} threads)")
+    AdvocaServer(options, preload=not args.no_preload).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Query-aware snippet generation for SCR/PCR results.
+
+Instead of returning the whole summary or a raw prefix (usually caption
+boilerplate), pick the sentences of a case that share the most terms with
+the query and join them, in document order, within a byte budget.
+
+Sentence offsets and per-sentence token ids are precomputed by
+build_snippets.py and stored as flat arrays (CSR layout):
+
+    sent_ptr[i]:sent_ptr[i+1]   sentence rows of case i
+    sent_bounds[s]              (start, end) character offsets of sentence s
+    tok_ptr[s]:tok_ptr[s+1]     slice of tok_ids holding sentence s's tokens
+    meta.json                   cases, sentences, DI dataset stamp
+
+Token ids are CRC32 hashes of normalised words, so no vocabulary is needed.
+Cases without precomputed offsets are split on the fly.
+"""
+import re
+import json
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+
+DEFAULT_SNIPPET_BYTES = 1000
+SEPARATOR = " … "
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+SENT_RE = re.compile(r"[^.!?]+(?:[.!?]+|$)")
+STOPWORDS = frozenset("""
+    a an and are as at be been but by for from had has have he her his in into is it its
+    of on or that the their there these they this to was were which who will with query
+""".split())
+
+
+# ---------------- TOKENS + SENTENCES ---------------- #
+
+def tokenize(text):
+    """Hashed, de-duplicated content tokens of `text` (uint32)."""
+    words = {w for w in WORD_RE.findall(text.lower()) if len(w) > 2 and w not in STOPWORDS}
+    return np.fromiter((zlib.crc32(w.encode("utf-8")) for w in words), dtype=np.uint32, count=len(words))
+
+
+def split_sentences(text, min_chars=20):
+    """(start, end) offsets of sentences; very short fragments merge forward."""
+    bounds = []
+    start = None
+    for m in SENT_RE.finditer(text):
+        s, e = m.span()
+        if start is None:
+            # skip leading whitespace
+            while s < e and text[s].isspace():
+                s += 1
+            if s == e:
+                continue
+            start = s
+        if e - start >= min_chars:
+            bounds.append((start, e))
+            start = None
+    if start is not None:
+        bounds.append((start, len(text)))
+    return bounds
+
+
+# ---------------- ENGINE ---------------- #
+
+class SnippetIndex:
+    def __init__(self, sent_ptr, sent_bounds, tok_ptr, tok_ids, meta=None):
+        self.sent_ptr = sent_ptr
+        self.sent_bounds = sent_bounds
+        self.tok_ptr = tok_ptr
+        self.tok_ids = tok_ids
+        self.meta = meta or {}
+
+    @classmethod
+    def load(cls, snippet_dir, mmap=True):
+        d = Path(snippet_dir)
+        mode = "r" if mmap else None
+        meta = {}
+        if (d / "meta.json").exists():
+            with open(d / "meta.json", encoding="utf-8") as f:
+                meta = json.load(f)
+        return cls(*(np.load(d / f"{name}.npy", mmap_mode=mode)
+                     for name in ("sent_ptr", "sent_bounds", "tok_ptr", "tok_ids")), meta=meta)
+
+    @staticmethod
+    def exists(snippet_dir):
+        return (Path(snippet_dir) / "sent_ptr.npy").exists()
+
+    def case_sentences(self, case_idx):
+        """(sentence bounds, token ids, per-sentence token offsets) for one case, or None."""
+        if case_idx + 1 >= len(self.sent_ptr):
+            return None
+        s0, s1 = int(self.sent_ptr[case_idx]), int(self.sent_ptr[case_idx + 1])
+        if s0 == s1:
+            return None
+        bounds = np.asarray(self.sent_bounds[s0:s1])
+        t0, t1 = int(self.tok_ptr[s0]), int(self.tok_ptr[s1])
+        tokens = np.asarray(self.tok_ids[t0:t1])
+        offsets = np.asarray(self.tok_ptr[s0:s1]) - t0
+        return bounds, tokens, offsets
+
+
+def _overlap_scores(tokens, offsets, n_sent, query_tokens):
+    """Number of distinct query tokens in each sentence."""
+    if len(tokens) == 0 or len(query_tokens) == 0:
+        return np.zeros(n_sent, dtype=np.int64)
+    hits = np.isin(tokens, query_tokens).astype(np.int64)
+    scores = np.zeros(n_sent, dtype=np.int64)
+    # reduceat misbehaves on empty segments; sentences without tokens keep 0
+    lengths = np.diff(np.append(offsets, len(tokens)))
+    valid = lengths > 0
+    if valid.any():
+        scores[valid] = np.add.reduceat(hits, offsets[valid])
+    return scores
+
+
+def _pick(text, bounds, scores, budget):
+    """Best-scoring sentences that fit the budget, returned in document order."""
+    if scores.max(initial=0) <= 0:
+        # nothing matches the query: fall back to the leading text
+        return _truncate(text, budget)
+
+    sep = len(SEPARATOR.encode("utf-8"))
+    chosen = []
+    used = 0
+    for s in np.argsort(-scores, kind="stable"):
+        if scores[s] <= 0:
+            break
+        start, end = int(bounds[s][0]), int(bounds[s][1])
+        size = len(text[start:end].encode("utf-8")) + (sep if chosen else 0)
+        if used + size > budget:
+            if not chosen:
+                # best sentence alone is over budget: trim it
+                return _truncate(text[start:end].strip(), budget)
+            continue
+        chosen.append(s)
+        used += size
+    chosen.sort()
+    return SEPARATOR.join(text[int(bounds[s][0]):int(bounds[s][1])].strip() for s in chosen)
+
+
+def _truncate(text, budget):
+    data = text.encode("utf-8")
+    if len(data) <= budget:
+        return text
+    cut = data[:budget].decode("utf-8", errors="ignore")
+    # end on a word boundary when there is one
+    head = cut.rsplit(None, 1)[0] if " " in cut else cut
+    return head.rstrip()
+
+
+def make_snippet(text, query_tokens, budget=DEFAULT_SNIPPET_BYTES, case_idx=None, index=None):
+    """Query-relevant passages of `text` within `budget` bytes.
+
+    Uses precomputed sentence offsets/tokens for `case_idx` when `index` is
+    given, otherwise splits and tokenizes the text on the fly.
+    """
+    if not text:
+        return ""
+    if len(text.encode("utf-8")) <= budget:
+        return text
+
+    pre = index.case_sentences(case_idx) if index is not None and case_idx is not None else None
+    if pre is not None and int(pre[0][-1][1]) <= len(text):
+        bounds, tokens, offsets = pre
+    else:
+        bounds = split_sentences(text)
+        if not bounds:
+            return _truncate(text, budget)
+        sent_tokens = [tokenize(text[s:e]) for s, e in bounds]
+        lengths = np.fromiter((len(t) for t in sent_tokens), dtype=np.int64, count=len(sent_tokens))
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        tokens = np.concatenate(sent_tokens) if len(sent_tokens) else np.zeros(0, dtype=np.uint32)
+        bounds = np.asarray(bounds)
+
+    scores = _overlap_scores(tokens, offsets, len(bounds), query_tokens)
+    return _pick(text, bounds, scores, budget)
@@ -0,0 +1,172 @@
+"""
+Startup phase: load the serving assets concurrently, then warm up.
+
+The FAISS index, metadata, DI cases, snippet index, filter columns, lexical
+index, citation graph, encoder and the LJP model are independent, so they load on parallel
+threads (most of that time is file IO, JSON parsing and torch setup). A few
+warm-up queries then go through the full analysis path, so caches fill and
+PyTorch picks its kernels before the first real request arrives.
+
+`/api/health/live` answers as soon as the process serves HTTP.
+`/api/health/ready` returns 503 until the required assets are loaded and the
+warm-up has finished. It reports per-asset load times either way. Optional
+assets (snippets, filter columns, lexical index, citations, LJP) may fail without
+blocking readiness; their endpoints report the error themselves.
+
+Under serve.py the assets load once in the Gunicorn master; the warm-up
+queries run in each worker after the fork, since torch/FAISS thread pools
+must not be used before forking and each worker needs its own warm caches.
+
+ADVOCA_WARMUP_QUERIES sets the number of warm-up queries (default 3, 0 skips).
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import runtime
+
+
+WARMUP_QUERIES = int(os.environ.get("ADVOCA_WARMUP_QUERIES", 3))
+
+RUNTIME_ASSETS = {
+    "index": runtime.load_index,
+    "metadata": runtime.load_metadata,
+    "cases": runtime.load_cases,
+    "encoder": runtime.load_encoder,
+    "embeddings": runtime.load_embeddings,
+    "snippets": runtime.load_snippets,
+    "case_filters": runtime.load_case_attributes,
+    "lexical": runtime.load_lexical,
+    "citations": runtime.load_citations,
+}
+REQUIRED = ("index", "metadata", "cases", "encoder")
+
+# long enough for LJP's 50-character minimum
+WARMUP_TEXTS = [
+    "The plaintiff alleges breach of a written contract for the sale of goods and seeks damages for late delivery.",
+    "The tenant appeals a judgment of eviction, arguing the landlord failed to give proper notice under the lease.",
+    "The defendant moves to suppress evidence obtained in a warrantless search of his vehicle after a traffic stop.",
+]
+
+_lock = threading.Lock()
+_assets = {}
+_warmup = {"state": "pending", "queries": 0, "seconds": None, "last_ms": None, "error": None}
+_started_at = None
+_ready_after = None
+_thread = None
+
+
+def _load(name, loader):
+    record = _assets[name]
+    record["state"] = "loading"
+    t0 = time.perf_counter()
+    try:
+        loader()
+        record["state"] = "ready"
+    except Exception as e:
+        record["state"] = "failed"
+        record["error"] = str(e)
+        print(f"[STARTUP] Failed to load {name}: {e}")
+    finally:
+        record["load_seconds"] = round(time.perf_counter() - t0, 3)
+
+
+def load_assets(extra=None):
+    """Run every asset loader on its own thread and wait for all of them.
+
+    `extra` maps further (optional) asset names to zero-argument loaders.
+    """
+    loaders = dict(RUNTIME_ASSETS, **(extra or {}))
+    with _lock:
+        for name in loaders:
+            _assets[name] = {"state": "pending", "required": name in REQUIRED,
+                             "load_seconds": None, "error": None}
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(loaders), thread_name_prefix="startup") as pool:
+        for name, loader in loaders.items():
+            pool.submit(_load, name, loader)
+    print(f"[STARTUP] Assets loaded in {time.perf_counter() - t0:.2f}s")
+
+
+def warm_up(query_fn, n=WARMUP_QUERIES):
+    """Send `n` canned queries through `query_fn(text)`."""
+    if n <= 0:
+        _warmup["state"] = "skipped"
+        return
+    _warmup["state"] = "running"
+    t0 = time.perf_counter()
+    try:
+        for i in range(n):
+            q0 = time.perf_counter()
+            query_fn(WARMUP_TEXTS[i % len(WARMUP_TEXTS)])
+            _warmup["last_ms"] = round((time.perf_counter() - q0) * 1000, 1)
+            _warmup["queries"] = i + 1
+        _warmup["state"] = "done"
+    except Exception as e:
+        _warmup["state"] = "failed"
+        _warmup["error"] = str(e)
+        print(f"[STARTUP] Warm-up query failed: {e}")
+    finally:
+        _warmup["seconds"] = round(time.perf_counter() - t0, 3)
+    print(f"[STARTUP] Warm-up: {_warmup['queries']} queries in {_warmup['seconds']}s "
+          f"(last {_warmup['last_ms']} ms)")
+
+
+def run(extra_assets=None, query_fn=None, warm=True):
+    """Load assets concurrently, warm up, and mark the process ready.
+
+    warm=False only loads: a preforking server loads in the master and each
+    worker warms up after the fork (see `start`).
+    """
+    global _started_at
+    _started_at = time.time()
+    load_assets(extra_assets)
+    if warm:
+        _finish(query_fn)
+
+
+def _finish(query_fn):
+    global _ready_after
+    if all(_assets[name]["state"] == "ready" for name in REQUIRED) and query_fn is not None:
+        warm_up(query_fn)
+    elif query_fn is None:
+        _warmup["state"] = "skipped"
+    if is_ready():
+        _ready_after = round(time.time() - _started_at, 3)
+        print(f"[STARTUP] Ready after {_ready_after}s")
+
+
+def start(extra_assets=None, query_fn=None):
+    """`run` on a daemon thread unless startup already ran; returns the thread or None.
+
+    When the assets were loaded before a fork (run(warm=False)), only the
+    warm-up runs, in this process.
+    """
+    global _thread
+    with _lock:
+        if _thread is None and _started_at is None:
+            target, args = run, (extra_assets, query_fn)
+        elif _thread is None and _warmup["state"] == "pending":
+            target, args = _finish, (query_fn,)
+        else:
+            return _thread
+        _thread = threading.Thread(target=target, args=args, name="startup", daemon=True)
+        _thread.start()
+    return _thread
+
+
+def is_ready():
+    return (bool(_assets)
+            and all(_assets.get(name, {}).get("state") == "ready" for name in REQUIRED)
+            and _warmup["state"] in ("done", "skipped"))
+
+
+def status():
+    return {
+        "ready": is_ready(),
+        "started_at": _started_at,
+        "ready_after_seconds": _ready_after,
+        "assets": {name: dict(record) for name, record in _assets.items()},
+        "warmup": dict(_warmup),
+    }
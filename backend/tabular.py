@@ -0,0 +1,173 @@
+"""
+Streaming ingestion for CSV / Excel uploads.
+
+Instead of materialising the whole sheet, `summarize_table` reads it in
+chunks, keeps only a bounded preview and computes per-column statistics in a
+single streaming pass. `read_rows` serves further rows one page at a time.
+"""
+import os
+import math
+from itertools import islice
+
+import pandas as pd
+
+
+PREVIEW_ROWS = int(os.environ.get("ADVOCA_TABLE_PREVIEW_ROWS", 50))
+CHUNK_ROWS = int(os.environ.get("ADVOCA_TABLE_CHUNK_ROWS", 20000))
+MAX_PAGE_ROWS = 1000
+
+
+# ---------------- CHUNK READERS ---------------- #
+
+def _iter_xlsx_chunks(file_path, chunk_rows):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+        while True:
+            block = list(islice(rows, chunk_rows))
+            if not block:
+                break
+            yield pd.DataFrame(block, columns=columns)
+    finally:
+        wb.close()
+
+
+def iter_chunks(file_path, file_type, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrame chunks of at most `chunk_rows` rows."""
+    if file_type == "csv":
+        yield from pd.read_csv(file_path, chunksize=chunk_rows)
+    elif file_type == "xlsx":
+        yield from _iter_xlsx_chunks(file_path, chunk_rows)
+    else:
+        # legacy .xls has no streaming reader; read it once
+        yield pd.read_excel(file_path)
+
+
+# ---------------- STATS ---------------- #
+
+class _ColumnStats:
+    __slots__ = ("numeric", "count", "nulls", "min", "max", "sum")
+
+    def __init__(self):
+        self.numeric = True
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.sum = 0.0
+
+    def update(self, series):
+        non_null = series.dropna()
+        self.nulls += len(series) - len(non_null)
+        self.count += len(non_null)
+        if not self.numeric or non_null.empty:
+            return
+        if not pd.api.types.is_numeric_dtype(non_null) or pd.api.types.is_bool_dtype(non_null):
+            self.numeric = False
+            return
+        lo, hi = float(non_null.min()), float(non_null.max())
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+        self.sum += float(non_null.sum())
+
+    def to_dict(self):
+        out = {"count": self.count, "nulls": self.nulls,
+               "dtype": "numeric" if self.numeric and self.count else "text"}
+        if self.numeric and self.count:
+            out.update({"min": self.min, "max": self.max, "mean": self.sum / self.count})
+        return out
+
+
+def _records(df):
+    """JSON-safe records (NaN/NaT -> None)."""
+    records = df.astype(object).where(pd.notnull(df), None).to_dict("records")
+    for row in records:
+        for key, value in row.items():
+            if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+                row[key] = None
+            elif hasattr(value, "isoformat"):
+                row[key] = value.isoformat()
+    return records
+
+
+# ---------------- PUBLIC ---------------- #
+
+def summarize_table(file_path, file_type, preview_rows=PREVIEW_ROWS):
+    """One streaming pass: bounded preview, row count and column statistics."""
+    columns = None
+    stats = {}
+    preview = []
+    row_count = 0
+
+    for chunk in iter_chunks(file_path, file_type):
+        if columns is None:
+            columns = [str(c) for c in chunk.columns]
+            stats = {c: _ColumnStats() for c in columns}
+        if len(preview) < preview_rows:
+            preview.extend(_records(chunk.head(preview_rows - len(preview))))
+        for raw, name in zip(chunk.columns, columns):
+            stats[name].update(chunk[raw])
+        row_count += len(chunk)
+
+    return {
+        "data": preview,
+        "columns": columns or [],
+        "row_count": row_count,
+        "preview_rows": len(preview),
+        "truncated": row_count > len(preview),
+        "column_stats": {c: s.to_dict() for c, s in stats.items()},
+    }
+
+
+def read_rows(file_path, file_type, offset=0, limit=100):
+    """Return one page of rows as JSON-safe records."""
+    offset = max(0, int(offset))
+    limit = max(1, min(int(limit), MAX_PAGE_ROWS))
+
+    if file_type == "csv":
+        return _read_csv_page(file_path, offset, limit)
+
+    if file_type == "xlsx":
+        from openpyxl import load_workbook
+
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            ws = wb.worksheets[0]
+            header = next(ws.iter_rows(max_row=1, values_only=True), ())
+            columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+            rows = list(ws.iter_rows(min_row=offset + 2, max_row=offset + 1 + limit, values_only=True))
+        finally:
+            wb.close()
+        return _records(pd.DataFrame(rows, columns=columns)), columns
+
+    # a callable skips rows without materialising the set of skipped row numbers
+    df = pd.read_excel(file_path, skiprows=lambda i: 0 < i <= offset, nrows=limit)
+    return _records(df), [str(c) for c in df.columns]
+
+
+def _read_csv_page(file_path, offset, limit):
+    """Rows [offset, offset + limit) of a CSV, read chunk by chunk.
+
+    Chunks before the page are parsed and dropped whole, so memory stays at
+    one chunk however deep the page is.
+    """
+    records, columns = [], None
+    seen = 0
+    for chunk in pd.read_csv(file_path, chunksize=CHUNK_ROWS):
+        if columns is None:
+            columns = [str(c) for c in chunk.columns]
+        if seen + len(chunk) > offset:
+            records.extend(_records(chunk.iloc[max(0, offset - seen):offset + limit - seen]))
+        seen += len(chunk)
+        if seen >= offset + limit:
+            break
+    if columns is None:
+        # header only: read_csv yields no chunks
+        columns = [str(c) for c in pd.read_csv(file_path, nrows=0).columns]
+    return records, columns
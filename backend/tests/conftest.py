@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# backend modules import each other as top-level modules (`import runtime`)
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR / "utils"))
+
+# db.DB_PATH is read at import: keep the test session off the real users.db
+os.environ.setdefault("ADVOCA_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="advoca-test-"), "test.db"))
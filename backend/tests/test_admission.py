@@ -0,0 +1,166 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("flask")
+from flask import Flask, request
+
+import admission
+from admission import Rejected, TokenBuckets, WeightedLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+# ---------------- LIMITER ---------------- #
+
+def test_limiter_admits_up_to_capacity_then_rejects_full_queue():
+    limiter = WeightedLimiter("t", capacity=2, max_queue=0, timeout=0.05)
+    assert limiter.acquire(1.5) == 1.5
+    assert limiter.acquire(0.5) == 0.5
+
+    with pytest.raises(Rejected) as e:
+        limiter.acquire(0.1)
+    assert (e.value.status, e.value.reason) == (503, "rejected_queue_full")
+    assert e.value.retry_after >= 1
+
+
+def test_limiter_wait_times_out():
+    limiter = WeightedLimiter("t", capacity=1, max_queue=1, timeout=0.05)
+    limiter.acquire(1)
+    started = time.monotonic()
+    with pytest.raises(Rejected) as e:
+        limiter.acquire(1)
+    assert e.value.reason == "rejected_timeout"
+    assert time.monotonic() - started >= 0.05
+    assert limiter.snapshot()["queued"] == 0
+
+
+def test_oversized_request_is_clamped_and_runs_alone():
+    limiter = WeightedLimiter("t", capacity=2, max_queue=1, timeout=0.05)
+    assert limiter.acquire(10) == 2
+    with pytest.raises(Rejected):
+        limiter.acquire(0.1)
+    limiter.release(2, 0.1)
+    assert limiter.snapshot()["in_use"] == 0
+
+
+def test_waiters_are_admitted_in_fifo_order():
+    limiter = WeightedLimiter("t", capacity=2, max_queue=4, timeout=5)
+    limiter.acquire(2)
+    order = []
+
+    def wait(name, cost):
+        order.append((name, limiter.acquire(cost)))
+
+    big = threading.Thread(target=wait, args=("big", 2))
+    big.start()
+    while limiter.snapshot()["queued"] < 1:
+        time.sleep(0.001)
+    small = threading.Thread(target=wait, args=("small", 0.5))
+    small.start()
+    while limiter.snapshot()["queued"] < 2:
+        time.sleep(0.001)
+
+    # the small request would fit once 0.5 is free, but must not overtake the head
+    limiter.release(2, 0.1)
+    big.join(1)
+    assert order == [("big", 2)]
+    limiter.release(2, 0.1)
+    small.join(1)
+    assert order == [("big", 2), ("small", 0.5)]
+
+
+# ---------------- TOKEN BUCKETS ---------------- #
+
+def test_token_bucket_burst_refill_and_wait(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    buckets = TokenBuckets(rate=2, burst=4)
+
+    assert buckets.consume("u", 3) == 0
+    assert buckets.consume("u", 3) == pytest.approx(1.0)   # 1 token left, 2 missing at 2/s
+    assert buckets.consume("other", 4) == 0                 # keys are independent
+
+    clock.now += 1.0
+    assert buckets.consume("u", 3) == 0
+    clock.now += 100
+    assert buckets.consume("u", 4) == 0                     # refill is capped at the burst
+    assert buckets.consume("u", 0.5) == pytest.approx(0.25)
+
+
+def test_token_bucket_cost_is_capped_at_burst_and_rate_zero_disables(monkeypatch):
+    monkeypatch.setattr(admission.time, "monotonic", FakeClock())
+    assert TokenBuckets(rate=1, burst=2).consume("u", 50) == 0
+    assert TokenBuckets(rate=0, burst=0).consume("u", 50) == 0
+
+
+def test_token_bucket_drops_full_buckets_past_max_keys(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    buckets = TokenBuckets(rate=1, burst=10, max_keys=3)
+    for key in range(3):
+        buckets.consume(key, 1)
+    clock.now += 60  # all three are full again
+    buckets.consume("busy", 5)
+    assert set(buckets._buckets) == {"busy"}
+
+
+# ---------------- FLASK ---------------- #
+
+@pytest.fixture
+def client(monkeypatch):
+    limiter = WeightedLimiter("scr", capacity=1, max_queue=0, timeout=0.05)
+    monkeypatch.setitem(admission._limiters, "scr", limiter)
+    monkeypatch.setattr(admission, "_buckets", TokenBuckets(rate=1, burst=2))
+    monkeypatch.setattr(admission, "_held", admission._HeldSlots(0))
+
+    app = Flask(__name__)
+
+    @app.route("/scr", methods=["POST"])
+    @admission.admit("scr", lambda req: req.get_json()["cost"])
+    def scr():
+        return {"ok": True}
+
+    @app.before_request
+    def auth():
+        request.user = {"user_id": 1}
+
+    return app.test_client(), limiter
+
+
+def test_admit_returns_429_with_retry_after_over_quota(client):
+    http, _ = client
+    assert http.post("/scr", json={"cost": 1.5}).status_code == 200
+    resp = http.post("/scr", json={"cost": 1.5})
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert resp.get_json()["retry_after"] == int(resp.headers["Retry-After"])
+
+
+def test_admit_returns_503_when_capacity_is_held_and_releases_after(client):
+    http, limiter = client
+    limiter.acquire(1)
+    resp = http.post("/scr", json={"cost": 0.5})
+    assert resp.status_code == 503
+    assert "Retry-After" in resp.headers
+    assert admission._held.held == 0
+
+    limiter.release(1, 0.1)
+    assert http.post("/scr", json={"cost": 0.5}).status_code == 200
+    assert limiter.snapshot()["in_use"] == 0
+
+
+# ---------------- COSTS ---------------- #
+
+def test_pcr_cost_prices_absent_and_null_sample_size_differently():
+    backend_server = pytest.importorskip("backend_server")
+    default = backend_server.pcr_cost({})
+    assert default == backend_server.pcr_cost({"sample_size": backend_server.DEFAULT_SAMPLE_BYTES})
+    assert backend_server.pcr_cost({"sample_size": None}) > backend_server.pcr_cost({"sample_size": 3000}) > default
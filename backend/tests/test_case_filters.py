@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+import case_filters
+from case_filters import CaseAttributes, FilterError, date_key, normalize_filters
+
+
+COURTS = ["Supreme Court of New York", "Appellate Division", "Court of Appeals", "Family Court", ""]
+JURISDICTIONS = ["New York", "Massachusetts", "Ohio", ""]
+DIM = 16
+
+
+def _cases(n, seed=0):
+    rng = np.random.default_rng(seed)
+    cases = []
+    for _ in range(n):
+        year, month, day = rng.integers(1900, 2020), rng.integers(1, 13), rng.integers(1, 29)
+        date = rng.choice([f"{year}-{month:02d}-{day:02d}", f"{year}", ""], p=[0.8, 0.15, 0.05])
+        cases.append({"court": rng.choice(COURTS), "jurisdiction": rng.choice(JURISDICTIONS), "date": date})
+    return cases
+
+
+def _matches(case, spec):
+    """Brute-force reference for CaseAttributes.mask."""
+    if "court" in spec and not any(t in case["court"].lower() for t in spec["court"]):
+        return False
+    if "jurisdiction" in spec and case["jurisdiction"].lower() not in spec["jurisdiction"]:
+        return False
+    date = date_key(case["date"]) or 0
+    if "date_from" in spec and date < spec["date_from"]:
+        return False
+    if "date_to" in spec and not 0 < date <= spec["date_to"]:
+        return False
+    return True
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    cases = _cases(4000)
+    vectors = np.random.default_rng(1).normal(size=(len(cases), DIM)).astype("float32")
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexFlatIP(DIM)
+    index.add(vectors)
+    return cases, index, CaseAttributes.from_cases(cases)
+
+
+SPECS = [
+    {"court": "appe"},
+    {"jurisdiction": "new york"},
+    {"court": ["supreme", "family"], "jurisdiction": ["Ohio", "Massachusetts"]},
+    {"date_from": "1950", "date_to": "1999-12-31"},
+    {"jurisdiction": "Ohio", "date_from": "2010-06"},
+    {"court": "family", "jurisdiction": "ohio", "date_to": "1905"},
+]
+
+
+@pytest.mark.parametrize("filters", SPECS)
+def test_mask_matches_brute_force(corpus, filters):
+    cases, _, attrs = corpus
+    spec = normalize_filters(filters)
+    expected = [i for i, case in enumerate(cases) if _matches(case, spec)]
+    np.testing.assert_array_equal(np.flatnonzero(attrs.mask(spec)), expected)
+
+
+def _filtered_full_search(index, queries, mask, limit):
+    distances, indices = index.search(queries, index.ntotal)
+    out_d = np.full((len(queries), limit), case_filters.PAD_DISTANCE, dtype=np.float32)
+    out_i = np.full((len(queries), limit), -1, dtype=np.int64)
+    for row in range(len(queries)):
+        keep = mask[indices[row]]
+        top = indices[row][keep][:limit]
+        out_i[row, :len(top)] = top
+        out_d[row, :len(top)] = distances[row][keep][:limit]
+    return out_d, out_i
+
+
+@pytest.mark.parametrize("path", ["scan", "selector"])
+@pytest.mark.parametrize("filters", SPECS)
+def test_subset_search_equals_filtered_full_search(corpus, monkeypatch, filters, path):
+    _, index, attrs = corpus
+    if path == "selector":
+        monkeypatch.setattr(case_filters, "BRUTE_FORCE_MAX_ROWS", 0)
+        monkeypatch.setattr(case_filters, "BRUTE_FORCE_FRACTION", 0.0)
+    spec = normalize_filters(filters)
+    subset = case_filters.CaseSubset(attrs.mask(spec))
+    queries = np.random.default_rng(2).normal(size=(3, DIM)).astype("float32")
+
+    distances, indices = subset.search(index, queries, 10)
+    ref_d, ref_i = _filtered_full_search(index, queries, attrs.mask(spec), 10)
+
+    np.testing.assert_array_equal(indices, ref_i)
+    np.testing.assert_allclose(distances, ref_d, rtol=1e-5)
+
+
+def test_sparse_and_dense_selectors(corpus, monkeypatch):
+    _, index, _ = corpus
+    monkeypatch.setattr(case_filters, "BRUTE_FORCE_MAX_ROWS", 0)
+    monkeypatch.setattr(case_filters, "BRUTE_FORCE_FRACTION", 0.0)
+    sparse = np.zeros(index.ntotal, dtype=bool)
+    sparse[[5, 77, 1200, 3999]] = True
+    dense = np.random.default_rng(3).random(index.ntotal) < 0.5
+    queries = np.random.default_rng(4).normal(size=(2, DIM)).astype("float32")
+
+    for mask, selector in ((sparse, faiss.IDSelectorBatch), (dense, faiss.IDSelectorBitmap)):
+        subset = case_filters.CaseSubset(mask)
+        distances, indices = subset.search(index, queries, 8)
+        assert isinstance(subset.selector(index.ntotal), selector)
+        np.testing.assert_array_equal(indices, _filtered_full_search(index, queries, mask, 8)[1])
+
+
+def test_fewer_matches_than_limit_are_padded(corpus):
+    _, index, _ = corpus
+    mask = np.zeros(index.ntotal, dtype=bool)
+    mask[[3, 9]] = True
+    queries = np.ones((1, DIM), dtype="float32")
+
+    distances, indices = case_filters.CaseSubset(mask).search(index, queries, 5)
+    assert sorted(indices[0][:2]) == [3, 9]
+    assert list(indices[0][2:]) == [-1, -1, -1]
+    assert (distances[0][2:] == case_filters.PAD_DISTANCE).all()
+
+    empty = case_filters.CaseSubset(np.zeros(index.ntotal, dtype=bool))
+    assert (empty.search(index, queries, 5)[1] == -1).all()
+
+
+def test_contains(corpus):
+    _, _, attrs = corpus
+    mask = attrs.mask(normalize_filters({"jurisdiction": "Ohio"}))
+    rows = np.arange(len(mask))
+    np.testing.assert_array_equal(case_filters.CaseSubset(mask).contains(rows), mask)
+
+
+def test_attributes_round_trip(corpus, tmp_path):
+    _, _, attrs = corpus
+    attrs.save(tmp_path)
+    loaded = CaseAttributes.load(tmp_path)
+    spec = normalize_filters(SPECS[2])
+    np.testing.assert_array_equal(loaded.mask(spec), attrs.mask(spec))
+
+
+@pytest.mark.parametrize("filters", [
+    ["court"], {"judge": "x"}, {"court": 5}, {"date_from": "last year"}])
+def test_malformed_filters(filters):
+    with pytest.raises(FilterError):
+        normalize_filters(filters)
+
+
+def test_empty_filters_are_none():
+    assert normalize_filters(None) is None
+    assert normalize_filters({"court": "", "date_to": None}) is None
+    assert date_key("1999", upper=True) == 19999999
@@ -0,0 +1,155 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+import backend_server
+import build_citations
+import runtime
+from citations import CitationGraph, court_score
+
+
+N_CASES = 300
+REPORTERS = ["N.Y.", "A.D.2d", "Misc. 3d", "F. Supp."]
+COURTS = ["Supreme Court of New York", "Court of Appeals", "District Court", "Town Court"]
+
+
+def _render(cite, rng):
+    """A citation as an opinion might print it: arbitrary runs of whitespace."""
+    return "".join(c if c != " " else " " * rng.randint(1, 3) for c in cite)
+
+
+def _corpus(seed=0):
+    """Cases citing each other, with the edges and reference counts the build should find."""
+    rng = random.Random(seed)
+    cites = {}
+    for i in range(N_CASES):
+        if i % 7 == 0:
+            continue  # no citation of its own: cannot be cited
+        # volumes stay below 1000 and pages in 100-999, so a stray digit makes an unknown citation
+        cites[i] = [f"{rng.randint(1, 300)} {rng.choice(REPORTERS)} {rng.randint(100, 999)}"
+                    for _ in range(rng.randint(1, 2))]
+    # a citation shared by two cases resolves to the first
+    cites[11] = cites[11] + [cites[10][0]]
+    citable = sorted(cites)
+
+    cases, edges = [], []
+    found = resolved = 0
+    for i in range(N_CASES):
+        targets = set()
+        parts = [f"Opinion {i} of the {COURTS[i % len(COURTS)]}."]
+        for _ in range(rng.randint(0, 6)):
+            j = rng.choice(citable)
+            cite = rng.choice(cites[j])
+            owner = min(k for k in citable if cite in cites[k])
+            parts.append(f"See {_render(cite, rng)}, holding otherwise.")
+            found += 1
+            if owner != i:
+                resolved += 1
+                targets.add(owner)
+        decoy = rng.choice(cites[citable[i % len(citable)]])
+        volume, rest = decoy.split(" ", 1)
+        parts.append(f"Compare 9{int(volume):03d} {rest} and {decoy}7 and 999 N.Y. 99999.")
+        found += 3
+        headnotes = None
+        if i in cites and i % 5 == 0:
+            headnotes = f"Reported at {cites[i][0]}."  # a case naming itself is not an edge
+            found += 1
+        cases.append({"case_id": f"c{i}", "raw_text": " ".join(parts), "headnotes": headnotes,
+                      "citations": cites.get(i, []), "title": f"Case {i}", "court": COURTS[i % len(COURTS)]})
+        edges.append(targets)
+    return cases, edges, found, resolved
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    cases, edges, found, resolved = _corpus()
+    di_path = tmp_path / "di_dataset.jsonl"
+    di_path.write_text("".join(json.dumps(c) + "\n" for c in cases), encoding="utf-8")
+    graph_dir = tmp_path / "citations"
+    monkeypatch.setattr(runtime, "DI_PATH", str(di_path))
+    monkeypatch.setattr(runtime, "CITATION_DIR", graph_dir)
+    monkeypatch.setattr(runtime, "_cache", {})
+    build_citations.build_citation_graph(str(graph_dir))
+    return cases, edges, found, resolved, CitationGraph.load(graph_dir)
+
+
+def _dense_pagerank(graph, damping=0.85, iters=500):
+    n = len(graph)
+    m = np.zeros((n, n))
+    for i in range(n):
+        targets = graph.cites(i)
+        if len(targets):
+            m[targets, i] = 1.0 / len(targets)
+        else:
+            m[:, i] = 1.0 / n
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iters):
+        rank = (1 - damping) / n + damping * m @ rank
+    return rank
+
+
+def test_references_resolve_to_the_cited_rows(dataset):
+    cases, edges, found, resolved, graph = dataset
+
+    assert len(graph) == len(cases)
+    assert [set(graph.cites(i).tolist()) for i in range(len(cases))] == edges
+    assert all(np.all(np.diff(graph.cites(i)) > 0) for i in range(len(cases)))
+    assert graph.meta["references_found"] == found
+    assert graph.meta["references_resolved"] == resolved
+    assert graph.meta["edges"] == sum(map(len, edges))
+
+
+def test_in_edges_are_the_transpose_of_out_edges(dataset):
+    cases, edges, _, _, graph = dataset
+
+    out_pairs = {(i, j) for i in range(len(graph)) for j in graph.cites(i).tolist()}
+    in_pairs = {(i, j) for j in range(len(graph)) for i in graph.cited_by(j).tolist()}
+    assert in_pairs == out_pairs
+    assert len(graph.in_idx) == len(graph.out_idx)
+    for j in range(len(graph)):
+        citing = graph.cited_by(j)
+        assert np.all(np.diff(citing) > 0)  # row order
+        assert graph.in_degree(j) == sum(j in e for e in edges)
+
+
+def test_pagerank_is_a_distribution_matching_the_dense_computation(dataset):
+    graph = dataset[-1]
+
+    assert graph.pagerank.sum() == pytest.approx(1.0, abs=1e-5)
+    assert np.all(graph.pagerank > 0)
+    np.testing.assert_allclose(graph.pagerank, _dense_pagerank(graph), atol=1e-6)
+
+
+def test_authority_is_the_pagerank_percentile_among_cited_cases(dataset):
+    graph = dataset[-1]
+    in_degree = np.diff(graph.in_ptr)
+    cited = np.flatnonzero(in_degree > 0)
+
+    assert np.all(graph.authority[in_degree == 0] == 0)
+    assert sorted(graph.authority[cited]) == pytest.approx(np.arange(1, len(cited) + 1) / len(cited))
+    for a in cited:
+        below = int((graph.pagerank[cited] < graph.pagerank[a]).sum())
+        assert graph.authority[a] > below / len(cited) - 1e-6
+
+
+def test_court_score_is_precomputed_from_the_text(dataset):
+    cases, *_, graph = dataset
+
+    assert graph.court_score.tolist() == pytest.approx([court_score(c["raw_text"]) for c in cases])
+
+
+def test_graph_of_another_dataset_is_not_loaded(dataset, monkeypatch):
+    cases = dataset[0]
+    assert runtime.load_citations() is not None
+
+    with open(runtime.DI_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"case_id": "new", "raw_text": "A case added after the graph was built."}) + "\n")
+    monkeypatch.setattr(runtime, "_cache", {})
+    assert len(runtime.load_cases()) == len(cases) + 1
+    assert runtime.load_citations() is None
+
+    monkeypatch.setattr(backend_server, "verify_token", lambda token: {"user_id": 1})
+    resp = backend_server.app.test_client().get("/api/cases/c3/citing", headers={"Authorization": "Bearer t"})
+    assert resp.status_code == 503
@@ -0,0 +1,137 @@
+import threading
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from encoder_service import BatchingSearcher
+
+
+DIM = 8
+
+
+class FakeEncoder:
+    """Deterministic text -> vector, counting encode calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=None, convert_to_numpy=True):
+        self.calls.append(len(texts))
+        return np.stack([np.random.default_rng(sum(map(ord, t))).normal(size=DIM) for t in texts]).astype("float32")
+
+
+def _index(n=200, seed=0):
+    index = faiss.IndexFlatIP(DIM)
+    index.add(np.random.default_rng(seed).normal(size=(n, DIM)).astype("float32"))
+    return index
+
+
+def _reference(model, index, text, limit, normalize=True):
+    emb = np.ascontiguousarray(model.encode([text]), dtype="float32")
+    if normalize:
+        faiss.normalize_L2(emb)
+    return index.search(emb, limit)
+
+
+def _concurrent(searcher, calls):
+    """Run searcher.search(*args, **kwargs) for each call on its own thread; results in call order."""
+    results = [None] * len(calls)
+    barrier = threading.Barrier(len(calls))
+
+    def run(i, args, kwargs):
+        barrier.wait()
+        try:
+            results[i] = searcher.search(*args, **kwargs)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i, a, kw)) for i, (a, kw) in enumerate(calls)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_batched_results_match_individual_searches():
+    model, index = FakeEncoder(), _index()
+    searcher = BatchingSearcher(model, index, max_batch=16, max_wait_ms=200)
+    calls = [((f"query {i}", 3 + i % 5), {"normalize": i % 2 == 0}) for i in range(12)]
+
+    results = _concurrent(searcher, calls)
+
+    assert searcher.stats()["items"] == 12
+    assert searcher.stats()["batches"] < 12
+    for (args, kwargs), (distances, indices) in zip(calls, results):
+        ref_d, ref_i = _reference(FakeEncoder(), index, *args, **kwargs)
+        np.testing.assert_array_equal(indices, ref_i)
+        np.testing.assert_allclose(distances, ref_d, rtol=1e-5)
+
+
+def test_return_embedding_is_raw_encoder_output():
+    model, index = FakeEncoder(), _index()
+    searcher = BatchingSearcher(model, index, max_wait_ms=0)
+
+    distances, indices, embedding = searcher.search("contract", 5, return_embedding=True)
+
+    np.testing.assert_array_equal(embedding, FakeEncoder().encode(["contract"])[0])
+    assert indices.shape == (1, 5)
+
+
+class FailingSubset:
+    def search(self, index, queries, limit):
+        raise RuntimeError("subset failed")
+
+
+class PoisonIndex:
+    """Index whose search fails whenever a given query vector is in the batch."""
+
+    def __init__(self, index, poison):
+        self.index = index
+        self.poison = poison
+
+    def search(self, queries, limit):
+        if any(np.array_equal(q, self.poison) for q in queries):
+            raise RuntimeError("poison query")
+        return self.index.search(queries, limit)
+
+
+def test_failing_subset_fails_only_its_request():
+    model, index = FakeEncoder(), _index()
+    searcher = BatchingSearcher(model, index, max_batch=8, max_wait_ms=200)
+    calls = [(("a", 4), {}), (("b", 4), {"subset": FailingSubset()}), (("c", 4), {})]
+
+    results = _concurrent(searcher, calls)
+
+    assert isinstance(results[1], RuntimeError)
+    for i in (0, 2):
+        np.testing.assert_array_equal(results[i][1], _reference(FakeEncoder(), index, *calls[i][0])[1])
+
+
+def test_failing_row_in_shared_search_fails_only_its_request():
+    model, flat = FakeEncoder(), _index()
+    poison = FakeEncoder().encode(["poison"])[0]
+    searcher = BatchingSearcher(model, PoisonIndex(flat, poison), max_batch=8, max_wait_ms=200)
+    calls = [(("a", 4), {"normalize": False}), (("poison", 4), {"normalize": False}),
+             (("c", 4), {"normalize": False})]
+
+    results = _concurrent(searcher, calls)
+
+    assert isinstance(results[1], RuntimeError)
+    for i in (0, 2):
+        np.testing.assert_array_equal(results[i][1], _reference(FakeEncoder(), flat, *calls[i][0], normalize=False)[1])
+
+
+def test_encode_failure_fails_the_batch_and_worker_survives():
+    class Flaky(FakeEncoder):
+        def encode(self, texts, **kwargs):
+            if "boom" in texts:
+                raise RuntimeError("encode failed")
+            return super().encode(texts, **kwargs)
+
+    searcher = BatchingSearcher(Flaky(), _index(), max_wait_ms=0)
+    with pytest.raises(RuntimeError):
+        searcher.search("boom", 3)
+    assert searcher.search("fine", 3)[1].shape == (1, 3)
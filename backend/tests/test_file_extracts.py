@@ -0,0 +1,112 @@
+import io
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("flask")
+
+import db
+import backend_server
+
+
+@pytest.fixture
+def fake_extract(monkeypatch):
+    """Replace the real extractor with a slow one that counts calls per type."""
+    calls = []
+    calls_lock = threading.Lock()
+
+    def process(file_path, file_type):
+        with calls_lock:
+            calls.append(file_type)
+        time.sleep(0.05)
+        if file_type == "bad":
+            raise RuntimeError("extractor crashed")
+        return {"success": True, "type": "text", "text": f"extracted as {file_type}"}
+
+    monkeypatch.setattr(backend_server, "process_uploaded_file", process)
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM file_extracts")
+    return calls
+
+
+def _concurrent(fn, args_list):
+    results = [None] * len(args_list)
+    barrier = threading.Barrier(len(args_list))
+
+    def run(i, args):
+        barrier.wait()
+        results[i] = fn(*args)
+
+    threads = [threading.Thread(target=run, args=(i, a)) for i, a in enumerate(args_list)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def _raises(fn, *args):
+    try:
+        return fn(*args)
+    except Exception as e:
+        return e
+
+
+def test_concurrent_requests_extract_once_per_hash_and_type(fake_extract):
+    args = [("blob", "txt", "h1")] * 6 + [("blob", "json", "h1")] * 3
+    results = _concurrent(backend_server.get_file_extract, args)
+
+    assert sorted(fake_extract) == ["json", "txt"]
+    assert sum(not r["cached"] for r in results) == 2
+    assert {r["query_text"] for r in results[:6]} == {"extracted as txt"}
+    assert {r["query_text"] for r in results[6:]} == {"extracted as json"}
+    assert backend_server._extract_locks == {}
+
+
+def test_same_content_keeps_one_extract_per_type(fake_extract):
+    backend_server.get_file_extract("blob", "txt", "h2")
+    backend_server.get_file_extract("blob", "json", "h2")
+
+    txt = backend_server.get_file_extract("blob", "txt", "h2")
+    json_ = backend_server.get_file_extract("blob", "json", "h2")
+
+    assert txt["cached"] and json_["cached"]
+    assert (txt["query_text"], json_["query_text"]) == ("extracted as txt", "extracted as json")
+    assert fake_extract == ["txt", "json"]
+
+
+def test_failed_extraction_releases_its_lock(fake_extract):
+    results = _concurrent(lambda *a: _raises(backend_server.get_file_extract, *a), [("blob", "bad", "h3")] * 4)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert backend_server._extract_locks == {}
+
+
+def test_init_db_migrates_hash_only_extract_table():
+    with db.transaction() as conn:
+        conn.execute("DROP TABLE file_extracts")
+        conn.execute("CREATE TABLE file_extracts (content_hash TEXT PRIMARY KEY, file_type TEXT NOT NULL, "
+                     "processed TEXT NOT NULL, query_text TEXT NOT NULL, created_at TIMESTAMP)")
+
+    backend_server.init_db()
+
+    rows = db.get_connection().execute("PRAGMA table_info(file_extracts)").fetchall()
+    assert [row[1] for row in sorted(rows, key=lambda r: r[5]) if row[5]] == ["content_hash", "file_type"]
+
+
+def test_identical_uploads_share_one_blob(monkeypatch, tmp_path):
+    monkeypatch.setitem(backend_server.app.config, "UPLOAD_FOLDER", str(tmp_path))
+
+    class Upload:
+        def __init__(self, data):
+            self.stream = io.BytesIO(data)
+
+    first = backend_server.save_upload_blob(Upload(b"same bytes"), "txt")
+    second = backend_server.save_upload_blob(Upload(b"same bytes"), "txt")
+    other = backend_server.save_upload_blob(Upload(b"other bytes"), "txt")
+
+    assert first["filename"] == second["filename"] != other["filename"]
+    assert (first["existed"], second["existed"]) == (False, True)
+    assert (tmp_path / first["filename"]).read_bytes() == b"same bytes"
+    assert not any((tmp_path / "tmp").iterdir())
@@ -0,0 +1,150 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import build_lexical
+import lexical
+from case_filters import CaseSubset
+from lexical import BM25Index, reciprocal_rank_fusion
+from snippets import WORD_RE, STOPWORDS
+
+
+N_DOCS = 1500
+
+
+def _words(text):
+    return [w for w in WORD_RE.findall(text.lower()) if len(w) > 2 and w not in STOPWORDS]
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    vocab = [f"term{i:04d}" for i in range(3000)]
+    # Zipf-like term frequencies: a few very common terms, a long rare tail
+    p = 1.0 / np.arange(1, len(vocab) + 1)
+    p /= p.sum()
+    cases = []
+    for i in range(N_DOCS):
+        words = rng.choice(vocab, size=rng.integers(5, 80), p=p)
+        cases.append({"raw_text": " ".join(words) + " the of and", "headnotes": "Headnote " + vocab[i % 50]})
+    cases.append({"raw_text": "", "headnotes": None})  # empty document
+
+    out = tmp_path_factory.mktemp("lexical")
+    mp = pytest.MonkeyPatch()
+    mp.setattr(build_lexical.runtime, "load_cases", lambda: cases)
+    try:
+        # small blocks and several partitions exercise the spill/merge path
+        build_lexical.build_lexical_index(str(out), block_docs=97, partitions=4)
+    finally:
+        mp.undo()
+    return cases, BM25Index.load(out)
+
+
+def _brute_force_scores(cases, query, budget=None):
+    """BM25 over the raw cases, term by term (rarest first up to `budget` postings)."""
+    docs = [Counter(_words(lexical.document_text(c))) for c in cases]
+    n = len(docs)
+    avgdl = sum(sum(d.values()) for d in docs) / n
+    df = Counter(t for d in docs for t in d)
+    terms = sorted((t for t in set(_words(query)) if df[t]), key=lambda t: df[t])
+    scores = {}
+    decoded = 0
+    for t in terms:
+        if budget is not None and decoded and decoded + df[t] > budget:
+            break
+        decoded += df[t]
+        idf = math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5))
+        for i, d in enumerate(docs):
+            tf = d.get(t)
+            if tf:
+                norm = lexical.K1 * (1 - lexical.B + lexical.B * sum(d.values()) / avgdl)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (lexical.K1 + 1) / (tf + norm)
+    return scores
+
+
+def _check_top(index, cases, query, limit, subset=None, budget=None):
+    ref = _brute_force_scores(cases, query, budget)
+    if subset is not None:
+        ref = {d: s for d, s in ref.items() if subset.contains([d])[0]}
+    scores, docs = index.search(query, limit, subset=subset)
+
+    expected = sorted(ref.values(), reverse=True)[:limit]
+    assert len(docs) == len(expected)
+    np.testing.assert_allclose(scores, expected, rtol=1e-4)
+    # every returned doc carries its own reference score (robust to ties)
+    np.testing.assert_allclose(scores, [ref[int(d)] for d in docs], rtol=1e-4)
+    assert np.all(np.diff(scores) <= 0)
+
+
+@pytest.mark.parametrize("query", [
+    "term2999",                              # one rare term
+    "term2500 term2990 term1800",            # rare terms: sorted merge
+    "term0000 term0001 term0002 term0100",   # common terms: dense accumulator
+    "Term0003, term0003; TERM2700!",         # case, punctuation and repeats
+])
+@pytest.mark.parametrize("limit", [1, 10, N_DOCS + 10])
+def test_search_matches_brute_force(corpus, query, limit):
+    cases, index = corpus
+    _check_top(index, cases, query, limit)
+
+
+def test_unknown_and_stopword_queries_return_nothing(corpus):
+    _, index = corpus
+    for query in ("zzzzzz", "the of and", ""):
+        scores, docs = index.search(query, 10)
+        assert len(scores) == len(docs) == 0
+
+
+@pytest.mark.parametrize("query", ["term0000 term0001 term0300", "term2500 term2990 term0010"])
+def test_subset_search_matches_filtered_brute_force(corpus, query):
+    cases, index = corpus
+    mask = np.random.default_rng(1).random(len(cases)) < 0.3
+    _check_top(index, cases, query, 10, subset=CaseSubset(mask))
+
+
+def test_postings_budget_scores_rarest_terms_first(corpus, monkeypatch):
+    cases, index = corpus
+    monkeypatch.setattr(lexical, "POSTINGS_BUDGET", 300)
+    _check_top(index, cases, "term0000 term0001 term0400 term2900", 10, budget=300)
+
+
+def test_postings_round_trip():
+    docs = np.array([3, 4, 90, 70000], dtype=np.uint32)
+    tfs = np.array([1, 2, 70000, 5], dtype=np.uint32)
+    index = BM25Index(np.array([7], np.uint32), np.array([4], np.uint32), np.array([0, 0], np.int64),
+                      np.zeros(0, np.uint8), np.ones(70001, np.uint32), {"docs": 70001, "avgdl": 1.0})
+    block = np.frombuffer(lexical.encode_postings(docs, tfs), dtype=np.uint8)
+    index.postings, index.offsets = block, np.array([0, len(block)], np.int64)
+
+    got_docs, got_tfs = index.postings_for(0)
+    np.testing.assert_array_equal(got_docs, docs)
+    np.testing.assert_array_equal(got_tfs, [1, 2, 65535, 5])  # tf is capped at uint16
+
+
+# ---------------- RRF ---------------- #
+
+def _brute_force_rrf(rankings, k):
+    docs = {d for r in rankings for d in r}
+    fused = {d: sum(1.0 / (k + r.index(d) + 1) for r in rankings if d in r) for d in docs}
+    return sorted(fused.items(), key=lambda item: (-item[1], item[0]))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rrf_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    rankings = [list(rng.permutation(40)[:rng.integers(0, 30)]) for _ in range(rng.integers(1, 4))]
+
+    docs, scores = reciprocal_rank_fusion(rankings, k=60)
+
+    expected = _brute_force_rrf(rankings, 60)
+    assert docs == [d for d, _ in expected]
+    np.testing.assert_allclose(scores, [s for _, s in expected])
+
+
+def test_rrf_rewards_agreement_and_breaks_ties_by_doc_id():
+    docs, scores = reciprocal_rank_fusion([[7, 1], [5, 1]], k=60)
+    assert docs == [1, 5, 7]                 # second in both lists beats first in one
+    assert scores == [2.0 / 62, 1.0 / 61, 1.0 / 61]
+    assert reciprocal_rank_fusion([]) == ([], [])
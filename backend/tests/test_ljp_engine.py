@@ -0,0 +1,53 @@
+import warnings
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import LabelEncoder
+
+from ljp_engine import LJPEngine, export_mlp
+
+
+def _fit(labels, activation="relu", hidden=(16, 8), seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(120, 12)).astype(np.float32)
+    y_text = np.array(labels)[rng.integers(0, len(labels), size=len(X))]
+    le = LabelEncoder()
+    y = le.fit_transform(y_text)
+    clf = MLPClassifier(hidden_layer_sizes=hidden, activation=activation, max_iter=300, random_state=seed)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        clf.fit(X, y)
+    return clf, le, X
+
+
+@pytest.mark.parametrize("activation", ["relu", "tanh", "logistic", "identity"])
+def test_exported_engine_matches_sklearn_multiclass(tmp_path, activation):
+    clf, le, X = _fit(["affirmed", "reversed", "remanded", "dismissed"], activation)
+    engine = LJPEngine.load(export_mlp(clf, le, tmp_path))
+
+    np.testing.assert_allclose(engine.predict_proba(X), clf.predict_proba(X), rtol=1e-4, atol=1e-5)
+    np.testing.assert_array_equal(engine.predict(X), clf.predict(X))
+    np.testing.assert_array_equal(engine.label_enc.inverse_transform(engine.predict(X)),
+                                  le.inverse_transform(clf.predict(X)))
+
+
+def test_exported_engine_matches_sklearn_binary(tmp_path):
+    clf, le, X = _fit(["affirmed", "reversed"])
+    engine = LJPEngine.load(export_mlp(clf, le, tmp_path), mmap=False)
+
+    proba = engine.predict_proba(X)
+    assert proba.shape == (len(X), 2)
+    np.testing.assert_allclose(proba, clf.predict_proba(X), rtol=1e-4, atol=1e-5)
+
+
+def test_single_row_and_feature_check(tmp_path):
+    clf, le, X = _fit(["affirmed", "reversed", "remanded"])
+    engine = LJPEngine.load(export_mlp(clf, le, tmp_path))
+
+    np.testing.assert_allclose(engine.predict_proba(X[0]), clf.predict_proba(X[:1]), rtol=1e-4, atol=1e-5)
+    with pytest.raises(ValueError):
+        engine.predict_proba(np.zeros((1, X.shape[1] + 1)))
@@ -0,0 +1,18 @@
+import metrics
+
+
+def test_render_format():
+    counter = metrics.Counter("advoca_test_fmt_total", "Requests", ("endpoint", "status"))
+    counter.labels("scr", 200).inc(3)
+    histogram = metrics.Histogram("advoca_test_fmt_seconds", "Latency", ("endpoint",), buckets=(0.1, 1))
+    histogram.labels("scr").observe(0.05)
+    histogram.labels("scr").observe(5)
+
+    lines = counter.render()
+    assert lines[:2] == ["# HELP advoca_test_fmt_total Requests", "# TYPE advoca_test_fmt_total counter"]
+    assert lines[2].startswith('advoca_test_fmt_total{endpoint="scr",status="200"')
+    assert float(lines[2].split()[-1]) == 3
+
+    counts = {line.split("le=")[1].split('"')[1]: line.split()[-1]
+              for line in histogram.render() if "_bucket" in line}
+    assert counts == {"0.1": "1", "1": "1", "+Inf": "2"}
@@ -0,0 +1,201 @@
+import json
+import os
+import itertools
+
+import pytest
+
+pytest.importorskip("tqdm")
+
+import preproc
+
+
+_mtime = itertools.count(1_700_000_000 * 10**9, 10**9)
+
+
+def _write(raw, rel, payload):
+    """Write one raw case file with a fresh mtime, so edits are always detected."""
+    path = raw / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(payload if isinstance(payload, str) else json.dumps(payload), encoding="utf-8")
+    ns = next(_mtime)
+    os.utime(path, ns=(ns, ns))
+
+
+def _case(case_id, text):
+    return {"id": case_id, "name": f"Case {case_id}", "court": {"name": "Court of Appeals"},
+            "jurisdiction": {"name": "New York"}, "decision_date": "1990-01-01",
+            "casebody": {"opinions": [{"text": text}]}}
+
+
+def _lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.readlines()
+
+
+def _manifest(out):
+    with open(preproc.manifest_path(str(out)), encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    return records[:-1], records[-1]
+
+
+def _changes(out):
+    path = preproc.changes_path(str(out))
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _full_reference(raw, tmp_path):
+    ref = tmp_path / "ref" / "di.jsonl"
+    preproc.build_DI_dataset(str(raw), str(ref), workers=1, full=True)
+    return _lines(ref)
+
+
+def _embed(stored, changes, lines):
+    """Apply a change list to stored per-row values the way Embeddings.py does."""
+    if changes["full"]:
+        return list(lines)
+    removed = set(changes["removed"])
+    kept = [v for i, v in enumerate(stored) if i not in removed]
+    start = min(len(kept), changes["appended_from"])
+    updated = set(changes["updated"])
+    return [lines[i] if i in updated else kept[i] for i in range(start)] + lines[start:]
+
+
+@pytest.fixture
+def raw(tmp_path):
+    raw = tmp_path / "raw"
+    for state, vol, i in itertools.product(("Ohio", "Texas"), range(3), range(4)):
+        _write(raw, f"{state}/vol{vol}/cases/{vol}{i:02d}.json", _case(f"{state}-{vol}-{i}", f"opinion {state} {vol} {i}"))
+    return raw
+
+
+def test_full_build_is_the_same_for_any_worker_count(raw, tmp_path):
+    serial, parallel = tmp_path / "a" / "di.jsonl", tmp_path / "b" / "di.jsonl"
+    preproc.build_DI_dataset(str(raw), str(serial), workers=1)
+    preproc.build_DI_dataset(str(raw), str(parallel), workers=2, chunk_size=5)
+    assert serial.read_bytes() == parallel.read_bytes()
+    assert len(_lines(serial)) == 24
+
+
+MUTATIONS = [
+    ("add", lambda raw: [_write(raw, f"Utah/vol0/cases/{i}.json", _case(f"Utah-{i}", f"new {i}")) for i in range(3)]),
+    ("edit", lambda raw: [_write(raw, f"Ohio/vol{v}/cases/{v}01.json", _case(f"Ohio-{v}-1", "edited")) for v in range(3)]),
+    ("touch", lambda raw: os.utime(raw / "Texas/vol1/cases/102.json", ns=(next(_mtime),) * 2)),
+    ("delete", lambda raw: [os.remove(raw / f"Ohio/vol{v}/cases/{v}00.json") for v in (0, 2)]),
+    ("break", lambda raw: _write(raw, "Texas/vol0/cases/003.json", "{not json")),
+    ("mixed", lambda raw: (os.remove(raw / "Texas/vol2/cases/201.json"),
+                           _write(raw, "Texas/vol2/cases/202.json", _case("Texas-2-2", "edited again")),
+                           _write(raw, "Ohio/vol9/cases/900.json", _case("Ohio-9-0", "appended")))),
+    ("fix", lambda raw: _write(raw, "Texas/vol0/cases/003.json", _case("Texas-0-3", "repaired"))),
+    ("delete-new", lambda raw: os.remove(raw / "Utah/vol0/cases/1.json")),
+]
+
+
+@pytest.mark.parametrize("embed_every", [1, 3, len(MUTATIONS)])
+def test_incremental_builds_match_a_full_build(raw, tmp_path, embed_every):
+    out = tmp_path / "out" / "di.jsonl"
+    preproc.build_DI_dataset(str(raw), str(out), workers=1)
+    stored = _embed([], _changes(out), _lines(out))
+    os.remove(preproc.changes_path(str(out)))
+
+    for step, (name, mutate) in enumerate(MUTATIONS, start=1):
+        mutate(raw)
+        result = preproc.build_DI_dataset(str(raw), str(out), workers=1)
+        assert result["mode"] == "incremental", name
+        lines = _lines(out)
+
+        # same records as a full build, each at the row the manifest gives its file
+        assert sorted(lines) == sorted(_full_reference(raw, tmp_path)), name
+        entries, footer = _manifest(out)
+        for entry in entries:
+            if entry["row"] is not None:
+                _, line, _, _ = preproc.process_file(str(raw / entry["path"]))
+                assert lines[entry["row"]] == line, (name, entry["path"])
+
+        # Embeddings.py may run after every build or only after several
+        if step % embed_every == 0 or step == len(MUTATIONS):
+            stored = _embed(stored, _changes(out), lines)
+            os.remove(preproc.changes_path(str(out)))
+            assert stored == lines, name
+
+
+def test_touched_files_change_nothing(raw, tmp_path):
+    out = tmp_path / "out" / "di.jsonl"
+    preproc.build_DI_dataset(str(raw), str(out), workers=1)
+    before = out.read_bytes()
+    os.remove(preproc.changes_path(str(out)))
+    os.utime(raw / "Ohio/vol0/cases/001.json", ns=(next(_mtime),) * 2)  # same bytes
+
+    result = preproc.build_DI_dataset(str(raw), str(out), workers=1)
+
+    assert result["unchanged"] == 23 and result["added"] == result["replaced"] == result["removed"] == 0
+    assert result["bytes"] == os.path.getsize(raw / "Ohio/vol0/cases/001.json")
+    assert out.read_bytes() == before
+    changes = _changes(out)
+    assert (changes["removed"], changes["updated"], changes["appended_from"]) == ([], [], 24)
+    # the new mtime is recorded: the next run parses nothing
+    assert preproc.build_DI_dataset(str(raw), str(out), workers=1)["unchanged"] == 24
+
+
+def test_manifest_covers_every_file(raw, tmp_path):
+    _write(raw, "Ohio/vol0/cases/bad.json", "[1, 2]")
+    out = tmp_path / "out" / "di.jsonl"
+    result = preproc.build_DI_dataset(str(raw), str(out), workers=1)
+
+    entries, footer = _manifest(out)
+    assert len(entries) == 25 and result["errors"] == 1
+    assert {e["path"] for e in entries} == {os.path.relpath(p, raw) for p in preproc.list_source_files(str(raw))}
+    assert [e["row"] for e in entries if e["path"].endswith("bad.json")] == [None]
+    assert sorted(e["row"] for e in entries if e["row"] is not None) == list(range(24))
+    assert footer["records"] == 24 and footer["out_size"] == out.stat().st_size
+    assert footer["raw_root"] == os.path.abspath(raw)
+    assert _changes(out)["full"] is True
+
+
+def test_interrupted_append_is_truncated(raw, tmp_path):
+    out = tmp_path / "out" / "di.jsonl"
+    preproc.build_DI_dataset(str(raw), str(out), workers=1)
+    good = out.read_bytes()
+    with open(out, "ab") as f:
+        f.write(b'{"partial": ')
+
+    result = preproc.build_DI_dataset(str(raw), str(out), workers=1)
+
+    assert result["mode"] == "incremental"
+    assert out.read_bytes() == good
+
+
+def test_other_raw_root_forces_full_build(raw, tmp_path):
+    out = tmp_path / "out" / "di.jsonl"
+    preproc.build_DI_dataset(str(raw), str(out), workers=1)
+    other = tmp_path / "raw2"
+    _write(other, "a/cases/1.json", _case("x", "only case"))
+
+    result = preproc.build_DI_dataset(str(other), str(out), workers=1)
+
+    assert result["mode"] == "full" and result["records"] == 1
+
+
+@pytest.mark.parametrize("older, newer, expected", [
+    # rows removed by the newer build are numbered as before the older build
+    ({"removed": [2], "appended_from": 10, "updated": [1], "full": False},
+     {"removed": [4], "appended_from": 8, "updated": [], "full": False},
+     {"removed": [2, 5], "appended_from": 8, "updated": [1]}),
+    # rows appended by the older build and never embedded are not "removed"
+    ({"removed": [], "appended_from": 5, "updated": [], "full": False},
+     {"removed": [6], "appended_from": 6, "updated": [2], "full": False},
+     {"removed": [], "appended_from": 5, "updated": [2]}),
+    # an update of a row shifted by the newer removals follows it
+    ({"removed": [], "appended_from": 9, "updated": [3, 7], "full": False},
+     {"removed": [3, 5], "appended_from": 7, "updated": [], "full": False},
+     {"removed": [3, 5], "appended_from": 7, "updated": [5]}),
+])
+def test_merge_changes(older, newer, expected):
+    merged = preproc.merge_changes(older, newer)
+    assert {k: merged[k] for k in expected} == expected
+
+
+def test_merge_changes_with_a_full_build_is_full():
+    full = {"removed": [], "appended_from": 0, "updated": [], "full": True}
+    part = {"removed": [1], "appended_from": 3, "updated": [0], "full": False}
+    assert preproc.merge_changes(full, part)["full"] and preproc.merge_changes(part, full)["full"]
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import build_case_filters
+import build_lexical
+import build_snippets
+import runtime
+
+
+CASES = [{"case_id": f"c{i}", "raw_text": f"Opinion {i}. The court considered term{i % 7} at length.",
+          "headnotes": None, "court": ["Court of Appeals", "District Court"][i % 2],
+          "jurisdiction": "New York", "date": f"{1950 + i}-01-01"} for i in range(40)]
+
+# loader, builder and the runtime setting naming the artifact's directory
+ARTIFACTS = {
+    "filters": (runtime.load_case_attributes, build_case_filters.build_case_filters, "FILTER_DIR"),
+    "lexical": (runtime.load_lexical, build_lexical.build_lexical_index, "LEXICAL_DIR"),
+    "snippets": (runtime.load_snippets, build_snippets.build_snippet_index, "SNIPPET_DIR"),
+}
+
+
+def _write_di(path, cases):
+    path.write_text("".join(json.dumps(c) + "\n" for c in cases), encoding="utf-8")
+
+
+@pytest.fixture(params=sorted(ARTIFACTS))
+def built(request, tmp_path, monkeypatch):
+    loader, builder, dir_name = ARTIFACTS[request.param]
+    di_path = tmp_path / "di_dataset.jsonl"
+    _write_di(di_path, CASES)
+    monkeypatch.setattr(runtime, "DI_PATH", str(di_path))
+    monkeypatch.setattr(runtime, dir_name, tmp_path / request.param)
+    monkeypatch.setattr(runtime, "_cache", {})
+    builder(str(tmp_path / request.param))
+    return request.param, loader, di_path
+
+
+def _reload(monkeypatch, loader):
+    monkeypatch.setattr(runtime, "_cache", {})
+    return loader()
+
+
+def test_artifact_of_the_current_dataset_is_loaded(built):
+    name, loader, _ = built
+    artifact = loader()
+
+    assert artifact is not None
+    if name == "filters":
+        assert artifact.dataset == runtime.dataset_stamp()  # not derived
+
+
+@pytest.mark.parametrize("change", ["append", "remove", "replace"])
+def test_artifact_of_another_dataset_is_refused(built, monkeypatch, change):
+    name, loader, di_path = built
+    cases = list(CASES)
+    if change == "append":
+        cases.append(dict(CASES[0], case_id="new"))
+    elif change == "remove":
+        del cases[3]  # renumbers every later row
+    else:
+        cases[3] = dict(CASES[3], raw_text="A rewritten opinion with other sentences entirely.")
+    _write_di(di_path, cases)
+
+    artifact = _reload(monkeypatch, loader)
+
+    if name == "filters":
+        # derived from the loaded cases instead
+        assert artifact.dataset is None and len(artifact) == len(cases)
+    else:
+        assert artifact is None
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+import tabular
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"id": np.arange(1037), "amount": rng.normal(size=1037).round(3),
+                       "party": [f"party {i % 13}" for i in range(1037)]})
+    df.loc[5, "amount"] = np.nan
+    path = tmp_path / "table.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("offset, limit", [(0, 10), (0, 1000), (95, 10), (99, 2), (100, 250),
+                                           (1030, 100), (1037, 10), (5000, 10)])
+def test_csv_pages_match_slicing_the_full_table(csv_file, monkeypatch, offset, limit):
+    monkeypatch.setattr(tabular, "CHUNK_ROWS", 100)  # pages straddle chunk boundaries
+    records, columns = tabular.read_rows(str(csv_file), "csv", offset=offset, limit=limit)
+
+    full = pd.read_csv(csv_file)
+    assert columns == ["id", "amount", "party"]
+    assert records == tabular._records(full.iloc[offset:offset + limit])
+
+
+def test_csv_page_limit_is_capped(csv_file):
+    records, _ = tabular.read_rows(str(csv_file), "csv", offset=0, limit=10**6)
+    assert len(records) == tabular.MAX_PAGE_ROWS
+
+
+def test_header_only_csv(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("a,b\n")
+    assert tabular.read_rows(str(path), "csv", offset=0, limit=5) == ([], ["a", "b"])
+
+
+def test_xlsx_pages_match_slicing_the_full_table(tmp_path):
+    pytest.importorskip("openpyxl")
+    df = pd.DataFrame({"id": range(60), "name": [f"row {i}" for i in range(60)]})
+    path = tmp_path / "table.xlsx"
+    df.to_excel(path, index=False)
+
+    records, columns = tabular.read_rows(str(path), "xlsx", offset=25, limit=10)
+    assert columns == ["id", "name"]
+    assert records == tabular._records(df.iloc[25:35])
+
+
+def test_summary_preview_and_stats(csv_file):
+    summary = tabular.summarize_table(str(csv_file), "csv", preview_rows=7)
+    full = pd.read_csv(csv_file)
+
+    assert summary["row_count"] == 1037 and summary["truncated"]
+    assert summary["data"] == tabular._records(full.head(7))
+    amount = summary["column_stats"]["amount"]
+    assert amount["nulls"] == 1 and amount["count"] == 1036
+    assert amount["mean"] == pytest.approx(full["amount"].mean())
+    assert summary["column_stats"]["party"]["dtype"] == "text"
@@ -1,13 +1,30 @@
 import os
 import json
 import re
+import time
+import bisect
+import hashlib
+import argparse
 import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 
 RAW_ROOT = "/Users/srinandanasarmakesapragada/Documents/data_raw"
 OUT_DIR = "/Users/srinandanasarmakesapragada/Documents/data_raw"
 OUT_FILE = os.path.join(OUT_DIR, "di_dataset.jsonl")
 
+# files parsed per worker task; large enough to amortise the IPC per chunk
+CHUNK_SIZE = 256
+
+# Incremental rebuilds keep two files next to the dataset (see build_DI_dataset):
+#   <out>.manifest.jsonl  one line per source file {path, size, mtime_ns, sha1, row}
+#                         (row = line in the dataset, null if the file failed),
+#                         then a footer {version, raw_root, records, out_size}
+#   <out>.changes.json    rows to drop from and (re-)embed into the stored
+#                         embeddings since Embeddings.py last ran
+MANIFEST_VERSION = 1
+
 
 
 def clean_text(text):
@@ -106,32 +123,362 @@ def extract_case(data, filename):
     }
 
 
-def build_DI_dataset():
-    os.makedirs(OUT_DIR, exist_ok=True)
+def manifest_path(out_file):
+    return os.path.splitext(out_file)[0] + ".manifest.jsonl"
 
-    with open(OUT_FILE, "w", encoding="utf-8") as out:
-        for root, dirs, files in os.walk(RAW_ROOT):
-            json_files = [f for f in files if f.lower().endswith(".json")]
 
-            if len(json_files) > 0:
-                print(f"[DEBUG] Folder: {root} | JSON files found: {len(json_files)}")
+def changes_path(out_file):
+    return os.path.splitext(out_file)[0] + ".changes.json"
+
+
+def list_source_files(raw_root=RAW_ROOT, verbose=False):
+    """Raw case files in os.walk order (the order records are written in)."""
+    paths = []
+    for root, dirs, files in os.walk(raw_root):
+        json_files = [f for f in files if f.lower().endswith(".json")]
+
+        if verbose and json_files:
+            print(f"Folder: {root} | JSON files found: {len(json_files)}")
 
-            for filename in tqdm(json_files, desc=f"Processing {root}", leave=False):
-                path = os.path.join(root, filename)
-                try:
-                    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                        data = json.load(f)
-                except Exception as e:
-                    print("[WARN]", e)
+        paths.extend(os.path.join(root, filename) for filename in json_files)
+    return paths
+
+
+def process_file(path):
+    """One raw case file -> (path, JSONL line or None, error or None, source).
+
+    `source` is the manifest entry (size, mtime_ns, sha1) of the bytes that
+    were parsed, or None if the file could not be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+            st = os.fstat(f.fileno())
+    except OSError as e:
+        return path, None, f"{path}: {e}", None
+    source = (st.st_size, st.st_mtime_ns, hashlib.sha1(raw).hexdigest())
+    try:
+        # decoded like open(..., encoding="utf-8", errors="ignore")
+        data = json.loads(raw.decode("utf-8", errors="ignore"))
+        case_entry = extract_case(data, os.path.basename(path))
+        return path, json.dumps(case_entry, ensure_ascii=False) + "\n", None, source
+    except Exception as e:
+        return path, None, f"{path}: {e}", source
+
+
+def process_chunk(paths):
+    return [process_file(path) for path in paths]
+
+
+def iter_processed(paths, workers=None, chunk_size=CHUNK_SIZE):
+    """process_file results for every path, in input order.
+
+    Chunks are parsed and cleaned on a process pool; at most a few chunks per
+    worker are in flight, so memory stays bounded however large the dump is.
+    workers=1 runs in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = (paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size))
+    if workers == 1:
+        for chunk in chunks:
+            yield from process_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(process_chunk, chunk))
+            if len(pending) >= 4 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _parse(paths, workers, chunk_size, counters):
+    """iter_processed with a progress bar; failed files are reported and counted."""
+    reported = 0
+    with tqdm(total=len(paths), unit="file", desc="DI build") as progress:
+        for i, result in enumerate(iter_processed(paths, workers, chunk_size), start=1):
+            if result[2] is not None:
+                counters["errors"] += 1
+                print("[WARN]", result[2])
+            if result[3] is not None:
+                counters["bytes"] += result[3][0]
+            if i % chunk_size == 0 or i == len(paths):
+                progress.update(i - reported)
+                progress.set_postfix(errors=counters["errors"])
+                reported = i
+            yield result
+
+
+# ---------------- MANIFEST ---------------- #
+
+def _manifest_line(rel, entry):
+    size, mtime_ns, sha1, row = entry
+    return json.dumps({"path": rel, "size": size, "mtime_ns": mtime_ns, "sha1": sha1, "row": row}) + "\n"
+
+
+def _footer(raw_root, records, out_size):
+    return {"version": MANIFEST_VERSION, "raw_root": os.path.abspath(raw_root),
+            "records": records, "out_size": out_size}
+
+
+def _read_footer(path):
+    """Footer of a manifest, or None if it was not completely written."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        lines = f.read().splitlines()
+    try:
+        footer = json.loads(lines[-1]) if lines else {}
+    except ValueError:
+        return None
+    return footer if "version" in footer else None
+
+
+def _commit(out_file, changes):
+    """Publish <out>.tmp (if written) and <out>.manifest.jsonl.tmp.
+
+    The change list is merged first: if a crash follows, the next run redoes
+    the delta and at worst re-embeds a few rows twice. The dataset is renamed
+    before the manifest; _recover completes a commit interrupted in between.
+    """
+    path = changes_path(out_file)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            changes = merge_changes(json.load(f), changes)
+    changes["id"] = f"{time.time_ns():x}"  # lets Embeddings.py apply removals once
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(changes, f)
+    os.replace(path + ".tmp", path)
+    if os.path.exists(out_file + ".tmp"):
+        os.replace(out_file + ".tmp", out_file)
+    os.replace(manifest_path(out_file) + ".tmp", manifest_path(out_file))
+
+
+def _recover(out_file):
+    """Finish or discard a build interrupted during _commit."""
+    tmp_manifest = manifest_path(out_file) + ".tmp"
+    if os.path.exists(tmp_manifest) and not os.path.exists(out_file + ".tmp"):
+        footer = _read_footer(tmp_manifest)
+        if footer and os.path.exists(out_file) and os.path.getsize(out_file) == footer["out_size"]:
+            print("[RECOVER] Completing interrupted manifest update")
+            os.replace(tmp_manifest, manifest_path(out_file))
+    for path in (tmp_manifest, out_file + ".tmp"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def load_manifest(out_file, raw_root):
+    """(footer, {relative path: (size, mtime_ns, sha1, row)}) of the last build, or None."""
+    path = manifest_path(out_file)
+    if not os.path.exists(path) or not os.path.exists(out_file):
+        return None
+    footer = _read_footer(path)
+    if not footer or footer["version"] != MANIFEST_VERSION or footer["raw_root"] != os.path.abspath(raw_root):
+        print("[MANIFEST] Manifest incomplete, outdated or for another raw root; rebuilding everything")
+        return None
+
+    size = os.path.getsize(out_file)
+    if size < footer["out_size"]:
+        print(f"[MANIFEST] {out_file} is shorter than the manifest records; rebuilding everything")
+        return None
+    if size > footer["out_size"]:
+        # an append was interrupted before its manifest was written
+        print(f"[MANIFEST] Dropping {size - footer['out_size']} bytes of an interrupted update")
+        with open(out_file, "r+b") as f:
+            f.truncate(footer["out_size"])
+
+    entries = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            if "version" in rec:
+                break
+            entries[rec["path"]] = (rec["size"], rec["mtime_ns"], rec["sha1"], rec["row"])
+    return footer, entries
+
+
+def merge_changes(older, newer):
+    """One change list covering two consecutive builds.
+
+    `removed` rows are numbered as before the older build (the rows
+    Embeddings.py last saw); `updated` and `appended_from` as after the newer.
+    """
+    if older.get("full") or newer.get("full"):
+        return dict(newer, full=True, removed=[], updated=[], appended_from=0)
+
+    def before_older(row):
+        # the older build's row -> its row before that build
+        for r in older["removed"]:
+            if r > row:
+                break
+            row += 1
+        return row
+
+    gone = newer["removed"]
+    embedded = older["appended_from"]  # older rows from here on were never embedded
+    removed = sorted(set(older["removed"]) | {before_older(r) for r in gone if r < embedded})
+    shift = lambda row: row - bisect.bisect_left(gone, row)
+    appended_from = min(shift(embedded), newer["appended_from"])
+    updated = {shift(r) for r in older["updated"] if r not in set(gone)} | set(newer["updated"])
+    return dict(newer, removed=removed, appended_from=appended_from,
+                updated=sorted(r for r in updated if r < appended_from))
+
+
+# ---------------- BUILD ---------------- #
+
+def _full_build(paths, raw_root, out_file, workers, chunk_size, counters):
+    """Every file, in os.walk order: the same bytes as a one-process build."""
+    written = 0
+    with open(out_file + ".tmp", "w", encoding="utf-8") as out, \
+            open(manifest_path(out_file) + ".tmp", "w", encoding="utf-8") as manifest:
+        for path, line, error, source in _parse(paths, workers, chunk_size, counters):
+            row = None
+            if error is None:
+                out.write(line)
+                row = written
+                written += 1
+            manifest.write(_manifest_line(os.path.relpath(path, raw_root), (*(source or (None,) * 3), row)))
+        out.flush()
+        manifest.write(json.dumps(_footer(raw_root, written, os.fstat(out.fileno()).st_size)) + "\n")
+    counters["added"] = written
+    _commit(out_file, {"records": written, "appended_from": 0, "updated": [], "removed": [], "full": True})
+    return written
+
+
+def _incremental_build(paths, manifest, raw_root, out_file, workers, chunk_size, counters):
+    """Parse only new or changed files and update their records.
+
+    Changed files keep their row; new files are appended. Records of removed
+    files are dropped, which renumbers the rows after them. The change list
+    tells Embeddings.py which stored rows to drop and which rows to encode.
+    """
+    footer, entries = manifest
+    records = footer["records"]
+    present = set()
+    to_parse = []
+    for path in paths:
+        rel = os.path.relpath(path, raw_root)
+        present.add(rel)
+        entry = entries.get(rel)
+        if entry is not None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None  # vanished since the listing: process_file reports it
+            if st is not None and (st.st_size, st.st_mtime_ns) == entry[:2]:
+                continue
+        to_parse.append(path)
+    gone = [rel for rel in entries if rel not in present]
+    removed = {entries[rel][3] for rel in gone} - {None}
+    for rel in gone:
+        del entries[rel]
+    counters["unchanged"] = len(paths) - len(to_parse)
+    print(f"{len(to_parse)} new or modified files, {len(gone)} removed, {counters['unchanged']} unchanged")
+    if not to_parse and not gone:
+        return records
+
+    replaced, appended = {}, []
+    for path, line, error, source in _parse(to_parse, workers, chunk_size, counters):
+        rel = os.path.relpath(path, raw_root)
+        old = entries.get(rel)
+        if source is None:
+            # unreadable right now: keep the old record, retry next run
+            entries.setdefault(rel, (None, None, None, None))
+            continue
+        if old is not None and source[2] == old[2]:
+            entries[rel] = (*source, old[3])  # touched, same content
+            continue
+        row = old[3] if old is not None else None
+        if line is None:
+            if row is not None:
+                removed.add(row)
+            entries[rel] = (*source, None)
+        elif row is not None:
+            replaced[row] = line
+            entries[rel] = (*source, row)
+        else:
+            entries[rel] = (*source, records + len(appended))
+            appended.append(line)
+    counters.update(added=len(appended), replaced=len(replaced), removed=len(removed))
+
+    removed_rows = sorted(removed)
+    if replaced or removed:
+        # rewrite: copy untouched lines, swap replaced ones, drop removed ones
+        with open(out_file, "rb") as src, open(out_file + ".tmp", "wb") as out:
+            for row, old_line in enumerate(src):
+                if row in removed:
                     continue
-
-                case_entry = extract_case(data, filename)
-                out.write(json.dumps(case_entry, ensure_ascii=False) + "\n")
-
-    print(f"[DONE] DI dataset written to {OUT_FILE}")
-
+                out.write(replaced[row].encode("utf-8") if row in replaced else old_line)
+            for line in appended:
+                out.write(line.encode("utf-8"))
+            out_size = out.tell()
+        if removed_rows:
+            entries = {rel: (*e[:3], e[3] - bisect.bisect_left(removed_rows, e[3]) if e[3] is not None else None)
+                       for rel, e in entries.items()}
+    else:
+        with open(out_file, "ab") as out:
+            for line in appended:
+                out.write(line.encode("utf-8"))
+            out_size = out.tell()
+
+    new_records = records - len(removed) + len(appended)
+    with open(manifest_path(out_file) + ".tmp", "w", encoding="utf-8") as f:
+        for rel, entry in entries.items():
+            f.write(_manifest_line(rel, entry))
+        f.write(json.dumps(_footer(raw_root, new_records, out_size)) + "\n")
+    updated = [row - bisect.bisect_left(removed_rows, row) for row in sorted(replaced)]
+    _commit(out_file, {"records": new_records, "appended_from": records - len(removed),
+                       "updated": updated, "removed": removed_rows, "full": False})
+    return new_records
+
+
+def build_DI_dataset(raw_root=RAW_ROOT, out_file=OUT_FILE, workers=None, chunk_size=CHUNK_SIZE, full=False,
+                     verbose=False):
+    """Build di_dataset.jsonl from the raw case files, in parallel.
+
+    The first build (or full=True) parses every file. A single writer emits
+    records in os.walk order, so the output is byte-identical whatever the
+    number of workers. Later builds compare each file's size and mtime with
+    the manifest and parse only new or modified files, so a refresh costs
+    roughly the size of the delta. Unreadable files are counted and skipped.
+    """
+    os.makedirs(os.path.dirname(out_file) or ".", exist_ok=True)
+    _recover(out_file)
+    manifest = None if full else load_manifest(out_file, raw_root)
+    paths = list_source_files(raw_root, verbose)
+    workers = workers or os.cpu_count() or 1
+    mode = "full" if manifest is None else "incremental"
+    print(f"{mode.capitalize()} build over {len(paths)} files with {workers} worker(s)...")
+
+    started = time.perf_counter()
+    counters = {"files": len(paths), "errors": 0, "added": 0, "replaced": 0, "removed": 0, "unchanged": 0,
+                "bytes": 0}
+    if manifest is None:
+        records = _full_build(paths, raw_root, out_file, workers, chunk_size, counters)
+    else:
+        records = _incremental_build(paths, manifest, raw_root, out_file, workers, chunk_size, counters)
+
+    elapsed = time.perf_counter() - started
+    parsed = counters["files"] - counters["unchanged"]
+    rate = parsed / elapsed if elapsed else 0.0
+    size_mb = counters["bytes"] / 1e6
+    print(f"[DONE] DI dataset written to {out_file}: {records} cases "
+          f"(+{counters['added']} added, {counters['replaced']} replaced, {counters['removed']} removed), "
+          f"{counters['errors']} errors, {parsed} files ({size_mb:.1f} MB) parsed in {elapsed:.1f}s "
+          f"({rate:.0f} files/s, {size_mb / (elapsed or 1):.1f} MB/s)")
+    return dict(counters, records=records, seconds=elapsed, mode=mode)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build di_dataset.jsonl from the raw case dump")
+    parser.add_argument("--raw-root", default=RAW_ROOT)
+    parser.add_argument("--out", default=OUT_FILE)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores, 1 = in-process)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Files per worker task")
+    parser.add_argument("--full", action="store_true", help="Reparse every file instead of only new or modified ones")
+    parser.add_argument("--verbose", action="store_true", help="Print the number of JSON files found per folder")
+    args = parser.parse_args()
     print("Starting DI build...")
-    build_DI_dataset()
\ No newline at end of file
+    build_DI_dataset(args.raw_root, args.out, args.workers, args.chunk_size, args.full, args.verbose)
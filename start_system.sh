@@ -36,16 +36,26 @@ python3 backend_server.py &
 BACKEND_PID=$!
 cd ..
 
-# Wait a moment for backend to start
-sleep 3
-
-# Check if backend is running
-if ! kill -0 $BACKEND_PID 2>/dev/null; then
-    echo "Backend server failed to start"
-    exit 1
-fi
+# Wait until the backend has loaded its assets and finished warming up
+READY_TIMEOUT=${ADVOCA_READY_TIMEOUT:-300}
+READY_URL="http://localhost:8000/api/health/ready"
+echo "  Waiting for backend readiness (up to ${READY_TIMEOUT}s)..."
+SECONDS=0
+until curl -sf -o /dev/null "$READY_URL"; do
+    # Check if backend is running
+    if ! kill -0 $BACKEND_PID 2>/dev/null; then
+        echo "Backend server failed to start"
+        exit 1
+    fi
+    if [ $SECONDS -ge $READY_TIMEOUT ]; then
+        echo "Backend not ready after ${READY_TIMEOUT}s; see $READY_URL"
+        kill $BACKEND_PID 2>/dev/null
+        exit 1
+    fi
+    sleep 1
+done
 
-echo "  Backend running on http://localhost:8000"
+echo "  Backend ready on http://localhost:8000 (${SECONDS}s)"
 
 # Start frontend server
 echo "Starting frontend server (Vite)..."